@@ -0,0 +1,138 @@
+# 分析结果缓存：日志内容没有变化时，直接复用上次的大模型分析结果
+#
+# 缓存键 = hash(发给模型的日志内容 + 系统提示词 + 模型名)，
+# 缓存文件放在分析结果目录下的 .cache/ 里（与 *_analysis.json 相邻），
+# 支持按 TTL 过期和按条目数 / 总大小淘汰（最久未使用的先淘汰）。
+import os
+import json
+import time
+import hashlib
+
+DEFAULT_CACHE_DIR = os.path.join("logs", "error-log", ".cache")
+
+
+def make_cache_key(log_content, system_prompt, model):
+    """根据日志内容、系统提示词和模型名生成缓存键"""
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, log_content):
+        data = (part or "").encode("utf-8")
+        # 带上长度，避免不同字段拼接后产生相同的字节串
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """基于文件的分析结果缓存"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=7 * 24 * 3600,
+                 max_entries=500, max_bytes=50 * 1024 * 1024, enabled=True):
+        self.enabled = enabled
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key, record_miss=True):
+        """
+        命中返回缓存的分析结果，未命中 / 已过期返回 None
+
+        record_miss=False 用于试探性查询：命中照常计数，未命中不计入 misses
+        """
+        if not self.enabled:
+            self.misses += 1 if record_miss else 0
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1 if record_miss else 0
+            return None
+
+        if self.ttl_seconds and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self._remove(path)
+            self.misses += 1 if record_miss else 0
+            return None
+
+        # 更新访问时间，用于 LRU 淘汰
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry.get("analysis_result")
+
+    def put(self, key, analysis_result, source_log=None, model=None):
+        """写入缓存，并按需淘汰旧条目"""
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "created": time.time(),
+            "model": model,
+            "source_log": source_log,
+            "analysis_result": analysis_result,
+        }
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ 写入分析缓存失败: {e}")
+            return
+        self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self.evictions += 1
+        except OSError:
+            pass
+
+    def evict(self):
+        """删除过期条目；超出条目数或总大小时，按最近访问时间从旧到新淘汰"""
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        except OSError:
+            return
+
+        now = time.time()
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # mtime 在 get() 命中时会刷新为最近访问时间，超过 TTL 没被访问过的条目一定已过期
+            if self.ttl_seconds and now - stat.st_mtime > self.ttl_seconds:
+                self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (
+                (self.max_entries and len(entries) > self.max_entries) or
+                (self.max_bytes and total_bytes > self.max_bytes)):
+            _, size, path = entries.pop(0)
+            total_bytes -= size
+            self._remove(path)
+
+    def report(self):
+        """打印本次运行的缓存命中情况"""
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        print(f"🗃️  分析缓存: 命中 {self.hits} / 未命中 {self.misses} "
+              f"(命中率 {ratio:.0%})，淘汰 {self.evictions} 条")
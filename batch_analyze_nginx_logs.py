@@ -0,0 +1,260 @@
+# 批量分析 Nginx 错误日志：发现目录下所有日志文件，通过有界异步工作池并发执行两步工具调用对话
+import os
+import sys
+import time
+import fnmatch
+import asyncio
+import argparse
+
+from openai import AsyncOpenAI
+
+from test1_analyze_nginx_logs import (
+    tools,
+    handle_tool_calls,
+    build_log_tool_content,
+    save_analysis_result,
+    lookup_cached_analysis,
+    store_cached_analysis,
+    MODEL_NAME,
+    SYSTEM_PROMPT,
+)
+from analysis_cache import AnalysisCache
+
+#创建异步OpenAI客户端实例
+async_client = AsyncOpenAI(
+    api_key=os.environ.get('DEEPSEEK_API_KEY'),
+    base_url="https://api.deepseek.com"
+)
+
+
+def discover_log_files(log_dir="logs", pattern="*.log", recursive=False):
+    """发现日志目录下的所有日志文件（按文件名排序）"""
+    found = []
+    for root, dirs, files in os.walk(log_dir):
+        for name in files:
+            if fnmatch.fnmatch(name, pattern):
+                found.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(found)
+
+
+class AsyncRateLimiter:
+    """简单的异步限流器：保证相邻两次请求间隔不小于 1/rate 秒"""
+
+    def __init__(self, rate_per_sec):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec and rate_per_sec > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+        self.total_wait = 0.0
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            self.total_wait += wait
+            await asyncio.sleep(wait)
+
+
+class BatchStats:
+    """单次批量运行的吞吐统计"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.files_ok = 0
+        self.files_failed = 0
+        self.llm_calls = 0
+        self.llm_latencies = []
+        self.file_latencies = []
+
+    def record_llm_call(self, latency):
+        self.llm_calls += 1
+        self.llm_latencies.append(latency)
+
+    def report(self, concurrency, rate_limiter):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        total_files = self.files_ok + self.files_failed
+
+        def _percentile(values, p):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+        print("\n" + "=" * 60)
+        print("📊 批量分析吞吐报告")
+        print("=" * 60)
+        rate = f"{1 / rate_limiter.interval:.2f} 次/秒" if rate_limiter.interval else "不限"
+        print(f"  并发数: {concurrency}  限流: {rate}")
+        print(f"  文件: 成功 {self.files_ok} / 失败 {self.files_failed} / 共 {total_files}")
+        print(f"  总耗时: {elapsed:.2f}s  文件吞吐: {total_files / elapsed if elapsed else 0:.2f} 个/秒")
+        print(f"  LLM 调用: {self.llm_calls} 次  调用吞吐: {self.llm_calls / elapsed if elapsed else 0:.2f} 次/秒")
+        print(f"  LLM 延迟: p50 {_percentile(self.llm_latencies, 50):.2f}s  "
+              f"p95 {_percentile(self.llm_latencies, 95):.2f}s  "
+              f"max {max(self.llm_latencies, default=0):.2f}s")
+        print(f"  单文件耗时: p50 {_percentile(self.file_latencies, 50):.2f}s  "
+              f"p95 {_percentile(self.file_latencies, 95):.2f}s")
+        print(f"  限流等待合计: {rate_limiter.total_wait:.2f}s")
+        print("=" * 60)
+
+
+async def _create_completion(rate_limiter, stats, **kwargs):
+    """经过限流器调用大模型，并记录延迟"""
+    await rate_limiter.acquire()
+    start = time.perf_counter()
+    response = await async_client.chat.completions.create(**kwargs)
+    stats.record_llm_call(time.perf_counter() - start)
+    return response
+
+
+async def analyze_log_file(filename, rate_limiter, stats, cache, output_dir="logs/error-log"):
+    """对单个日志文件执行两步工具调用对话，并保存 *_analysis.json"""
+    # 试探：整份日志的模板统计没有变化时，直接复用缓存，两次 LLM 调用都省掉
+    default_content = await asyncio.to_thread(build_log_tool_content, filename, {})
+    cached_result = lookup_cached_analysis(cache, default_content, record_miss=False)
+    if cached_result:
+        print(f"⚡ {filename} 内容未变化，使用缓存的分析结果")
+        return save_analysis_result(filename, cached_result, output_dir=output_dir, from_cache=True)
+
+    user_message = f"帮我诊断nginx的错误日志 {filename}"
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
+
+    #第一次调用 - 期望大模型返回工具调用响应
+    response = await _create_completion(
+        rate_limiter, stats,
+        model=MODEL_NAME,
+        messages=messages,
+        tools=tools,
+        stream=False
+    )
+
+    # 读取日志和模板聚合是同步操作，放到线程里执行，避免阻塞事件循环
+    _, log_content = await asyncio.to_thread(handle_tool_calls, response, filename)
+
+    if log_content:
+        cached_result = lookup_cached_analysis(cache, log_content)
+        if cached_result:
+            print(f"⚡ {filename} 命中分析缓存，跳过第二次调用")
+            return save_analysis_result(filename, cached_result, output_dir=output_dir, from_cache=True)
+
+        #第二次调用 - 提供工具调用结果给大模型
+        second_response = await _create_completion(
+            rate_limiter, stats,
+            model=MODEL_NAME,
+            messages=messages + [
+                {"role": "assistant",
+                 "content": None,
+                 "tool_calls": response.choices[0].message.tool_calls},
+                {"role": "tool",
+                 "content": log_content,
+                 "tool_call_id": response.choices[0].message.tool_calls[0].id},
+            ]
+        )
+        result = second_response.choices[0].message.content
+        store_cached_analysis(cache, log_content, result, filename)
+    else:
+        #如果没有工具调用，直接使用结果
+        result = response.choices[0].message.content
+
+    return save_analysis_result(filename, result, output_dir=output_dir)
+
+
+async def analyze_nginx_logs_batch(log_files, concurrency=4, rate_per_sec=2.0, output_dir="logs/error-log",
+                                   cache=None):
+    """
+    批量分析日志文件：最多 concurrency 个文件同时进行，所有 LLM 请求共享一个限流器；
+    日志内容没有变化的文件直接使用分析缓存
+
+    Returns:
+        {日志文件: 结果文件路径或 None}
+    """
+    queue = asyncio.Queue()
+    for filename in log_files:
+        queue.put_nowait(filename)
+
+    rate_limiter = AsyncRateLimiter(rate_per_sec)
+    stats = BatchStats()
+    cache = cache or AnalysisCache(cache_dir=os.path.join(output_dir, ".cache"))
+    results = {}
+
+    async def worker(worker_id):
+        while True:
+            try:
+                filename = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            print(f"🔧 [worker-{worker_id}] 开始分析: {filename}")
+            try:
+                result_path = await analyze_log_file(filename, rate_limiter, stats, cache, output_dir)
+                results[filename] = result_path
+                if result_path:
+                    stats.files_ok += 1
+                else:
+                    stats.files_failed += 1
+            except Exception as e:
+                print(f"❌ [worker-{worker_id}] 分析失败 {filename}: {e}")
+                results[filename] = None
+                stats.files_failed += 1
+            finally:
+                stats.file_latencies.append(time.perf_counter() - start)
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker(i)) for i in range(max(1, min(concurrency, len(log_files))))]
+    await asyncio.gather(*workers)
+
+    stats.finished = time.perf_counter()
+    stats.report(concurrency, rate_limiter)
+    cache.report()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量分析 Nginx 错误日志")
+    parser.add_argument("--log-dir", default="logs", help="日志目录，默认 logs/")
+    parser.add_argument("--pattern", default="*.log", help="日志文件名模式，默认 *.log")
+    parser.add_argument("--recursive", action="store_true", help="递归搜索子目录")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时分析的文件数")
+    parser.add_argument("--rps", type=float, default=2.0, help="每秒最多发起的 LLM 请求数，0 表示不限")
+    parser.add_argument("--output-dir", default="logs/error-log", help="分析结果输出目录")
+    parser.add_argument("--cache-ttl", type=float, default=7 * 24 * 3600, help="分析缓存有效期（秒），0 表示永不过期")
+    parser.add_argument("--cache-max-entries", type=int, default=500, help="分析缓存最多保留的条目数")
+    parser.add_argument("--no-cache", action="store_true", help="不使用分析缓存")
+    args = parser.parse_args()
+
+    log_files = discover_log_files(args.log_dir, args.pattern, args.recursive)
+    if not log_files:
+        print(f"⚠️ 在 {args.log_dir} 下没有找到匹配 {args.pattern} 的日志文件")
+        return 1
+
+    print(f"🔍 发现 {len(log_files)} 个日志文件:")
+    for filename in log_files:
+        print(f"  • {filename}")
+
+    cache = AnalysisCache(
+        cache_dir=os.path.join(args.output_dir, ".cache"),
+        ttl_seconds=args.cache_ttl,
+        max_entries=args.cache_max_entries,
+        enabled=not args.no_cache
+    )
+
+    results = asyncio.run(analyze_nginx_logs_batch(
+        log_files,
+        concurrency=args.concurrency,
+        rate_per_sec=args.rps,
+        output_dir=args.output_dir,
+        cache=cache
+    ))
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
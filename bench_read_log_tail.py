@@ -0,0 +1,104 @@
+# read_log_tail 基准测试：反向 seek 读尾 vs 旧版 readlines()
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from test1_analyze_nginx_logs import read_log_tail
+
+SAMPLE_LOGS = [
+    "logs/error_log_1.log",  # 800 行
+    "logs/error_log_2.log",  # 1500 行
+    "logs/error_log_3.log",  # 3500 行
+]
+
+
+def read_log_tail_readlines(filename, n=200):
+    """旧版实现：整个文件 readlines() 后再切片（仅用于对比）"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            lines = file.readlines()
+        return ''.join(lines[-n:])
+    except Exception as e:
+        print(f"读取文件失败：{e}")
+        return None
+
+
+def build_scaled_log(sample_path, target_bytes, output_dir):
+    """把样例日志反复拼接，放大到 target_bytes 大小"""
+    with open(sample_path, 'rb') as f:
+        chunk = f.read()
+    if not chunk.endswith(b'\n'):
+        chunk += b'\n'
+
+    # 先在内存里拼出约 8MB 的块，减少写入次数
+    repeat = max(1, (8 * 1024 * 1024) // len(chunk))
+    big_chunk = chunk * repeat
+
+    base_name = os.path.splitext(os.path.basename(sample_path))[0]
+    scaled_path = os.path.join(output_dir, f"{base_name}_scaled.log")
+    written = 0
+    with open(scaled_path, 'wb') as f:
+        while written < target_bytes:
+            f.write(big_chunk)
+            written += len(big_chunk)
+    return scaled_path, written
+
+
+def measure(func, filename, n):
+    """返回 (耗时秒, 峰值内存字节, 结果)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(filename, n)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="read_log_tail 基准测试")
+    parser.add_argument("--size-mb", type=int, default=1024,
+                        help="每个样例日志放大后的大小（MB），默认 1024MB")
+    parser.add_argument("--lines", type=int, default=200, help="读取的尾部行数")
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="跳过旧版 readlines() 实现（文件很大时内存可能不够）")
+    parser.add_argument("--tmp-dir", default=None, help="放大后日志的存放目录")
+    args = parser.parse_args()
+
+    target_bytes = args.size_mb * 1024 * 1024
+
+    print(f"📊 read_log_tail 基准测试: 每个文件约 {args.size_mb}MB, 读取最后 {args.lines} 行")
+    print("-" * 78)
+    print(f"{'文件':<28}{'实现':<14}{'耗时(s)':>12}{'峰值内存(MB)':>16}{'一致':>8}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as tmp_dir:
+        for sample in SAMPLE_LOGS:
+            if not os.path.exists(sample):
+                print(f"⚠️ 样例日志不存在，跳过: {sample}")
+                continue
+
+            scaled_path, size = build_scaled_log(sample, target_bytes, tmp_dir)
+            label = f"{os.path.basename(sample)} ({size / 1024 / 1024:.0f}MB)"
+
+            seek_time, seek_peak, seek_result = measure(read_log_tail, scaled_path, args.lines)
+
+            if args.skip_legacy:
+                print(f"{label:<28}{'reverse-seek':<14}{seek_time:>12.4f}{seek_peak / 1024 / 1024:>16.2f}{'-':>8}")
+            else:
+                legacy_time, legacy_peak, legacy_result = measure(read_log_tail_readlines, scaled_path, args.lines)
+                same = "✅" if seek_result == legacy_result else "❌"
+                print(f"{label:<28}{'readlines':<14}{legacy_time:>12.4f}{legacy_peak / 1024 / 1024:>16.2f}{'':>8}")
+                print(f"{'':<28}{'reverse-seek':<14}{seek_time:>12.4f}{seek_peak / 1024 / 1024:>16.2f}{same:>8}")
+
+            os.remove(scaled_path)
+
+    print("-" * 78)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,34 +3,73 @@ import os
 import sys
 import time
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 
 from crewai import Agent, Task, Crew, Process
+from crewai.hooks import before_tool_call, after_tool_call
 from crewai.llm import LLM
 from dotenv import load_dotenv
 
 from tools.mcp_client_tools import (
     get_nginx_servers,
     get_server_logs,
+    get_nginx_log_stats,
     get_server_metrics,
+    get_servers_metrics_batch,
     get_mysql_logs_simple,
     get_redis_logs_simple,
     mysql_runtime_diagnosis,
     search_code_in_repository,
+    search_code_content,
     get_code_context,
     analyze_code_pattern
 )
+from tools.evidence_collector import collect_evidence, format_evidence
+from tools.tool_tracing import tracer, trace_context, current_agent, current_task
 
 load_dotenv()
 
 
+@before_tool_call
+def _trace_tool_caller(context):
+    """工具执行前记下当前的智能体和任务，供工具调用追踪使用"""
+    current_agent.set(context.agent.role if context.agent else None)
+    current_task.set(_task_label(context.task) if context.task else None)
+    return None
+
+
+@after_tool_call
+def _clear_tool_caller(context):
+    current_agent.set(None)
+    current_task.set(None)
+    return None
+
+
+def _task_label(task: Task) -> str:
+    """任务标签：优先用任务名，否则取描述的第一行"""
+    return task.name or task.description.split("\n", 1)[0][:40]
+
+
 def timeit(func):
-    """执行时间装饰器"""
+    """执行时间装饰器（实例带有 task_timings 时，同时输出各任务耗时）"""
 
     @wraps(func)
     def wrapper(*args, **kwargs):
         start = time.time()
         result = func(*args, **kwargs)
-        print(f"\n⏱️  总执行时间: {time.time() - start:.2f}秒")
+        total = time.time() - start
+
+        task_timings = getattr(args[0], "task_timings", None) if args else None
+        if task_timings:
+            print("\n⏱️  各任务耗时:")
+            for task_name, seconds in task_timings.items():
+                print(f"  • {task_name}: {seconds:.2f}秒")
+            serial_total = sum(task_timings.values())
+            print(f"  任务耗时合计: {serial_total:.2f}秒（顺序执行所需时间）")
+            if serial_total > total:
+                print(f"  并行节省: {serial_total - total:.2f}秒")
+
+        print(f"\n⏱️  总执行时间: {total:.2f}秒")
         return result
 
     return wrapper
@@ -43,6 +82,8 @@ class FaultDiagnosisCrew:
         self.api_endpoint = api_endpoint
         self.metrics_to_analyze = metrics_to_analyze
         self.log_keywords = log_keywords
+        # 每个任务的耗时（秒），由 assemble_and_run 填充
+        self.task_timings = {}
 
         # 修复：简化LLM配置，移除不支持的参数
         self.llm = LLM(
@@ -69,7 +110,7 @@ class FaultDiagnosisCrew:
             goal=f"从Nginx日志中提取与 {self.api_endpoint} 相关的错误请求、响应码、异常关键词和延迟模式",
             backstory="你是一个日志分析大师，擅长从复杂日志中发现隐藏异常。",
             llm=self.llm,
-            tools=[get_nginx_servers, get_server_logs],
+            tools=[get_nginx_servers, get_nginx_log_stats, get_server_logs],
             verbose=True,
             allow_delegation=False
         )
@@ -100,13 +141,13 @@ class FaultDiagnosisCrew:
         return Agent(
             role="服务器指标分析专家",
             goal=f"分析 {self.api_endpoint} 接口的性能指标，找出异常规律。\n"
-                 f"提示：使用列表形式一次性获取多个指标，减少调用次数。\n"
+                 f"提示：使用列表形式一次性获取多个指标，减少调用次数；对比多台服务器时用“批量获取服务器指标”一次取回全部服务器。\n"
                  f"常用指标包括：cpu_percent（CPU使用率）、memory_percent（内存使用率）、success_rate（成功率）、avg_latency_ms（平均延迟）、requests_per_sec（请求速率）。\n"
                  f"支持指标别名：cpu_usage->cpu_percent, memory_usage->memory_percent, request_success_rate->success_rate, avg_latency->avg_latency_ms",
             backstory="你擅长监控分析，能观察成功率、延迟、资源使用之间的关联性。"
                       "你知道如何高效地批量获取指标，并善于对比不同服务器的指标差异。",
             llm=self.llm,
-            tools=[get_nginx_servers, get_server_metrics],
+            tools=[get_nginx_servers, get_server_metrics, get_servers_metrics_batch],
             verbose=True,
             allow_delegation=False
         )
@@ -117,7 +158,7 @@ class FaultDiagnosisCrew:
             goal="根据线索定位源代码文件，分析代码层面的根本原因",
             backstory="你是资深代码审查专家，擅长通过代码静态分析找到性能问题。",
             llm=self.llm,
-            tools=[search_code_in_repository, get_code_context, analyze_code_pattern],
+            tools=[search_code_in_repository, search_code_content, get_code_context, analyze_code_pattern],
             verbose=True,
             allow_delegation=False
         )
@@ -137,10 +178,13 @@ class FaultDiagnosisCrew:
 
         # 任务 1：日志分析
         self.log_research_task = Task(
+            name="日志分析",
             description=(
                 f"{self.api_endpoint} 接口出现异常访问现象。\n"
                 f"你可以使用你拥有的工具来获取相关信息。\n"
-                f"请分析服务器日志，关注异常响应码、超时和错误。"
+                f"请分析服务器日志，关注异常响应码、超时和错误。\n"
+                f"建议先用“Nginx日志聚合统计”查看各接口、各时间段的状态码分布和延迟分位数，定位异常的接口和时间段，再查看原始日志。\n"
+                f"日志按页返回：结果中的 next_cursor 不为空时，保持其他参数不变、带上 cursor 再次调用可获取下一页。"
             ),
             expected_output=(
                 "日志分析总结：异常现象、关键证据、可能的问题。"
@@ -151,6 +195,7 @@ class FaultDiagnosisCrew:
 
         # 任务 2：指标分析
         self.metrics_research_task = Task(
+            name="指标分析",
             description=(
                 f"{self.api_endpoint}接口出现异常访问现象。\n"
                 f"你可以使用你拥有的工具来获取相关信息。\n"
@@ -159,7 +204,7 @@ class FaultDiagnosisCrew:
                 f"1. 建议使用列表形式一次性获取多个指标，如：['cpu_percent', 'memory_percent', 'success_rate', 'avg_latency_ms']\n"
                 f"2. 支持指标别名：cpu_usage（自动映射为cpu_percent）、memory_usage（自动映射为memory_percent）\n"
                 f"3. 不指定metric_name参数时，将返回所有指标\n"
-                f"4. 对比不同服务器的指标差异有助于定位问题"
+                f"4. 对比不同服务器的指标差异有助于定位问题，可用“批量获取服务器指标”一次获取所有服务器的指标"
             ),
             expected_output=(
                 "指标分析总结：\n"
@@ -174,10 +219,12 @@ class FaultDiagnosisCrew:
 
         # 任务 3：MySQL分析
         self.mysql_log_task = Task(
+            name="MySQL分析",
             description=(
                 f"{self.api_endpoint}接口出现异常访问现象。\n"
                 f"你可以使用你拥有的工具来获取相关信息\n"
-                f"请分析MySQL日志，关注慢查询、死锁和错误。"
+                f"请分析MySQL日志，关注慢查询、死锁和错误。\n"
+                f"get_mysql_logs_simple 结果中的 next_start_time 不为空时，把它作为 start_time 再次调用可获取后续日志。"
             ),
             expected_output=(
                 "MySQL分析报告：异常SQL类型、慢查询、死锁分析。"
@@ -188,9 +235,10 @@ class FaultDiagnosisCrew:
 
         # 任务 4：Redis分析
         self.redis_log_task = Task(
+            name="Redis分析",
             description=(
                 "请分析Redis日志，找出异常命令、慢查询、错误、超时等。\n"
-                "使用 get_redis_logs_simple 工具。"
+                "使用 get_redis_logs_simple 工具，结果中的 next_cursor 不为空时带上它再次调用可获取下一页。"
             ),
             expected_output=(
                 "Redis缓存层分析报告：慢查询、异常命令、错误类型。"
@@ -201,9 +249,11 @@ class FaultDiagnosisCrew:
 
         # 任务 5：代码分析
         self.code_analysis_task = Task(
+            name="代码分析",
             description=(
                 f"基于前面的发现，从代码层面深入分析 {self.api_endpoint} 接口的问题。\n"
-                f"搜索相关代码文件，分析潜在问题。"
+                f"搜索相关代码文件，分析潜在问题。\n"
+                f"可以用“搜索代码内容”直接查找可疑调用（如 time.sleep、requests.get(），结果带行号和代码片段。"
             ),
             expected_output=(
                 "代码分析报告：关键代码文件、发现的代码问题、具体位置和原因。"
@@ -214,6 +264,7 @@ class FaultDiagnosisCrew:
 
         # 任务 6：根因诊断
         self.root_case_task = Task(
+            name="根因诊断",
             description=(
                 "综合所有分析结果，给出最可能的根因解释。\n"
                 "不需要调用任何工具，基于已有的分析结果进行综合判断。"
@@ -225,13 +276,84 @@ class FaultDiagnosisCrew:
             verbose=True
         )
 
+    def precollect_evidence(self) -> dict:
+        """智能体启动前，直接调用原始工具函数并发采集所有服务器的证据"""
+        print("📦 预采集证据（并发调用原始工具函数）...")
+        start = time.time()
+        with trace_context(task="证据预采集"):
+            bundle = collect_evidence(api_endpoint=self.api_endpoint, keywords=self.log_keywords)
+        self.task_timings["证据预采集"] = time.time() - start
+        print(f"📦 证据预采集完成: {len(bundle['servers'])} 台服务器, "
+              f"{len(bundle['metric_outliers'])} 个指标离群点, 耗时 {bundle['elapsed_s']:.2f}秒")
+        return bundle
+
+    def _inject_evidence(self, bundle: dict):
+        """把证据包中与任务相关的部分追加到任务描述中"""
+        sections = [
+            (self.log_research_task, ["nginx"]),
+            (self.metrics_research_task, ["metrics"]),
+            (self.mysql_log_task, ["mysql"]),
+            (self.redis_log_task, ["redis"]),
+            (self.code_analysis_task, ["nginx", "metrics"]),
+        ]
+        for task, names in sections:
+            evidence = format_evidence(bundle, sections=names, metric_names=self.metrics_to_analyze)
+            task.description += (
+                "\n\n以下证据已由系统预先采集，请直接基于这些数据分析，"
+                "只有证据不足时才调用工具补充：\n"
+                f"{evidence}"
+            )
+
+    def _task_name(self, task: Task) -> str:
+        """任务名：用负责的智能体角色表示"""
+        return task.agent.role if task.agent else task.description[:20]
+
+    def _timed_task_callback(self):
+        """Crew 的 task_callback：记录顺序执行时每个任务的耗时"""
+        last_mark = [time.time()]
+
+        def callback(task_output):
+            now = time.time()
+            self.task_timings[task_output.agent] = now - last_mark[0]
+            last_mark[0] = now
+
+        return callback
+
+    def _run_single_task(self, task: Task):
+        """把单个任务包装成独立 Crew 执行，返回 (任务, 耗时)"""
+        start = time.time()
+        Crew(
+            agents=[task.agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=True,
+        ).kickoff()
+        return task, time.time() - start
+
     @timeit
-    def assemble_and_run(self):
-        """完整版本 - 顺序执行"""
+    def assemble_and_run(self, parallel: bool = False, precollect: bool = True, trace: bool = True):
+        """
+        完整版本 - 默认顺序执行；parallel=True 时四个互不依赖的分析任务并发执行；
+        precollect=True 时先预采集证据并注入任务描述，减少智能体的工具调用轮次；
+        trace=True 时打开工具调用追踪，结束时打印汇总
+        """
         print(f"🔍 开始故障诊断分析...")
         print(f"目标接口: {self.api_endpoint}")
         print(f"指定指标: {self.metrics_to_analyze}")
         print(f"日志关键词: {self.log_keywords}")
+        print(f"执行模式: {'并行' if parallel else '顺序'}")
+
+        self.task_timings = {}
+        run_id = None
+        if trace:
+            tracer.enable()
+            run_id = tracer.start_run()
+            print(f"追踪运行ID: {run_id}")
+
+        # 每次运行重新创建任务，避免上一次注入的证据和 context 残留
+        self._create_tasks()
+        if precollect:
+            self._inject_evidence(self.precollect_evidence())
 
         # 使用单个Crew顺序执行所有任务
         agents = [
@@ -258,22 +380,60 @@ class FaultDiagnosisCrew:
 
         print("-" * 50)
 
-        crew = Crew(
-            agents=agents,
-            tasks=tasks,
-            process=Process.sequential,
-            verbose=True,
-        )
+        if parallel:
+            result = self._run_parallel()
+        else:
+            crew = Crew(
+                agents=agents,
+                tasks=tasks,
+                process=Process.sequential,
+                verbose=True,
+                task_callback=self._timed_task_callback(),
+            )
 
-        print("🚀 启动智能体团队...")
-        result = crew.kickoff()
+            print("🚀 启动智能体团队...")
+            result = crew.kickoff()
 
         print("\n" + "=" * 60)
         print("✅ 诊断完成！")
         print("=" * 60)
 
+        if trace:
+            tracer.print_summary(run_id)
         return result
 
+    def _run_parallel(self):
+        """
+        并行模式：
+        1. 日志 / 指标 / MySQL / Redis 四个分析任务互不依赖，各自作为独立 Crew 在线程中并发执行
+        2. 四个任务的输出作为显式 context 注入代码分析任务，再和根因诊断任务顺序执行
+        """
+        independent_tasks = [
+            self.log_research_task,
+            self.metrics_research_task,
+            self.mysql_log_task,
+            self.redis_log_task,
+        ]
+
+        print(f"🚀 并发启动 {len(independent_tasks)} 个独立分析任务...")
+        with ThreadPoolExecutor(max_workers=len(independent_tasks)) as executor:
+            for task, seconds in executor.map(self._run_single_task, independent_tasks):
+                self.task_timings[self._task_name(task)] = seconds
+
+        # 汇合：前面四个任务的结果作为后续任务的上下文
+        self.code_analysis_task.context = list(independent_tasks)
+        self.root_case_task.context = independent_tasks + [self.code_analysis_task]
+
+        print("🚀 启动代码分析与根因诊断...")
+        crew = Crew(
+            agents=[self.code_analyst, self.root_cause_diagnostician],
+            tasks=[self.code_analysis_task, self.root_case_task],
+            process=Process.sequential,
+            verbose=True,
+            task_callback=self._timed_task_callback(),
+        )
+        return crew.kickoff()
+
     def quick_demo(self):
         """快速演示模式（汇报时用）- 只运行前2个任务"""
         print("🚀 快速演示模式启动...")
@@ -319,7 +479,7 @@ if __name__ == "__main__":
 
         if choice.lower() == 'y':
             print("🎯 运行完整版诊断...")
-            final_result = diagnosis_crew.assemble_and_run()
+            final_result = diagnosis_crew.assemble_and_run(parallel=True)
 
             print("\n📋 完整诊断结果:")
             print("-" * 40)
@@ -6,21 +6,15 @@ from mcp.server.fastmcp import FastMCP
 # ================== 路径修正 ==================
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+TOOLS_DIR = os.path.join(PROJECT_ROOT, "tools")
 sys.path.append(PROJECT_ROOT)
+sys.path.insert(0, TOOLS_DIR)
 
 print("✅ INFRA MCP PYTHON PATH:", PROJECT_ROOT, file=sys.stderr)
 
-# ================== 导入所有工具 ==================
-# 注意：这里导入mock_tools中的原始函数（不是@tool装饰的版本）
-# MCP服务器需要的是原始函数，而不是@tool装饰后的Tool对象
-from mock_tools import (
-    get_nginx_servers_raw as get_nginx_servers_func,
-    get_server_logs_simple_raw as get_server_logs_simple_func,
-    get_mysql_logs_simple_raw as get_mysql_logs_simple_func,
-    mysql_runtime_diagnosis_raw as mysql_runtime_diagnosis_func,
-    get_redis_logs_simple_raw as get_redis_logs_simple_func,
-    get_server_metrics_simple_raw as get_server_metrics_simple_func,
-)
+# ================== 导入工具注册表 ==================
+# 工具清单、参数 schema 和校验都来自 tool_registry.py，与运维 / 监控 HTTP 服务器共用
+from tool_registry import registry
 
 # ================== 创建 FastMCP Server ==================
 server = FastMCP(
@@ -34,41 +28,8 @@ server = FastMCP(
 )
 
 # ================== 注册所有工具 ==================
-# 注册为MCP工具
-@server.tool()
-def get_nginx_servers():
-    """获取所有Nginx服务器的IP地址和基本信息。"""
-    return get_nginx_servers_func()
-
-@server.tool()
-def get_server_logs_simple(server_ip: str, api_endpoint: str = None, keywords=None):
-    """获取指定服务器的Nginx日志。"""
-    return get_server_logs_simple_func(server_ip, api_endpoint, keywords)
-
-@server.tool()
-def get_mysql_logs_simple(server_ip: str, keywords: str = "", min_duration_s: float = 0.0):
-    """获取MySQL日志。"""
-    logs, _ = get_mysql_logs_simple_func(
-        server_ip=server_ip,
-        keywords=keywords,
-        min_duration_s=min_duration_s
-    )
-    return logs
-
-@server.tool()
-def mysql_runtime_diagnosis(server_ip: str, action: str):
-    """MySQL运行时诊断。"""
-    return mysql_runtime_diagnosis_func(server_ip, action)
-
-@server.tool()
-def get_redis_logs_simple(server_ip: str, keywords=None, min_duration=None):
-    """获取Redis日志。"""
-    return get_redis_logs_simple_func(server_ip, keywords, min_duration)
-
-@server.tool()
-def get_server_metrics_simple(server_ip: str, metric_name: str = None):
-    """获取服务器性能指标。"""
-    return get_server_metrics_simple_func(server_ip, metric_name)
+# 注册为MCP工具（处理函数带原始函数的签名，FastMCP 据此生成参数模型）
+registry.for_server("infra").add_to_fastmcp(server)
 
 # ================== 启动 Server ==================
 if __name__ == "__main__":
@@ -6,7 +6,7 @@
 
 import sys
 import os
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Request
 import uvicorn
 
 # ================== 路径修正 ==================
@@ -20,10 +20,10 @@ print("✅ MONITOR MCP 简化版本启动", file=sys.stderr)
 
 # ================== 导入监控工具 ==================
 try:
-    from mock_tools import (
-        get_nginx_servers_raw as get_nginx_servers_func,
-        get_server_metrics_simple_raw as get_server_metrics_simple_func,
-    )
+    from tool_tracing import install_tracing_middleware
+    from tool_executor import ToolExecutor
+    import tool_dispatch
+    from tool_dispatch import ToolCallRequest, ToolCallBatchRequest
 
     print("✅ 成功导入监控工具", file=sys.stderr)
 except ImportError as e:
@@ -33,6 +33,18 @@ except ImportError as e:
 # ================== 创建FastAPI应用 ==================
 app = FastAPI(title="监控MCP服务器", version="1.0.0")
 
+# 本服务器提供的工具（schema、参数校验来自 tool_registry.py，调用和批量调用来自 tool_dispatch.py）
+tools = tool_dispatch.server_tools("monitor")
+
+# 同步工具函数在有界线程池 / 进程池中执行，不阻塞事件循环（见 tool_executor.py）
+tool_executor = ToolExecutor()
+
+# 单次批量调用（/tools/call_batch）最多包含的工具数
+MAX_BATCH_SIZE = int(os.environ.get("MCP_MAX_BATCH_SIZE", "64"))
+
+# 追踪每个端点的耗时和请求 / 响应字节数（写入 tool_traces.jsonl）
+install_tracing_middleware(app, "monitor")
+
 
 # ================== 定义工具端点 ==================
 
@@ -42,87 +54,37 @@ async def root():
     return {
         "name": "监控MCP服务器",
         "version": "1.0.0",
-        "tools": [
-            "get_nginx_servers",
-            "get_server_metrics_simple"
-        ]
+        "tools": tools.names()
     }
 
 
 @app.get("/health")
 async def health_check():
     """健康检查"""
-    return {"status": "healthy"}
-
-
-from pydantic import BaseModel
-
+    return {"status": "healthy", "executor": tool_executor.describe()}
 
-class ToolCallRequest(BaseModel):
-    tool_name: str
-    arguments: dict = {}
-
-
-# ... 其他代码保持不变 ...
 
 @app.post("/tools/call")
-async def call_tool(request: ToolCallRequest):
-    """调用工具"""
-    try:
-        tool_name = request.tool_name
-        arguments = request.arguments
-
-        print(f"[DEBUG] 调用工具: {tool_name}, 参数: {arguments}", file=sys.stderr)
-
-        if tool_name == "get_nginx_servers":
-            result = get_nginx_servers_func()
-        elif tool_name == "get_server_metrics_simple":
-            # 直接传递参数
-            server_ip = arguments.get("server_ip")
-            metric_name = arguments.get("metric_name")
+async def call_tool(call: ToolCallRequest, request: Request):
+    """调用工具：{"tool_name": ..., "arguments": {...}}"""
+    return await tool_dispatch.call_tool(tool_executor, "monitor", call, request)
 
-            print(f"[DEBUG] 调用指标工具: server_ip={server_ip}, metric_name={metric_name}", file=sys.stderr)
 
-            result = get_server_metrics_simple_func(server_ip, metric_name)
-        else:
-            raise HTTPException(status_code=404, detail=f"工具 '{tool_name}' 不存在")
+@app.post("/tools/call_batch")
+async def call_tool_batch(batch: ToolCallBatchRequest, request: Request):
+    """
+    批量调用工具：{"calls": [{"tool_name": ..., "arguments": {...}}, ...]}
 
-        return {"result": result}
-
-    except Exception as e:
-        print(f"[ERROR] 工具调用失败: {e}", file=sys.stderr)
-        raise HTTPException(status_code=500, detail=str(e))
+    各项通过 tool_executor 并发执行，结果按请求顺序返回；某一项失败只影响它自己：
+    {"results": [{"result": ...}, {"error": "...", "status": 404}, ...]}
+    """
+    return await tool_dispatch.call_tool_batch(tool_executor, "monitor", batch, request, MAX_BATCH_SIZE)
 
 
 @app.get("/tools/list")
 async def list_tools():
     """列出所有可用工具"""
-    return {
-        "tools": [
-            {
-                "name": "get_nginx_servers",
-                "description": "获取所有Nginx服务器的IP地址和基本信息。",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                "name": "get_server_metrics_simple",
-                "description": "获取服务器性能指标。支持单个指标、多个指标或全部指标。常见指标别名：cpu_usage->cpu_percent, memory_usage->memory_percent, request_success_rate->success_rate, avg_latency->avg_latency_ms",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "server_ip": {"type": "string"},
-                        "metric_name": {
-                            "type": ["string", "array", "null"],
-                            "description": "指标名称。可以是：字符串（单个指标），数组（多个指标），null（所有指标）。"
-                        }
-                    }
-                }
-            }
-        ]
-    }
+    return {"tools": tools.list_tools()}
 
 if __name__ == "__main__":
     print("🚀 Monitor MCP 服务器启动（端口: 3001）", file=sys.stderr)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+MCP 工具注册表 tool_registry 的测试脚本（参数校验、生成的 schema、各服务器的 /tools/list）
+"""
+
+import sys
+import os
+import asyncio
+from typing import List, Optional, Union
+
+# 添加路径以便导入
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, CURRENT_DIR)
+sys.path.insert(0, os.path.join(CURRENT_DIR, "..", "tools"))
+
+os.environ.setdefault("TOOL_TRACE", "0")
+
+from fastapi.testclient import TestClient
+
+from tool_registry import registry, ToolRegistry, ToolArgumentError
+
+# 每个工具生成的 input_schema（不含从文档提取的参数说明）
+EXPECTED_SCHEMAS = {
+    "get_nginx_servers": ({}, None),
+    "get_server_logs_simple": ({
+        "server_ip": {"type": "string"},
+        "api_endpoint": {"type": ["string", "null"]},
+        "keywords": {"type": ["string", "array", "null"], "items": {"type": "string"}},
+        "cursor": {"type": ["string", "null"]},
+        "page_size": {"type": "integer", "default": 10},
+    }, ["server_ip"]),
+    "get_nginx_log_stats": ({
+        "server_ip": {"type": "string"},
+        "api_endpoint": {"type": ["string", "null"]},
+        "bucket_minutes": {"type": "integer", "default": 5},
+    }, ["server_ip"]),
+    "get_mysql_logs_simple": ({
+        "server_ip": {"type": "string"},
+        "start_time": {"type": "string", "default": ""},
+        "end_time": {"type": "string", "default": ""},
+        "keywords": {"type": ["string", "array"], "items": {"type": "string"}, "default": ""},
+        "min_duration_s": {"type": "number", "default": 0.0},
+        "limit": {"type": "integer", "default": 1000},
+    }, ["server_ip"]),
+    "mysql_runtime_diagnosis": ({
+        "server_ip": {"type": "string"},
+        "action": {"type": "string"},
+    }, ["server_ip", "action"]),
+    "get_redis_logs_simple": ({
+        "server_ip": {"type": "string"},
+        "keywords": {"type": ["string", "array", "null"], "items": {"type": "string"}},
+        "min_duration": {"type": ["number", "null"]},
+        "cursor": {"type": ["string", "null"]},
+        "page_size": {"type": "integer", "default": 15},
+    }, ["server_ip"]),
+    "get_server_metrics_simple": ({
+        "server_ip": {"type": "string"},
+        "metric_name": {"type": ["string", "array", "null"], "items": {"type": "string"}},
+    }, ["server_ip"]),
+    "search_code_in_repository": ({
+        "file_pattern": {"type": "string", "default": "*.py"},
+        "keyword": {"type": ["string", "null"]},
+        "file_path": {"type": ["string", "null"]},
+    }, None),
+    "search_code_content": ({
+        "query": {"type": "string"},
+        "regex": {"type": "boolean", "default": False},
+        "case_sensitive": {"type": "boolean", "default": False},
+        "file_pattern": {"type": ["string", "null"]},
+        "context_lines": {"type": "integer", "default": 2},
+        "max_results": {"type": "integer", "default": 50},
+    }, ["query"]),
+    "get_code_context": ({
+        "file_path": {"type": "string"},
+        "line_start": {"type": "integer", "default": 1},
+        "line_end": {"type": "integer", "default": 50},
+        "highlight_lines": {"type": ["array", "null"], "items": {"type": "integer"}},
+    }, ["file_path"]),
+    "analyze_code_pattern": ({
+        "code_snippet": {"type": "string", "default": ""},
+        "issue_type": {"type": ["string", "null"]},
+    }, None),
+}
+
+
+def sample_tool(name: str, limit: int = 10, ratio: float = 0.5, strict: bool = False,
+                tags: Union[str, List[str]] = "", lines: Optional[List[int]] = None, note: str = None):
+    """测试用工具
+
+    Args:
+        name: 名称
+        limit: 最多条数
+    """
+    return {"name": name, "limit": limit, "ratio": ratio, "strict": strict, "tags": tags,
+            "lines": lines, "note": note}
+
+
+def test_argument_validation():
+    """数字字符串转换、拒绝有损转换和非布尔值、null 等同于不传"""
+    print("🧪 测试参数校验")
+    tools = ToolRegistry()
+    spec = tools.register(sample_tool, defaults={"ratio": 0.25})
+
+    accepted = [
+        ({"name": "a", "limit": "50"}, {"limit": 50}),
+        ({"name": "a", "limit": " 7 "}, {"limit": 7}),
+        ({"name": "a", "limit": 3.0}, {"limit": 3}),
+        ({"name": "a", "ratio": "2.5"}, {"ratio": 2.5}),
+        ({"name": "a", "ratio": 2}, {"ratio": 2.0}),
+        ({"name": "a", "strict": True}, {"strict": True}),
+        ({"name": "a", "tags": ["x", "y"]}, {"tags": ["x", "y"]}),
+        ({"name": "a", "lines": ["3", 4]}, {"lines": [3, 4]}),
+        ({"name": "a", "limit": None, "ratio": None, "note": None}, {"limit": 10, "ratio": 0.25, "note": None}),
+        (None, None),
+    ]
+    rejected = [
+        {"name": "a", "limit": "2.5"},
+        {"name": "a", "limit": 2.5},
+        {"name": "a", "limit": True},
+        {"name": "a", "strict": "true"},
+        {"name": "a", "strict": 1},
+        {"name": "a", "ratio": "fast"},
+        {"name": "a", "lines": [1, "x"]},
+        {"name": "a", "tags": {"k": "v"}},
+        {"name": "a", "unknown": 1},
+        {"limit": 5},
+        {"name": None},
+        ["name"],
+    ]
+
+    ok = True
+    for arguments, expected in accepted:
+        try:
+            if expected is None:
+                spec.validate(arguments)
+                ok = False
+                print(f"  ❌ 缺少必填参数也通过了: {arguments}")
+                continue
+            result = tools.call("sample_tool", arguments)
+        except ToolArgumentError as e:
+            if expected is not None:
+                ok = False
+                print(f"  ❌ {arguments} 被拒绝: {e}")
+            continue
+        if any(result[key] != value or type(result[key]) is not type(value) for key, value in expected.items()):
+            ok = False
+            print(f"  ❌ {arguments} → {result}")
+    for arguments in rejected:
+        try:
+            spec.validate(arguments)
+            ok = False
+            print(f"  ❌ 应被拒绝: {arguments}")
+        except ToolArgumentError as e:
+            print(f"  拒绝 {arguments}: {e}")
+    return ok
+
+
+def test_input_schemas():
+    """每个注册工具生成的 input_schema；参数说明取自文档的 Args 段落"""
+    print("🧪 测试生成的 input_schema")
+    ok = registry.names() == list(EXPECTED_SCHEMAS)
+    for name, (properties, required) in EXPECTED_SCHEMAS.items():
+        schema = registry.get(name).input_schema
+        got = {key: {k: v for k, v in value.items() if k != "description"}
+               for key, value in schema["properties"].items()}
+        if got != properties or schema.get("required") != required or schema["type"] != "object":
+            ok = False
+            print(f"  ❌ {name}: {schema}")
+
+    sample = ToolRegistry().register(sample_tool, defaults={"ratio": 0.25})
+    descriptions = {key: value.get("description") for key, value in sample.input_schema["properties"].items()}
+    print(f"  {len(EXPECTED_SCHEMAS)} 个工具; 测试工具描述: {sample.description!r}, 参数说明: {descriptions}")
+    return (ok and sample.description == "测试用工具"
+            and descriptions == {"name": "名称", "limit": "最多条数", "ratio": None, "strict": None,
+                                 "tags": None, "lines": None, "note": None}
+            and sample.input_schema["properties"]["ratio"]["default"] == 0.25)
+
+
+def _json_types(schema):
+    """FastMCP（pydantic）的 anyOf 写法 → 类型集合"""
+    if "anyOf" in schema:
+        return {t for option in schema["anyOf"] for t in _json_types(option)}
+    types = schema.get("type", [])
+    return set(types if isinstance(types, list) else [types])
+
+
+def test_servers_list_tools():
+    """运维 / 监控 /tools/list 与注册表一致，Infra（FastMCP）的参数与注册表一致；错误码映射"""
+    print("🧪 测试各服务器的 /tools/list")
+    import ops_mcp_server_fixed
+    import monitor_mcp_server_fixed
+    import infra_server
+
+    listings = {}
+    ok = True
+    for server, module in (("ops", ops_mcp_server_fixed), ("monitor", monitor_mcp_server_fixed)):
+        client = TestClient(module.app)
+        listing = client.get("/tools/list").json()["tools"]
+        listings[server] = {tool["name"]: tool for tool in listing}
+        expected = registry.for_server(server).list_tools()
+        root_names = client.get("/").json()["tools"]
+        print(f"  {server}: {[tool['name'] for tool in listing]}")
+        ok = ok and listing == expected and root_names == [tool["name"] for tool in expected]
+
+        missing = client.post("/tools/call", json={"tool_name": "no_such_tool", "arguments": {}})
+        bad_arg = client.post("/tools/call", json={"tool_name": "get_nginx_servers", "arguments": {"x": 1}})
+        bad_body = client.post("/tools/call_batch", json=[1, 2])
+        ok = ok and (missing.status_code, bad_arg.status_code, bad_body.status_code) == (404, 422, 422)
+
+    # 两个服务器都提供的工具，描述和 schema 完全相同
+    shared = set(listings["ops"]) & set(listings["monitor"])
+    ok = ok and shared == {"get_nginx_servers"}
+    ok = ok and all(listings["ops"][name] == listings["monitor"][name] for name in shared)
+
+    infra_tools = asyncio.run(infra_server.server.list_tools())
+    print(f"  infra: {[tool.name for tool in infra_tools]}")
+    expected_infra = registry.for_server("infra")
+    ok = ok and [tool.name for tool in infra_tools] == expected_infra.names()
+    for tool in infra_tools:
+        spec = expected_infra.get(tool.name)
+        properties = tool.inputSchema.get("properties", {})
+        same = (tool.description == spec.description
+                and sorted(tool.inputSchema.get("required", [])) == sorted(spec.input_schema.get("required", []))
+                and list(properties) == list(spec.input_schema["properties"]))
+        for key, value in spec.input_schema["properties"].items():
+            same = same and _json_types(properties[key]) == set(
+                value["type"] if isinstance(value["type"], list) else [value["type"]])
+            same = same and properties[key].get("default") == value.get("default")
+        if not same:
+            ok = False
+            print(f"  ❌ infra {tool.name}: {tool.inputSchema}")
+        # 运维服务器也提供的工具，描述一致
+        if tool.name in listings["ops"]:
+            ok = ok and listings["ops"][tool.name]["description"] == tool.description
+    return ok
+
+
+def main():
+    tests = [
+        ("参数校验", test_argument_validation),
+        ("生成的 input_schema", test_input_schemas),
+        ("各服务器的 /tools/list", test_servers_list_tools),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+MCP HTTP 服务器共用的工具调用逻辑 - 请求模型、分发、批量调用、响应编码
+
+运维 / 监控服务器的 /tools/call 和 /tools/call_batch 都走这里，
+错误码映射（404 工具不存在、422 参数 / 游标无效）和列式 / msgpack 编码在两个服务器上保持一致。
+"""
+import sys
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+import log_columnar
+from log_pagination import InvalidCursorError
+from tool_registry import registry, UnknownToolError, ToolArgumentError
+
+
+class ToolCallRequest(BaseModel):
+    tool_name: str
+    arguments: Optional[Dict[str, Any]] = None
+    # "columnar" 表示客户端接受列式日志格式（见 log_columnar.py）
+    format: Optional[str] = None
+
+
+class ToolCallBatchRequest(BaseModel):
+    # 每一项是 {"tool_name": ..., "arguments": {...}}；不在这里做整体校验，
+    # 单项格式错误只让该项返回错误，不影响其它项
+    calls: List[Any]
+    format: Optional[str] = None
+
+
+# 服务器名 → 该服务器的工具视图（进程池的子进程里也按服务器名取）
+_server_tools = {}
+
+
+def server_tools(server: str):
+    tools = _server_tools.get(server)
+    if tools is None:
+        tools = _server_tools[server] = registry.for_server(server)
+    return tools
+
+
+def dispatch_tool(server: str, tool_name: str, arguments: dict, columnar: bool = False):
+    """
+    按工具名分发到注册表中的原始函数（同步执行，由 tool_executor 调用）
+
+    columnar=True 时日志记录列表在这里编码为列式格式，编码也在执行器里完成，不占用事件循环
+    """
+    try:
+        result = server_tools(server).call(tool_name, arguments)
+    except UnknownToolError:
+        raise HTTPException(status_code=404, detail=f"工具 '{tool_name}' 不存在")
+    except (ToolArgumentError, InvalidCursorError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return log_columnar.maybe_encode(result) if columnar else result
+
+
+async def run_tool(executor, server: str, tool_name: str, arguments: dict, columnar: bool = False):
+    """在 tool_executor 中执行工具；不存在的工具直接返回 404，不占用执行器"""
+    if tool_name not in server_tools(server):
+        raise HTTPException(status_code=404, detail=f"工具 '{tool_name}' 不存在")
+    return await executor.run(tool_name, dispatch_tool, server, tool_name, arguments, columnar)
+
+
+async def run_batch_item(executor, server: str, call: Any, columnar: bool = False):
+    """执行批量请求中的一项，异常转换为该项自己的错误结果"""
+    tool_name = call.get("tool_name") if isinstance(call, dict) else None
+    if not tool_name or not isinstance(tool_name, str):
+        return {"error": "每一项都需要包含 tool_name", "status": 400}
+    try:
+        return {"result": await run_tool(executor, server, tool_name, call.get("arguments") or {}, columnar)}
+    except HTTPException as e:
+        return {"error": e.detail, "status": e.status_code}
+    except Exception as e:
+        print(f"[ERROR] 批量调用中的工具 {tool_name} 失败: {e}", file=sys.stderr)
+        return {"error": str(e), "status": 500}
+
+
+async def call_tool(executor, server: str, call: ToolCallRequest, request: Request):
+    """/tools/call：执行单个工具，返回 {"result": ...}"""
+    print(f"[DEBUG] 调用工具: {call.tool_name}, 参数: {call.arguments}", file=sys.stderr)
+    try:
+        result = await run_tool(executor, server, call.tool_name, call.arguments or {},
+                                call.format == "columnar")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[ERROR] 工具调用失败: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail=str(e))
+    return encode_response({"result": result}, request)
+
+
+async def call_tool_batch(executor, server: str, batch: ToolCallBatchRequest, request: Request,
+                          max_batch_size: int):
+    """/tools/call_batch：各项并发执行，结果按请求顺序返回 {"results": [...]}"""
+    calls = batch.calls
+    if len(calls) > max_batch_size:
+        raise HTTPException(status_code=400, detail=f"单次批量调用最多 {max_batch_size} 个工具")
+
+    print(f"[DEBUG] 批量调用 {len(calls)} 个工具", file=sys.stderr)
+    columnar = batch.format == "columnar"
+    results = await asyncio.gather(*(run_batch_item(executor, server, call, columnar) for call in calls))
+    return encode_response({"results": results}, request)
+
+
+def encode_response(payload: dict, request: Request):
+    """Accept 中包含 msgpack 且服务器装了 msgpack 时用 msgpack 返回，否则照常返回（FastAPI 输出紧凑 JSON）"""
+    if log_columnar.MSGPACK_MEDIA_TYPE in request.headers.get("accept", ""):
+        body = log_columnar.pack(payload)
+        if body is not None:
+            return Response(content=body, media_type=log_columnar.MSGPACK_MEDIA_TYPE)
+    return payload
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+MCP 服务器工具执行器 - 把同步的工具函数放到事件循环之外执行
+
+mock_tools 里的 *_raw 函数都是同步阻塞的（文件读取、chardet、os.walk ...），
+直接在 async 端点里调用会卡住整个 uvicorn 工作进程上的所有并发请求。
+执行器把它们交给有界的线程池或进程池，并按工具名限制并发数。
+
+环境变量：
+    MCP_TOOL_EXECUTOR=thread|process|inline   执行方式，默认 thread（inline 为旧的直接调用）
+    MCP_TOOL_WORKERS=16                       线程池 / 进程池大小
+    MCP_TOOL_CONCURRENCY=8                    每个工具默认的最大并发数（0 表示不限制）
+    MCP_TOOL_LIMITS=search_code_in_repository=2,get_code_context=4
+                                              按工具单独设置最大并发数
+"""
+import os
+import sys
+import asyncio
+import functools
+import concurrent.futures
+from typing import Any, Callable, Dict
+
+from tool_tracing import bind_context, trace_context, current_agent, current_task, current_run
+
+EXECUTOR_MODES = ("thread", "process", "inline")
+
+
+def _parse_limits(text: str) -> Dict[str, int]:
+    """解析 "tool_a=2,tool_b=4" 形式的并发限制"""
+    limits = {}
+    for item in (text or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        try:
+            limits[name.strip()] = int(value)
+        except ValueError:
+            print(f"[警告] 忽略无效的并发限制配置: {item}", file=sys.stderr)
+    return limits
+
+
+class _ToolHTTPError(Exception):
+    """进程池中抛出的 HTTPException 无法 pickle，先转成这个异常带回主进程"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _run_in_process(func: Callable, args: tuple, agent: str, task: str, run_id: str):
+    """进程池中的入口：还原追踪上下文后执行工具函数"""
+    with trace_context(agent, task, run_id):
+        try:
+            return func(*args)
+        except Exception as e:
+            if hasattr(e, "status_code") and hasattr(e, "detail"):
+                raise _ToolHTTPError(e.status_code, e.detail) from None
+            raise
+
+
+class ToolExecutor:
+    """按工具名限流、在线程池 / 进程池中执行同步工具函数"""
+
+    def __init__(self, mode: str = None, workers: int = None, default_limit: int = None,
+                 limits: Dict[str, int] = None):
+        self.mode = (mode or os.environ.get("MCP_TOOL_EXECUTOR", "thread")).lower()
+        if self.mode not in EXECUTOR_MODES:
+            print(f"[警告] 未知的 MCP_TOOL_EXECUTOR={self.mode}，改用 thread", file=sys.stderr)
+            self.mode = "thread"
+        self.workers = workers or int(os.environ.get("MCP_TOOL_WORKERS", "16"))
+        if default_limit is None:
+            default_limit = int(os.environ.get("MCP_TOOL_CONCURRENCY", "8"))
+        self.default_limit = default_limit
+        self.limits = limits if limits is not None else _parse_limits(os.environ.get("MCP_TOOL_LIMITS", ""))
+
+        self._pool = None
+        # asyncio.Semaphore 绑定在事件循环上，首次使用时在端点所在的循环里创建
+        self._semaphores = {}
+
+    def _get_pool(self) -> concurrent.futures.Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="mcp-tool")
+        return self._pool
+
+    def _get_semaphore(self, tool_name: str):
+        limit = self.limits.get(tool_name, self.default_limit)
+        if limit <= 0:
+            return None
+        semaphore = self._semaphores.get(tool_name)
+        if semaphore is None:
+            semaphore = self._semaphores[tool_name] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def run(self, tool_name: str, func: Callable, *args):
+        """在执行器中运行 func(*args)；同一工具的并发数超过上限时在这里排队"""
+        if self.mode == "inline":
+            return func(*args)
+
+        semaphore = self._get_semaphore(tool_name)
+        if semaphore is None:
+            return await self._submit(func, args)
+        async with semaphore:
+            return await self._submit(func, args)
+
+    async def _submit(self, func: Callable, args: tuple):
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            return await loop.run_in_executor(self._get_pool(), functools.partial(bind_context(func), *args))
+
+        try:
+            return await loop.run_in_executor(
+                self._get_pool(), _run_in_process, func, args,
+                current_agent.get(), current_task.get(), current_run.get())
+        except _ToolHTTPError as e:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    def describe(self) -> Dict[str, Any]:
+        """当前配置，供 /health 展示"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "default_limit": self.default_limit,
+            "limits": self.limits,
+        }
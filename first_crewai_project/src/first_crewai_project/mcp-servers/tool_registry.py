@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+MCP 工具注册表 - 运维 / 监控 / Infra 三个服务器共用的唯一工具清单
+
+启动时根据 mock_tools 中 *_raw 函数的签名和类型注解生成一次 JSON Schema，
+并为每个参数预编译校验函数；请求到来时按工具名在字典里 O(1) 查找，
+只做预编译的参数校验，不再做任何反射。
+
+新增工具只需要在 build_registry() 里加一条 register()，
+/tools/list、根端点的工具名、分发逻辑和 FastMCP 注册都会自动同步。
+"""
+import sys
+import json
+import inspect
+import typing
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+_NoneType = type(None)
+
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    dict: "object",
+    list: "array",
+    tuple: "array",
+}
+
+
+class UnknownToolError(KeyError):
+    """请求的工具不存在"""
+
+
+class ToolArgumentError(ValueError):
+    """工具参数没有通过校验"""
+
+
+# ================== 类型注解 → JSON Schema ==================
+
+def _schema_for(annotation) -> Dict[str, Any]:
+    """把类型注解转换成 JSON Schema（不认识的类型不做限制）"""
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return {}
+    origin = typing.get_origin(annotation)
+    if origin is Union:
+        schemas = [_schema_for(arg) for arg in typing.get_args(annotation)]
+        if any(not schema for schema in schemas):
+            return {}
+        types = []
+        items = None
+        for schema in schemas:
+            for json_type in _as_list(schema["type"]):
+                if json_type not in types:
+                    types.append(json_type)
+            items = items or schema.get("items")
+        schema = {"type": types[0] if len(types) == 1 else types}
+        if items:
+            schema["items"] = items
+        return schema
+    if annotation is _NoneType:
+        return {"type": "null"}
+    if origin in (list, List, tuple, Tuple):
+        schema = {"type": "array"}
+        args = [arg for arg in typing.get_args(annotation) if arg is not Ellipsis]
+        if len(args) == 1 and _schema_for(args[0]):
+            schema["items"] = _schema_for(args[0])
+        return schema
+    if origin in (dict, Dict):
+        return {"type": "object"}
+    json_type = _JSON_TYPES.get(annotation)
+    return {"type": json_type} if json_type else {}
+
+
+def _as_list(value) -> List[str]:
+    return value if isinstance(value, list) else [value]
+
+
+def _with_null(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """默认值为 None 的参数允许传 null"""
+    if not schema or "null" in _as_list(schema["type"]):
+        return schema
+    return {**schema, "type": _as_list(schema["type"]) + ["null"]}
+
+
+# ================== 预编译的参数校验 ==================
+
+def _compile_checker(name: str, schema: Dict[str, Any]) -> Callable[[Any], Any]:
+    """
+    根据参数的 JSON Schema 生成校验函数：通过时返回（必要时做了数字转换的）值，否则抛 ToolArgumentError
+
+    智能体经常把数字当字符串传（"50"），integer / number 参数接受可以无损转换的数字字符串
+    """
+    if not schema:
+        return lambda value: value
+
+    types = _as_list(schema["type"])
+    item_checker = _compile_checker(f"{name}[]", schema["items"]) if "items" in schema else None
+
+    def check(value):
+        if value is None:
+            if "null" in types:
+                return None
+        elif isinstance(value, bool):
+            if "boolean" in types:
+                return value
+        elif isinstance(value, int):
+            if "integer" in types:
+                return value
+            if "number" in types:
+                return float(value)
+        elif isinstance(value, float):
+            if "number" in types:
+                return value
+            if "integer" in types and value.is_integer():
+                return int(value)
+        elif isinstance(value, str):
+            if "string" in types:
+                return value
+            for json_type, convert in (("integer", int), ("number", float)):
+                if json_type in types:
+                    try:
+                        return convert(value.strip())
+                    except ValueError:
+                        pass
+        elif isinstance(value, (list, tuple)):
+            if "array" in types:
+                return [item_checker(item) for item in value] if item_checker else list(value)
+        elif isinstance(value, dict):
+            if "object" in types:
+                return value
+        raise ToolArgumentError(
+            f"参数 {name} 的类型应为 {'/'.join(types)}，实际为 {type(value).__name__}: {str(value)[:50]}")
+
+    return check
+
+
+class ToolSpec:
+    """一个已注册的工具：原始函数 + 启动时生成的 schema 和参数校验器"""
+
+    __slots__ = ("name", "func", "description", "servers", "input_schema", "signature",
+                 "_checkers", "_required", "_defaults", "_accepts_extra", "_adapter")
+
+    def __init__(self, name: str, func: Callable, description: str, servers: Tuple[str, ...],
+                 defaults: Dict[str, Any], adapter: Optional[Callable[[Any], Any]]):
+        self.name = name
+        self.func = func
+        self.description = description
+        self.servers = servers
+        self._adapter = adapter
+
+        # inspect.signature 会沿着 @traced 的 __wrapped__ 找到原始函数的签名
+        signature = inspect.signature(func)
+        hints = typing.get_type_hints(inspect.unwrap(func))
+        docs = _param_descriptions(func)
+        properties = {}
+        required = []
+        parameters = []
+        self._checkers = {}
+        self._defaults = {}
+        self._accepts_extra = False
+
+        for param in signature.parameters.values():
+            if param.kind is param.VAR_KEYWORD:
+                self._accepts_extra = True
+                continue
+            if param.kind is param.VAR_POSITIONAL:
+                continue
+
+            annotation = hints.get(param.name, param.annotation)
+            schema = _schema_for(annotation)
+            default = defaults.get(param.name, param.default)
+            if default is param.empty:
+                required.append(param.name)
+            else:
+                if default is None:
+                    schema = _with_null(schema)
+                elif _is_json_value(default):
+                    schema = {**schema, "default": default}
+                if param.name in defaults:
+                    self._defaults[param.name] = default
+
+            self._checkers[param.name] = _compile_checker(param.name, schema)
+            if param.name in docs:
+                schema = {**schema, "description": docs[param.name]}
+            properties[param.name] = schema
+            if default is None and annotation not in (param.empty, Any):
+                # 与 schema 一致：默认值为 None 的参数允许传 null（FastMCP 按签名生成的参数模型也要接受）
+                annotation = Optional[annotation]
+            parameters.append(param.replace(annotation=annotation, default=default,
+                                            kind=inspect.Parameter.KEYWORD_ONLY))
+
+        self._required = tuple(required)
+        self.input_schema = {"type": "object", "properties": properties}
+        if required:
+            self.input_schema["required"] = required
+        # 对外暴露的签名（不带返回值注解、没有 **kwargs），FastMCP 用它生成自己的参数模型
+        self.signature = inspect.Signature(parameters)
+
+    def validate(self, arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """校验并规范化参数，返回可直接 **kwargs 调用的字典"""
+        arguments = arguments or {}
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError(f"工具 '{self.name}' 的参数必须是对象")
+
+        kwargs = dict(self._defaults)
+        for key, value in arguments.items():
+            if value is None and key not in self._required:
+                # 可选参数传 null 等同于不传，使用函数默认值
+                continue
+            checker = self._checkers.get(key)
+            if checker is None:
+                if not self._accepts_extra:
+                    raise ToolArgumentError(
+                        f"工具 '{self.name}' 不支持参数 {key}，可用参数: {', '.join(self._checkers)}")
+                kwargs[key] = value
+            else:
+                kwargs[key] = checker(value)
+
+        missing = [key for key in self._required if kwargs.get(key) is None]
+        if missing:
+            raise ToolArgumentError(f"工具 '{self.name}' 缺少必填参数: {', '.join(missing)}")
+        return kwargs
+
+    def invoke(self, arguments: Optional[Dict[str, Any]] = None):
+        """校验参数后调用原始函数"""
+        result = self.func(**self.validate(arguments))
+        return self._adapter(result) if self._adapter else result
+
+    def describe(self) -> Dict[str, Any]:
+        """/tools/list 中的一项"""
+        return {"name": self.name, "description": self.description, "inputSchema": self.input_schema}
+
+
+def _is_json_value(value) -> bool:
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _param_descriptions(func: Callable) -> Dict[str, str]:
+    """从文档的 Args: 段落提取参数说明（"name: 说明" 每行一个）"""
+    doc = inspect.getdoc(inspect.unwrap(func)) or ""
+    descriptions = {}
+    in_args = False
+    for line in doc.splitlines():
+        stripped = line.strip()
+        if stripped in ("Args:", "参数:", "参数："):
+            in_args = True
+        elif in_args:
+            if not stripped or not line.startswith((" ", "\t")):
+                break
+            name, sep, text = stripped.partition(":")
+            if sep and name.isidentifier():
+                descriptions[name] = text.strip()
+    return descriptions
+
+
+def _first_paragraph(func: Callable) -> str:
+    doc = inspect.getdoc(inspect.unwrap(func)) or ""
+    return doc.split("\n\n")[0].replace("\n", " ").strip()
+
+
+class ToolRegistry:
+    """工具名 → ToolSpec 的字典；每个服务器取自己的视图"""
+
+    def __init__(self, specs: Dict[str, ToolSpec] = None):
+        self._specs = dict(specs or {})
+        self._listing = None
+
+    def register(self, func: Callable, name: str = None, description: str = None,
+                 servers: Tuple[str, ...] = (), defaults: Dict[str, Any] = None,
+                 adapter: Callable[[Any], Any] = None) -> ToolSpec:
+        """
+        注册一个原始函数
+
+        name 默认为去掉 _raw 后缀的函数名；description 默认取函数文档的第一段；
+        servers 为提供该工具的服务器；defaults 覆盖函数签名中的默认值；
+        adapter 对原始函数的返回值做转换（如只取 (logs, cursor) 中的 logs）
+        """
+        raw_name = inspect.unwrap(func).__name__
+        name = name or (raw_name[:-4] if raw_name.endswith("_raw") else raw_name)
+        spec = ToolSpec(name, func, description or _first_paragraph(func), tuple(servers),
+                        defaults or {}, adapter)
+        self._specs[name] = spec
+        self._listing = None
+        return spec
+
+    def for_server(self, server: str) -> "ToolRegistry":
+        """只包含某个服务器所提供工具的视图"""
+        return ToolRegistry({name: spec for name, spec in self._specs.items() if server in spec.servers})
+
+    def get(self, name: str) -> ToolSpec:
+        spec = self._specs.get(name)
+        if spec is None:
+            raise UnknownToolError(f"工具 '{name}' 不存在")
+        return spec
+
+    def call(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        return self.get(name).invoke(arguments)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        """/tools/list 的内容，生成一次后缓存"""
+        if self._listing is None:
+            self._listing = [spec.describe() for spec in self._specs.values()]
+        return self._listing
+
+    def add_to_fastmcp(self, server):
+        """把视图中的所有工具注册到 FastMCP 服务器"""
+        for spec in self._specs.values():
+            server.add_tool(_fastmcp_handler(spec), name=spec.name, description=spec.description)
+        return server
+
+
+def _fastmcp_handler(spec: ToolSpec) -> Callable:
+    """为 FastMCP 生成一个带原始函数签名的处理函数（FastMCP 根据签名生成参数模型）"""
+    def handler(**arguments):
+        return spec.invoke(arguments)
+
+    handler.__name__ = spec.name
+    handler.__doc__ = spec.description
+    handler.__signature__ = spec.signature
+    handler.__annotations__ = {param.name: param.annotation for param in spec.signature.parameters.values()
+                               if param.annotation is not inspect.Parameter.empty}
+    return handler
+
+
+# ================== 工具清单 ==================
+
+def _mysql_page(result):
+    """get_mysql_logs_simple_raw 返回 (logs, next_start_time)，HTTP 接口返回 {"logs": [...], "next_start_time": ...}"""
+    from log_pagination import paged_result
+    return paged_result(result, cursor_field="next_start_time")
+
+
+def _paged_logs(result):
+    """Nginx / Redis 日志工具返回 (logs, next_cursor)，HTTP 接口返回 {"logs": [...], "next_cursor": ...}"""
+    from log_pagination import paged_result
+    return paged_result(result)
+
+
+def build_registry() -> ToolRegistry:
+    """注册所有工具；servers 指明由哪些 MCP 服务器提供"""
+    from mock_tools import (
+        get_nginx_servers_raw,
+        get_server_logs_simple_raw,
+        get_nginx_log_stats_raw,
+        get_mysql_logs_simple_raw,
+        mysql_runtime_diagnosis_raw,
+        get_redis_logs_simple_raw,
+        get_server_metrics_simple_raw,
+        search_code_in_repository_raw,
+        search_code_content_raw,
+        get_code_context_raw,
+        analyze_code_pattern_raw,
+    )
+
+    registry = ToolRegistry()
+    registry.register(get_nginx_servers_raw, servers=("ops", "monitor", "infra"))
+    registry.register(get_server_logs_simple_raw, servers=("ops", "infra"), adapter=_paged_logs,
+                      description="获取指定服务器的Nginx日志（UnifiedLogV1 格式），按游标分页："
+                                  "返回的 next_cursor 不为空时带上它再次调用获取下一页。")
+    registry.register(get_nginx_log_stats_raw, servers=("ops", "infra"))
+    registry.register(get_mysql_logs_simple_raw, servers=("ops", "infra"), adapter=_mysql_page,
+                      description="获取指定服务器的MySQL日志（UnifiedLogV1 格式），按时间升序最多返回 limit 条："
+                                  "返回的 next_start_time 不为空时，把它作为 start_time 再次调用获取下一页。")
+    registry.register(mysql_runtime_diagnosis_raw, servers=("ops", "infra"))
+    registry.register(get_redis_logs_simple_raw, servers=("ops", "infra"), adapter=_paged_logs)
+    registry.register(
+        get_server_metrics_simple_raw, servers=("monitor", "infra"),
+        description="获取服务器性能指标。支持单个指标、多个指标或全部指标。常见指标别名：cpu_usage->cpu_percent, "
+                    "memory_usage->memory_percent, request_success_rate->success_rate, avg_latency->avg_latency_ms",
+    )
+    registry.register(search_code_in_repository_raw, servers=("ops",))
+    registry.register(search_code_content_raw, servers=("ops",))
+    registry.register(get_code_context_raw, servers=("ops",))
+    # 与旧的 /tools/call 一致：不传 code_snippet 时按空字符串处理
+    registry.register(analyze_code_pattern_raw, servers=("ops",), defaults={"code_snippet": ""})
+
+    print(f"✅ 工具注册表: {len(registry.names())} 个工具", file=sys.stderr)
+    return registry
+
+
+registry = build_registry()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+大文件取代码上下文基准测试：整份 chardet + 解码（原 get_code_context）vs 按样本检测编码 + 流式读取
+
+离线测试：在临时目录生成一个大的 Python 文件（默认 100MB，GBK 编码的中文注释），
+分别用两种写法取第 1-50 行和文件中部的 50 行，校验内容一致后输出耗时。
+
+用法：
+    python tools/bench_code_context.py --size-mb 100
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import chardet
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from source_cache import SourceCache
+
+
+def make_file(path: str, size_mb: int) -> int:
+    block = "".join(f"def handler_{i}(request):\n    # 处理数据请求 {i}\n    return query(request, timeout={i % 30})\n\n"
+                    for i in range(1000)).encode("gbk")
+    blocks = size_mb * 1024 * 1024 // len(block) + 1
+    with open(path, "wb") as f:
+        for _ in range(blocks):
+            f.write(block)
+    return blocks * 4000
+
+
+def legacy_lines(path: str, line_start: int, line_end: int):
+    """原 get_code_context 的读取方式"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    info = chardet.detect(raw)
+    encoding = info["encoding"] if info["encoding"] and info["confidence"] >= 0.5 else "gbk"
+    lines = raw.decode(encoding).splitlines()
+    return tuple(lines[line_start - 1:line_end])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大文件取代码上下文基准测试")
+    parser.add_argument("--size-mb", type=int, default=100, help="生成文件大小（MB）")
+    parser.add_argument("--skip-legacy", action="store_true", help="不运行原写法（它整份读取、解码文件，文件很大时很慢）")
+    args = parser.parse_args()
+
+    # chardet 第一次调用时加载模型（约 80ms），不计入任何一种写法
+    chardet.detect("预热".encode("gbk"))
+    root = tempfile.mkdtemp(prefix="code_context_bench_")
+    try:
+        path = os.path.join(root, "generated.py")
+        total = make_file(path, args.size_mb)
+        print(f"📊 {os.path.getsize(path) / 1024 / 1024:.0f}MB, {total} 行")
+        print(f"  {'行段':<18}{'原写法 s':>10}{'流式 ms':>10}")
+        middle = total // 2
+        for line_start, line_end in ((1, 50), (middle, middle + 49)):
+            cache = SourceCache()
+            start = time.perf_counter()
+            window = cache.read_lines(path, line_start, line_end)
+            streamed = time.perf_counter() - start
+            legacy = float("nan")
+            if not args.skip_legacy:
+                start = time.perf_counter()
+                expected = legacy_lines(path, line_start, line_end)
+                legacy = time.perf_counter() - start
+                if window.lines != expected:
+                    raise AssertionError(f"第 {line_start}-{line_end} 行与原写法不一致")
+            print(f"  {f'{line_start}-{line_end}':<18}{legacy:>10.2f}{streamed * 1000:>10.1f}")
+        print("✅ 两种写法内容一致" if not args.skip_legacy else "✅ 完成")
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+代码文件搜索基准测试：每次查询 os.walk（原 search_with_patterns）vs 常驻内存的 CodeIndex
+
+离线测试：在临时目录生成一个大仓库（默认 100000 个 .py 文件），分别用两种写法执行
+关键词查询和 glob 查询，校验结果集合一致后输出每次查询的耗时，以及索引的首次构建 / 无变化刷新耗时。
+
+用法：
+    python tools/bench_code_index.py --files 100000
+"""
+import os
+import sys
+import time
+import shutil
+import fnmatch
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from code_index import CodeIndex
+
+MODULES = ["billing", "orders", "users", "inventory", "search", "payments", "notify", "reports"]
+LAYERS = ["api", "controllers", "services", "models", "utils", "tests"]
+QUERIES = [("keyword", "payment"), ("keyword", "redis_client"), ("keyword", "v2/data"),
+           ("glob", "order_controller_1*.py"), ("glob", "services/orders/*/*.py")]
+
+
+def make_tree(root: str, count: int):
+    per_dir = 50
+    for i in range(count):
+        directory = os.path.join(root, LAYERS[i // per_dir % len(LAYERS)], MODULES[i % len(MODULES)],
+                                 f"pkg{i // (per_dir * len(LAYERS))}")
+        if i % per_dir == 0 or not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        name = ["data", "redis_client", "handler", "order_controller", "payment_service"][i % 5]
+        open(os.path.join(directory, f"{name}_{i}.py"), "w").close()
+    os.makedirs(os.path.join(root, "api", "v2"), exist_ok=True)
+    open(os.path.join(root, "api", "v2", "data.py"), "w").close()
+
+
+def legacy_search(root: str, kind: str, value: str):
+    """原 search_with_patterns 的扫描方式（只保留匹配判断）"""
+    matched = set()
+    for current, dirs, files in os.walk(root):
+        for file in files:
+            if file.endswith(".py"):
+                rel_path = os.path.relpath(os.path.join(current, file), root).replace("\\", "/")
+                if kind == "keyword":
+                    if value.lower() in file.lower() or value.lower() in rel_path.lower() or value in rel_path:
+                        matched.add(rel_path)
+                elif fnmatch.fnmatch(file, value) or fnmatch.fnmatch(rel_path, value):
+                    matched.add(rel_path)
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代码文件搜索基准测试")
+    parser.add_argument("--files", type=int, default=100_000, help="生成的文件数")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="code_index_bench_")
+    try:
+        make_tree(root, args.files)
+        # 查询计时不含按需刷新，刷新耗时单独输出
+        index = CodeIndex(root, refresh_interval=3600)
+        start = time.perf_counter()
+        index.refresh(force=True)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        index.refresh(force=True)
+        recheck = time.perf_counter() - start
+        print(f"📊 {len(index)} 个文件：首次构建 {build:.2f}s，无变化增量刷新 {recheck * 1000:.1f}ms")
+        print(f"  {'查询':<34}{'os.walk ms':>12}{'索引 ms':>10}{'命中':>8}")
+
+        for kind, value in QUERIES:
+            start = time.perf_counter()
+            expected = legacy_search(root, kind, value)
+            legacy = time.perf_counter() - start
+            start = time.perf_counter()
+            results = index.search_keyword(value) if kind == "keyword" else index.search_glob(value)
+            indexed = time.perf_counter() - start
+            if {r["file_path"] for r in results} != expected:
+                raise AssertionError(f"{kind} {value!r} 的结果与 os.walk 不一致")
+            print(f"  {kind + ' ' + value:<34}{legacy * 1000:>12.1f}{indexed * 1000:>10.1f}{len(results):>8}")
+        print("✅ 两种写法结果集合一致")
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
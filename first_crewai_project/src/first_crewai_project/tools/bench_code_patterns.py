@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+代码模式分析基准测试：每次调用重建规则、未编译 re.finditer + 切片数换行（原 analyze_code_pattern）
+vs 导入时编译的 PatternLibrary（字面量预筛 + 换行位置表二分）
+
+离线测试：对 mock_codebase 下的每个文件重复执行分析（不指定 issue_type，即检查全部类型），
+校验两种写法的结果完全一致后输出耗时。--scales 把每个文件重复拼接成更大的片段，
+用来观察原写法行号计算的平方级开销。
+
+用法：
+    python tools/bench_code_patterns.py --rounds 200 --scales 1,20,100
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+os.environ.setdefault("TOOL_TRACE", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from code_patterns import PATTERN_RULES, pattern_library
+from code_index import get_code_index
+from source_cache import load_source
+from mock_tools import CODE_BASE_PATH
+
+
+def legacy_scan(code_snippet, issue_type=None):
+    """原 analyze_code_pattern 的检测部分（规则字典每次调用都重新构造）"""
+    patterns = {issue: list(rules) for issue, rules in PATTERN_RULES.items()}
+    findings = []
+    issue_types_to_check = [issue_type] if issue_type else patterns.keys()
+    for check_type in issue_types_to_check:
+        if check_type in patterns:
+            for pattern, description in patterns[check_type]:
+                for match in re.finditer(pattern, code_snippet, re.MULTILINE):
+                    findings.append({
+                        "issue_type": check_type,
+                        "line": code_snippet[:match.start()].count('\n') + 1,
+                        "pattern": pattern,
+                        "description": description,
+                        "matched_code": match.group(0).strip(),
+                        "severity": "high" if check_type in ["memory_leak", "deadlock"] else "medium"
+                    })
+    return findings
+
+
+def load_snippets():
+    snippets = []
+    index = get_code_index(CODE_BASE_PATH)
+    for rel_path in sorted(index.under()):
+        try:
+            snippets.append((rel_path, "\n".join(load_source(index.get(rel_path)).lines)))
+        except (OSError, UnicodeDecodeError, LookupError) as e:
+            print(f"  跳过 {rel_path}: {e}")
+    return snippets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代码模式分析基准测试")
+    parser.add_argument("--rounds", type=int, default=200, help="每个文件重复分析的次数")
+    parser.add_argument("--scales", default="1,20,100", help="每个文件重复拼接的倍数，逗号分隔")
+    args = parser.parse_args()
+
+    snippets = load_snippets()
+    print(f"📊 mock_codebase: {len(snippets)} 个文件，每个文件分析 {args.rounds} 次")
+    print(f"  {'倍数':<6}{'片段KB':>8}{'原写法 s':>10}{'模式库 s':>10}{'加速':>8}{'命中':>8}")
+
+    for scale in (int(value) for value in args.scales.split(",")):
+        codes = [code * scale for _, code in snippets]
+        rounds = max(1, args.rounds // scale)
+        for code in codes:
+            if pattern_library.scan(code) != legacy_scan(code):
+                raise AssertionError(f"{scale} 倍片段的结果与原写法不一致")
+            for issue_type in (*PATTERN_RULES, "unknown"):
+                if pattern_library.scan(code, [issue_type]) != legacy_scan(code, issue_type):
+                    raise AssertionError(f"{scale} 倍片段 issue_type={issue_type} 的结果与原写法不一致")
+
+        timings = []
+        for run in (legacy_scan, pattern_library.scan):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for code in codes:
+                    run(code)
+            timings.append(time.perf_counter() - start)
+        hits = sum(len(pattern_library.scan(code)) for code in codes)
+        size_kb = sum(len(code) for code in codes) / 1024
+        print(f"  {scale:<6}{size_kb:>8.0f}{timings[0]:>10.2f}{timings[1]:>10.2f}"
+              f"{timings[0] / timings[1]:>7.1f}x{hits:>8}")
+    print("✅ 两种写法结果一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+日志关键词过滤基准测试：逐关键词 lower() + in vs 编译好的 KeywordMatcher
+
+离线测试，不需要启动 MCP 服务器：用 generate_nginx_logs_for_server 生成日志，
+分别用 10 个和 50 个关键词过滤，校验两种写法过滤结果一致后输出每秒处理行数。
+
+用法：
+    python tools/bench_keyword_matcher.py --lines 1000000
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("TOOL_TRACE", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_data import generate_nginx_logs_for_server
+from keyword_matcher import get_matcher
+
+SERVERS = ["10.0.1.101", "10.0.1.102", "10.0.2.101", "10.0.2.102"]
+
+# 运维手册里常见的关键词；前几个在模拟日志里会命中，后面的大多不会
+RUNBOOK_KEYWORDS = [
+    "502", "504", "Python-urllib", "/api/v2/data.json", "timeout", "upstream", "refused", "reset by peer",
+    "no live upstreams", "overflow", "deadlock", "OOM", "killed", "segfault", "too many open files",
+    "certificate", "handshake", "SSL", "503", "499", "connection pool", "exhausted", "circuit breaker",
+    "retry", "rate limit", "throttl", "quota", "backlog", "queue full", "slow", "GC pause", "stall",
+    "broken pipe", "EOF", "ECONNRESET", "ETIMEDOUT", "EHOSTUNREACH", "DNS", "NXDOMAIN", "readonly",
+    "disk full", "No space", "permission denied", "forbidden", "unauthorized", "panic", "fatal",
+    "traceback", "exception", "stack overflow",
+]
+
+
+def generate_lines(count: int):
+    lines = []
+    while len(lines) < count:
+        for ip in SERVERS:
+            lines.extend(generate_nginx_logs_for_server(ip))
+    return lines[:count]
+
+
+def filter_legacy(lines, keywords):
+    return [log for log in lines if any(k.lower() in log.lower() for k in keywords)]
+
+
+def filter_matcher(lines, keywords):
+    matcher = get_matcher(keywords)
+    return [log for log in lines if matcher.search(log)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志关键词过滤基准测试")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="日志行数")
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines)
+    print(f"📊 {len(lines)} 行 Nginx 日志")
+    print(f"  {'关键词数':<8}{'写法':<22}{'耗时s':>8}{'行/秒':>14}{'命中行':>10}")
+
+    for size in (10, 50):
+        keywords = RUNBOOK_KEYWORDS[:size]
+        baseline = None
+        for name, run in (("any(k.lower() in ...)", filter_legacy), ("KeywordMatcher", filter_matcher)):
+            start = time.perf_counter()
+            matched = run(lines, keywords)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline = matched
+            elif matched != baseline:
+                raise AssertionError(f"{name} 的过滤结果与旧写法不一致（{size} 个关键词）")
+            print(f"  {size:<12}{name:<22}{elapsed:>8.2f}{len(lines) / elapsed:>14,.0f}{len(matched):>10}")
+    print("✅ 两种写法过滤结果一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+日志响应格式基准测试：行式 JSON vs 列式 JSON vs 列式 msgpack
+
+离线测试，不需要启动 MCP 服务器：用 mock_tools 生成一批 UnifiedLogV1 日志，
+比较各格式的响应字节数，以及服务器端编码、客户端解码（还原为记录列表）的耗时。
+
+用法：
+    python tools/bench_log_columnar.py --records 20000
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import contextlib
+
+os.environ.setdefault("TOOL_TRACE", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import log_columnar
+from mock_tools import get_mysql_logs_simple_raw, get_redis_logs_simple_raw, get_server_logs_simple_raw
+
+SERVERS = ["10.0.1.101", "10.0.1.102", "10.0.2.101", "10.0.2.102", "10.0.3.101"]
+
+
+def collect_records(count: int):
+    """反复调用日志工具，凑够 count 条记录（三种来源混合）"""
+    records = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        while len(records) < count:
+            for ip in SERVERS:
+                records.extend(get_server_logs_simple_raw(ip)[0])
+                records.extend(get_mysql_logs_simple_raw(ip)[0])
+                records.extend(get_redis_logs_simple_raw(ip)[0])
+    return records[:count]
+
+
+def _best_of(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志响应格式基准测试")
+    parser.add_argument("--records", type=int, default=20000, help="日志条数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数（取最好成绩）")
+    args = parser.parse_args()
+
+    records = collect_records(args.records)
+    print(f"📊 {len(records)} 条 UnifiedLogV1 日志")
+
+    formats = [
+        # 名称, 服务器端编码, 客户端解码（还原为记录列表）
+        ("行式 JSON（旧，indent=2）",
+         lambda: json.dumps({"result": records}, ensure_ascii=False, indent=2).encode("utf-8"),
+         lambda body: json.loads(body)["result"]),
+        ("行式 JSON（紧凑）",
+         lambda: json.dumps({"result": records}, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+         lambda body: json.loads(body)["result"]),
+        ("列式 JSON（紧凑）",
+         lambda: json.dumps({"result": log_columnar.encode_columnar(records)},
+                            ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+         lambda body: log_columnar.decode_columnar(json.loads(body)["result"])),
+    ]
+    if log_columnar.msgpack is not None:
+        formats.append((
+            "列式 msgpack",
+            lambda: log_columnar.pack({"result": log_columnar.encode_columnar(records)}),
+            lambda body: log_columnar.decode_columnar(log_columnar.unpack(body)["result"]),
+        ))
+    else:
+        print("⚠️  未安装 msgpack，跳过列式 msgpack")
+
+    baseline = None
+    print(f"  {'格式':<24}{'字节数':>12}{'相对大小':>10}{'编码ms':>10}{'解码ms':>10}")
+    for name, encode, decode in formats:
+        encode_ms, body = _best_of(encode, args.repeat)
+        decode_ms, decoded = _best_of(lambda: decode(body), args.repeat)
+        if decoded != records:
+            raise AssertionError(f"{name} 解码结果与原始记录不一致")
+        baseline = baseline or len(body)
+        print(f"  {name:<24}{len(body):>12}{len(body) / baseline:>10.2f}{encode_ms:>10.2f}{decode_ms:>10.2f}")
+    print("✅ 所有格式解码结果与原始记录一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
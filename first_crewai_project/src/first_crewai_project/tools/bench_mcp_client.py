@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+MCP 客户端调用开销基准测试：每次新建事件循环 + 新建会话 vs 常驻事件循环 + keep-alive 连接池
+
+需要先启动本地的 FastAPI MCP 服务器：
+    python mcp-servers/ops_mcp_server_fixed.py
+    python mcp-servers/monitor_mcp_server_fixed.py
+
+用法：
+    python tools/bench_mcp_client.py --calls 200 --tool get_nginx_servers
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+# 关闭工具调用追踪，避免写追踪文件影响计时
+os.environ.setdefault("TOOL_TRACE", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import aiohttp
+
+from mcp_client_tools import ops_client, monitor_client, _call_sync
+
+CLIENTS = {"ops": ops_client, "monitor": monitor_client}
+
+
+def legacy_call(base_url, tool_name, arguments):
+    """旧版调用方式：每次新建事件循环，每次新建 ClientSession（新 TCP 连接）"""
+    async def _call():
+        async with aiohttp.ClientSession() as session:
+            payload = {"tool_name": tool_name, "arguments": arguments}
+            async with session.post(f"{base_url}/tools/call", json=payload) as response:
+                result = await response.json()
+                return json.dumps(result.get("result", result), ensure_ascii=False, indent=2)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_call())
+    finally:
+        loop.close()
+
+
+def pooled_call(client, tool_name, arguments):
+    """新版调用方式：提交到常驻事件循环，复用 keep-alive 连接"""
+    return _call_sync(client, tool_name, arguments)
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run(label, func, calls, warmup=5):
+    for _ in range(warmup):
+        func()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        call_start = time.perf_counter()
+        result = func()
+        latencies.append((time.perf_counter() - call_start) * 1000)
+        if isinstance(result, dict) and "error" in result:
+            raise RuntimeError(f"{label} 调用失败: {result}")
+    total = time.perf_counter() - start
+    stats = {
+        "mean": sum(latencies) / len(latencies),
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": max(latencies),
+        "qps": calls / total,
+    }
+    print(f"  {label:<28} 平均 {stats['mean']:7.2f}ms  p50 {stats['p50']:7.2f}ms  "
+          f"p95 {stats['p95']:7.2f}ms  p99 {stats['p99']:7.2f}ms  max {stats['max']:7.2f}ms  {stats['qps']:8.1f} 次/秒")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP 客户端单次调用延迟基准测试")
+    parser.add_argument("--calls", type=int, default=200, help="每种方式的调用次数")
+    parser.add_argument("--server", choices=sorted(CLIENTS), default="ops", help="目标 MCP 服务器")
+    parser.add_argument("--tool", default="get_nginx_servers", help="调用的工具名")
+    parser.add_argument("--args", default="{}", help="工具参数（JSON）")
+    args = parser.parse_args()
+
+    client = CLIENTS[args.server]
+    arguments = json.loads(args.args)
+    base_url = client.base_url or f"http://localhost:{client.servers[args.server]['port']}"
+
+    # 工具内部会向 stderr 打印大量调试信息，基准测试期间屏蔽
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    try:
+        print(f"📊 {args.server} 服务器 {args.tool} × {args.calls} 次")
+        legacy = run("新建事件循环 + 新建会话", lambda: legacy_call(base_url, args.tool, arguments), args.calls)
+        pooled = run("常驻事件循环 + 连接池", lambda: pooled_call(client, args.tool, arguments), args.calls)
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    print(f"  单次调用平均节省 {legacy['mean'] - pooled['mean']:.2f}ms "
+          f"（{legacy['mean'] / pooled['mean']:.1f}x），p95 {legacy['p95']:.2f}ms → {pooled['p95']:.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Nginx 访问日志解析基准测试：逐字段正则 vs 按引号切分 vs 单次 combined 正则
+
+离线测试，不需要启动 MCP 服务器：反复调用 generate_nginx_logs_for_server 凑够 N 行日志，
+分别用三种方式解析，校验结果一致后输出每秒解析行数。
+
+- 旧实现：每行 4 次 re.search（方法+路径、状态码、响应时间、时间戳），正则在函数里临时写出
+- 按引号切分：line.split('"') 后按位置取字段，不做任何格式校验（速度上限参考，残缺行会出错）
+- NginxLogParser.parse_line：预编译的 combined 格式正则一次匹配取出全部字段（当前实现）
+
+用法：
+    python tools/bench_nginx_parser.py --lines 1000000
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+os.environ.setdefault("TOOL_TRACE", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_data import generate_nginx_logs_for_server
+from unified_log import UnifiedLogV1, get_parser
+
+SERVERS = ["10.0.1.101", "10.0.1.102", "10.0.2.101", "10.0.2.102"]
+SERVER_IP = "10.0.2.101"
+
+
+def generate_lines(count: int):
+    lines = []
+    while len(lines) < count:
+        for ip in SERVERS:
+            lines.extend(generate_nginx_logs_for_server(ip))
+    return lines[:count]
+
+
+def parse_legacy(line: str, server_ip: str) -> UnifiedLogV1:
+    """按字段逐个 re.search 的旧解析方式（对照组）"""
+    path_match = re.search(r'"(GET|POST)\s+([^\s?]+)', line)
+    method = path_match.group(1) if path_match else "UNKNOWN"
+    path = path_match.group(2) if path_match else "unknown"
+
+    status_match = re.search(r'"\s+(\d{3})\s+', line)
+    status_code = status_match.group(1) if status_match else "000"
+
+    rt_match = re.search(r'([\d.]+)$', line)
+    response_time = float(rt_match.group(1)) if rt_match else 0.0
+
+    time_match = re.search(r'\[(.*?)\]', line)
+    timestamp = time_match.group(1) if time_match else ""
+
+    return UnifiedLogV1("nginx", server_ip, timestamp, "ERROR" if int(status_code) >= 500 else "INFO",
+                        f"{method} {path}", status_code, response_time * 1000, line)
+
+
+def parse_split(line: str, server_ip: str) -> UnifiedLogV1:
+    """按双引号切分后按位置取字段（不校验格式，只适用于格式规整的行）"""
+    head, request, status_part, _, _, _, tail = line.split('"')
+    timestamp = head[head.index("[") + 1:head.index("]")]
+    method, _, rest = request.partition(" ")
+    path = rest.partition(" ")[0].split("?", 1)[0]
+    status_code = status_part[1:4]
+    return UnifiedLogV1("nginx", server_ip, timestamp, "ERROR" if int(status_code) >= 500 else "INFO",
+                        f"{method} {path}", status_code, float(tail) * 1000, line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nginx 访问日志解析基准测试")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="日志行数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lines = generate_lines(args.lines)
+    print(f"📊 {len(lines)} 行 Nginx 日志（生成耗时 {time.perf_counter() - start:.1f}s）")
+
+    nginx = get_parser("nginx")
+    candidates = [
+        ("逐字段 re.search（旧）", parse_legacy),
+        ("按引号切分", parse_split),
+        ("combined 正则 parse_line", nginx.parse_line),
+    ]
+
+    baseline_records = None
+    baseline_rate = None
+    print(f"  {'解析方式':<26}{'耗时s':>8}{'行/秒':>14}{'加速':>8}")
+    for name, parse in candidates:
+        start = time.perf_counter()
+        records = [parse(line, SERVER_IP) for line in lines]
+        elapsed = time.perf_counter() - start
+        rate = len(lines) / elapsed
+
+        if baseline_records is None:
+            baseline_records, baseline_rate = records, rate
+        elif records != baseline_records:
+            raise AssertionError(f"{name} 的解析结果与旧实现不一致")
+        print(f"  {name:<26}{elapsed:>8.2f}{rate:>14,.0f}{rate / baseline_rate:>7.2f}x")
+    print("✅ 所有解析方式结果一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
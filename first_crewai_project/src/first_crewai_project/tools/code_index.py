@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+代码仓库文件索引 - search_code_in_repository 不再每次查询都 os.walk 整个仓库
+
+索引只保存文件路径（不读文件内容），常驻内存：
+- 路径字典树：按目录逐级存放文件，目录前缀查询 / glob 的字面前缀（如 "app/api/*.py" 的 app/api）
+  只需要遍历对应子树；
+- 三元组倒排索引：小写相对路径（含文件名）的每个三字符片段 → 文件集合，关键词子串查询先取
+  各片段集合的交集作为候选，再逐个确认子串，结果与原来的 keyword.lower() in path.lower() 一致。
+
+增量刷新：记录每个目录的 mtime，目录里新增、删除、改名文件时它的 mtime 才会变；
+refresh() 只对 mtime 变化的目录重新 scandir，其余目录只 stat 一次。两次刷新之间至少间隔
+CODE_INDEX_REFRESH_SECONDS 秒（默认 2 秒），查询时按需触发。
+
+查询结果带 0 ~ 1 的相关度 score 并按 score 降序排列（完整路径 > 文件名 > 文件名前缀 >
+文件名子串 > 目录名 > 路径子串），confidence 由 score 换算，不再固定为 "medium"。
+"""
+import os
+import re
+import time
+import fnmatch
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# 两次增量刷新之间的最小间隔（秒）
+REFRESH_INTERVAL = float(os.environ.get("CODE_INDEX_REFRESH_SECONDS", "2"))
+GLOB_CHARS = "*?["
+_GLOB_SPECIAL = re.compile(r"\[[^\]]*\]|[*?]")
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def confidence_of(score: float) -> str:
+    if score >= 0.8:
+        return "high"
+    if score >= 0.6:
+        return "medium"
+    return "low"
+
+
+class _DirState:
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(self, mtime_ns: int):
+        self.mtime_ns = mtime_ns
+        self.files: Set[str] = set()
+        self.subdirs: Set[str] = set()
+
+
+class CodeIndex:
+    """某个代码根目录下（指定扩展名）文件的路径索引"""
+
+    def __init__(self, root: str, extensions: Tuple[str, ...] = (".py",), refresh_interval: float = REFRESH_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.extensions = extensions
+        self.refresh_interval = refresh_interval
+        self._files: Dict[str, str] = {}  # 相对路径 → 完整路径
+        self._dirs: Dict[str, _DirState] = {}  # 相对目录（根目录为 ""）→ 状态
+        self._trie: Dict[str, Any] = {}  # 目录名 → 子节点；文件记在子节点的 None 键下
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    # ---------------- 构建与增量刷新 ----------------
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        增量刷新索引；距上次刷新不足 refresh_interval 秒时直接返回（force=True 除外）
+
+        Returns:
+            是否有目录重新列过（有文件新增、删除或改名）
+        """
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return False
+        with self._lock:
+            changed = self._sync_dir("")
+            self._checked_at = time.monotonic()
+            return changed
+
+    def _sync_dir(self, rel_dir: str) -> bool:
+        full_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        try:
+            mtime_ns = os.stat(full_dir).st_mtime_ns
+        except OSError:
+            self._drop_dir(rel_dir)
+            return True
+
+        state = self._dirs.get(rel_dir)
+        if state is not None and state.mtime_ns == mtime_ns:
+            changed = False
+            for subdir in list(state.subdirs):
+                changed = self._sync_dir(subdir) or changed
+            return changed
+
+        # 新目录或目录内容变化：重新列目录
+        files, subdirs = set(), set()
+        try:
+            with os.scandir(full_dir) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.add(rel_path)
+                    elif entry.name.endswith(self.extensions):
+                        files.add(rel_path)
+        except OSError:
+            self._drop_dir(rel_dir)
+            return True
+
+        if state is None:
+            state = self._dirs[rel_dir] = _DirState(mtime_ns)
+        state.mtime_ns = mtime_ns
+        for rel_path in state.files - files:
+            self._remove_file(rel_path)
+        for rel_path in files - state.files:
+            self._add_file(rel_path)
+        for subdir in state.subdirs - subdirs:
+            self._drop_dir(subdir)
+        state.files, state.subdirs = files, subdirs
+        for subdir in subdirs:
+            self._sync_dir(subdir)
+        return True
+
+    def _drop_dir(self, rel_dir: str):
+        state = self._dirs.pop(rel_dir, None)
+        if state is None:
+            return
+        for rel_path in state.files:
+            self._remove_file(rel_path)
+        for subdir in state.subdirs:
+            self._drop_dir(subdir)
+
+    def _add_file(self, rel_path: str):
+        self._files[rel_path] = os.path.join(self.root, rel_path)
+        *dirs, name = rel_path.split("/")
+        node = self._trie
+        for part in dirs:
+            node = node.setdefault(part, {})
+        node.setdefault(None, set()).add(name)
+        for gram in trigrams(rel_path.lower()):
+            self._trigrams.setdefault(gram, set()).add(rel_path)
+
+    def _remove_file(self, rel_path: str):
+        if self._files.pop(rel_path, None) is None:
+            return
+        *dirs, name = rel_path.split("/")
+        node = self._trie
+        for part in dirs:
+            node = node.get(part, {})
+        node.get(None, set()).discard(name)
+        for gram in trigrams(rel_path.lower()):
+            posting = self._trigrams.get(gram)
+            if posting is not None:
+                posting.discard(rel_path)
+                if not posting:
+                    del self._trigrams[gram]
+
+    # ---------------- 查询 ----------------
+
+    def get(self, rel_path: str) -> Optional[str]:
+        """相对路径 → 完整路径；不在索引中时返回 None"""
+        self.refresh()
+        return self._files.get(rel_path.replace("\\", "/").lstrip("/"))
+
+    def under(self, prefix: str = "") -> Iterator[str]:
+        """目录前缀（如 "app/api"）下的所有文件的相对路径"""
+        parts = [part for part in prefix.replace("\\", "/").split("/") if part]
+        node = self._trie
+        for part in parts:
+            node = node.get(part)
+            if node is None:
+                return
+        yield from self._walk(node, "/".join(parts))
+
+    def _walk(self, node: Dict[str, Any], base: str) -> Iterator[str]:
+        for key, child in list(node.items()):
+            if key is None:
+                for name in list(child):
+                    yield f"{base}/{name}" if base else name
+            else:
+                yield from self._walk(child, f"{base}/{key}" if base else key)
+
+    def search_keyword(self, keyword: str) -> List[Dict[str, Any]]:
+        """相对路径（不区分大小写）包含 keyword 的文件，按相关度排序"""
+        self.refresh()
+        lowered = keyword.lower()
+        with self._lock:
+            candidates = self._containing(lowered)
+            if candidates is None:
+                candidates = self._files
+            matched = [rel_path for rel_path in candidates if lowered in rel_path.lower()]
+        return self._ranked(matched, lambda rel_path: self._keyword_score(rel_path, lowered),
+                            f"关键词 '{keyword}' 匹配")
+
+    def search_glob(self, pattern: str) -> List[Dict[str, Any]]:
+        """文件名或相对路径匹配 glob 的文件；完整路径匹配的排在只有文件名匹配的前面"""
+        self.refresh()
+        literal = []
+        for part in pattern.replace("\\", "/").split("/")[:-1]:
+            if any(char in part for char in GLOB_CHARS):
+                break
+            literal.append(part)
+        match = re.compile(fnmatch.translate(os.path.normcase(pattern))).match
+        # 匹配的路径一定包含 pattern 里最长的一段字面量：够 3 个字符时先用三元组索引缩小候选
+        longest = max(_GLOB_SPECIAL.split(pattern.lower()), key=len)
+        scores = {}
+        with self._lock:
+            candidates = self._containing(longest)
+            if candidates is None:
+                candidates = self.under("/".join(literal))
+            for rel_path in candidates:
+                if match(os.path.normcase(rel_path)):
+                    scores[rel_path] = 0.8
+                elif match(os.path.normcase(rel_path.rsplit("/", 1)[-1])):
+                    scores[rel_path] = 0.6
+        return self._ranked(list(scores), scores.__getitem__, f"文件模式 '{pattern}' 匹配")
+
+    def _containing(self, lowered: str) -> Optional[Set[str]]:
+        """小写相对路径可能包含 lowered 的文件（三元组交集，需再确认）；不足 3 个字符时返回 None"""
+        grams = trigrams(lowered)
+        if not grams:
+            return None
+        postings = sorted((self._trigrams.get(gram, set()) for gram in grams), key=len)
+        return set.intersection(*postings) if postings[0] else set()
+
+    def nearest(self, rel_path: str) -> List[Dict[str, Any]]:
+        """路径不存在时，在它最深的已存在目录下找文件名最接近的文件"""
+        self.refresh()
+        parts = [part for part in rel_path.replace("\\", "/").split("/") if part]
+        name = parts.pop().lower() if parts else ""
+        stem = name.rsplit(".", 1)[0]
+        with self._lock:
+            node, depth = self._trie, 0
+            for part in parts:
+                if part not in node:
+                    break
+                node, depth = node[part], depth + 1
+            base = "/".join(parts[:depth])
+            wanted = trigrams(stem)
+            scores = {}
+            for candidate in self.under(base):
+                candidate_stem = candidate.rsplit("/", 1)[-1].lower().rsplit(".", 1)[0]
+                if stem and stem in candidate_stem:
+                    overlap = 1.0
+                else:
+                    overlap = len(wanted & trigrams(candidate_stem)) / len(wanted) if wanted else 0.0
+                if overlap:
+                    # 目录匹配得越深、文件名越像，分数越高
+                    scores[candidate] = 0.3 + 0.3 * overlap + 0.2 * depth / max(len(parts), 1)
+        return self._ranked(list(scores), scores.__getitem__, f"与 {rel_path} 位于同一目录、文件名相近")
+
+    @staticmethod
+    def _keyword_score(rel_path: str, lowered: str) -> float:
+        path_lower = rel_path.lower()
+        name = path_lower.rsplit("/", 1)[-1]
+        if path_lower == lowered.lstrip("/"):
+            score = 1.0
+        elif name == lowered or name.rsplit(".", 1)[0] == lowered:
+            score = 0.9
+        elif name.startswith(lowered):
+            score = 0.8
+        elif lowered in name:
+            score = 0.7
+        elif lowered.strip("/") in path_lower.split("/")[:-1]:
+            score = 0.6
+        else:
+            score = 0.5
+        # 同一档内关键词占路径的比例越高越靠前
+        return score + 0.05 * len(lowered) / len(path_lower)
+
+    def _ranked(self, rel_paths: List[str], score_of, reason: str) -> List[Dict[str, Any]]:
+        scored = sorted(((round(score_of(rel_path), 3), rel_path) for rel_path in rel_paths),
+                        key=lambda item: (-item[0], item[1]))
+        return [
+            {
+                "file_path": rel_path,
+                "full_path": self._files.get(rel_path, os.path.join(self.root, rel_path)),
+                "score": score,
+                "confidence": confidence_of(score),
+                "reason": reason,
+                "exists": True,
+            }
+            for score, rel_path in scored
+        ]
+
+    def __len__(self):
+        return len(self._files)
+
+
+_indexes: Dict[Tuple[str, Tuple[str, ...]], CodeIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_code_index(root: str, extensions: Tuple[str, ...] = (".py",)) -> CodeIndex:
+    """取（进程内共享的）代码索引；第一次取时完整扫描一遍"""
+    key = (os.path.abspath(root), extensions)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = CodeIndex(root, extensions)
+    index.refresh()
+    return index
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+代码问题模式库 - analyze_code_pattern 使用的规则在导入时编译一次
+
+原来每次调用都重新构造规则字典、用未编译的模式字符串执行 re.finditer，并用
+code_snippet[:match.start()].count('\\n') 计算行号——片段大、命中多时这一步是平方级的。
+
+这里：
+- 每条规则导入时编译（re.MULTILINE），同时用 required_literals 提取它匹配时必须出现的字面量
+  （如 r"time\.sleep\([5-9]\)" → "time.sleep("）。扫描时先用 str 的子串查找检查这些字面量，
+  缺任何一个就跳过这条规则，不用跑正则（大多数代码的常见情况）；
+  把一个问题类型的全部规则合并成一个交替式正则当"门"试过，实测比逐条扫描还慢
+  （交替式用不上 re 对字面量前缀的快速查找），所以没有采用；
+- 行号用换行符位置表二分查找，每个片段只建一次表。
+
+结果（顺序、行号、匹配内容）与原来逐条 re.finditer 完全一致，bench_code_patterns.py 校验并计时。
+"""
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .content_index import required_literals
+except ImportError:
+    from content_index import required_literals
+
+# 问题类型 → [(正则, 描述)]，按顺序检查
+PATTERN_RULES: Dict[str, List[Tuple[str, str]]] = {
+    "memory_leak": [
+        # 使用非贪婪匹配 .*? 避免匹配过多
+        (r"\.append\(.*?\)\s*# 没有清理", "列表不断追加可能导致内存泄漏"),
+        (r"global\s+\w+\s*=\s*\[\]", "全局变量累积数据"),
+        (r"while True:\s*\n\s*\w+\.append", "循环中不断追加到列表"),
+        # 修正：使用 [^)]* 匹配括号内任意非右括号字符
+        (r"PIL\.Image\.new\([^)]*\)\s*# 没有关闭", "图片资源未释放"),
+        # 还可以添加更多常见内存泄漏模式：
+        (r"open\([^)]*\)\s*(#.*)?$", "文件打开后没有关闭"),
+        (r"connection\s*=\s*.+\.connect\(\)", "数据库连接没有关闭"),
+        (r"self\.cache\s*=\s*{}\s*# 无限增长", "缓存字典无限增长"),
+        (r"\.add\(.*?\)\s*# 集合不断添加", "集合不断添加元素"),
+        (r"threading\.Thread\(target=.*\)", "线程没有正确管理")
+    ],
+    "deadlock": [
+        (r"with lock[12]:\s*\n\s*with lock[21]:", "嵌套锁可能导致死锁"),
+        (r"lock\.acquire\(\)\s*\n.*lock\.acquire\(\)", "重复获取锁"),
+        (r"threading\.Lock\(\)\s*# 多线程死锁风险", "多线程同步问题")
+    ],
+    "timeout": [
+        (r"time\.sleep\([5-9]\)", "长时间sleep"),
+        (r"requests\.\w+\([^)]*timeout=None", "网络请求未设置超时"),
+        (r"while True:\s*if.*break", "可能无法退出的循环"),
+        (r"socket\.settimeout\(None\)", "socket未设置超时")
+    ],
+    "database": [
+        (r"\.all\(\)\s*# 查询所有数据", "未分页的全表查询"),
+        (r"N\+1\s+query", "N+1查询问题"),
+        (r"SELECT \*\s+FROM", "SELECT * 性能问题"),
+        (r"for.*in.*:\s*\n\s*session\.add", "循环中逐个插入数据")
+    ],
+    "security": [
+        (r"eval\(", "使用eval有安全风险"),
+        (r"exec\(", "使用exec有安全风险"),
+        (r"subprocess\.call\(.*shell=True", "shell命令注入风险"),
+        (r"password\s*=\s*['\"]\w+['\"]", "硬编码密码")
+    ]
+}
+
+HIGH_SEVERITY = ("memory_leak", "deadlock")
+
+# 没有发现问题时的通用指标
+_FUNCTION_DEF = re.compile(r"def \w+")
+_CLASS_DEF = re.compile(r"class \w+")
+_IMPORT = re.compile(r"import |from ")
+_NEWLINE = re.compile("\n")
+
+
+class _IssuePatterns:
+    """一个问题类型编译好的规则：(正则, 描述, 编译结果, 必须出现的字面量)"""
+
+    __slots__ = ("issue_type", "severity", "rules")
+
+    def __init__(self, issue_type: str, rules: List[Tuple[str, str]]):
+        self.issue_type = issue_type
+        self.severity = "high" if issue_type in HIGH_SEVERITY else "medium"
+        self.rules = [(pattern, description, re.compile(pattern, re.MULTILINE), tuple(required_literals(pattern)))
+                      for pattern, description in rules]
+
+
+class _LineTable:
+    """片段中每个换行符的位置，第一次需要行号时才建"""
+
+    __slots__ = ("code", "_newlines")
+
+    def __init__(self, code: str):
+        self.code = code
+        self._newlines: Optional[List[int]] = None
+
+    def line_of(self, offset: int) -> int:
+        if self._newlines is None:
+            self._newlines = [match.start() for match in _NEWLINE.finditer(self.code)]
+        # offset 之前的换行符个数 + 1
+        return bisect_left(self._newlines, offset) + 1
+
+
+class PatternLibrary:
+    """编译好的问题模式库"""
+
+    def __init__(self, rules: Dict[str, List[Tuple[str, str]]] = PATTERN_RULES):
+        self._types = {issue_type: _IssuePatterns(issue_type, type_rules) for issue_type, type_rules in rules.items()}
+
+    def issue_types(self) -> List[str]:
+        return list(self._types)
+
+    def scan(self, code: str, issue_types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """按问题类型、规则、出现位置的顺序返回全部命中；不认识的问题类型忽略"""
+        findings = []
+        lines = _LineTable(code)
+        for issue_type in (self._types if issue_types is None else issue_types):
+            patterns = self._types.get(issue_type)
+            if patterns is None:
+                continue
+            for pattern, description, compiled, literals in patterns.rules:
+                if not all(literal in code for literal in literals):
+                    continue
+                for match in compiled.finditer(code):
+                    findings.append({
+                        "issue_type": issue_type,
+                        "line": lines.line_of(match.start()),
+                        "pattern": pattern,
+                        "description": description,
+                        "matched_code": match.group(0).strip(),
+                        "severity": patterns.severity
+                    })
+        return findings
+
+    @staticmethod
+    def metrics(code: str) -> Dict[str, Any]:
+        """代码的基本指标（行数、函数 / 类 / import 个数、注释行占比）"""
+        lines = code.split('\n')
+        return {
+            "line_count": len(lines),
+            "function_count": len(_FUNCTION_DEF.findall(code)),
+            "class_count": len(_CLASS_DEF.findall(code)),
+            "import_count": len(_IMPORT.findall(code)),
+            "comment_ratio": sum(1 for line in lines if line.strip().startswith('#')) / len(lines) if lines else 0
+        }
+
+
+pattern_library = PatternLibrary()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+代码内容全文检索 - 三元组倒排索引 + 正则确认
+
+每个文件的内容（小写后）拆成三字符片段，片段 → 文件集合。查询时先从查询串（或正则中必须出现的
+字面量片段）取出三元组，求各集合的交集得到候选文件，再对候选文件逐个执行正则，
+返回命中的行号和前后几行代码片段。索引只用来缩小候选范围，结果以正则为准，和逐个文件搜索一致。
+
+    index = get_content_index(CODE_BASE_PATH)
+    index.search("time.sleep")                        # 字面量，默认不区分大小写
+    index.search(r"requests\\.get\\(.*timeout", regex=True)
+
+文件列表来自 code_index.CodeIndex；内容按 (mtime, size) 判断是否需要重新索引，
+与文件列表一样按 CODE_INDEX_REFRESH_SECONDS 节流刷新。超过 CONTENT_INDEX_MAX_FILE_BYTES 的文件
+不建索引，但每次查询都作为候选直接搜索，不会漏掉结果。
+"""
+import os
+import re
+import time
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from .code_index import CodeIndex, get_code_index
+    from .source_cache import load_source, source_cache
+except ImportError:
+    from code_index import CodeIndex, get_code_index
+    from source_cache import load_source, source_cache
+
+# 超过这个大小的文件不建三元组索引（仍会被搜索）
+MAX_FILE_BYTES = int(os.environ.get("CONTENT_INDEX_MAX_FILE_BYTES", str(1024 * 1024)))
+# 单行在结果中最多保留的字符数
+MAX_LINE_CHARS = 240
+_VERBOSE_FLAG = re.compile(r"\(\?[a-zA-Z]*x")
+
+
+def content_trigrams(text: str) -> Set[str]:
+    lowered = text.lower()
+    return {lowered[i:i + 3] for i in range(len(lowered) - 2)}
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    正则中任何匹配都必须包含的字面量片段（只取不少于 3 个字符的）
+
+    保守提取：含 | 或 verbose 标志时放弃；字符类、分组、\\d 之类的转义都当作断点；
+    后面跟 * ? {m,n} 的字符视为可有可无。提取不到时返回空列表，表示不能用索引过滤。
+    """
+    if "|" in pattern or _VERBOSE_FLAG.search(pattern):
+        return []
+    literals, run = [], []
+
+    def flush():
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    i, size = 0, len(pattern)
+    while i < size:
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            i += 2
+            if escaped and not escaped.isalnum():
+                run.append(escaped)
+            else:
+                flush()
+        elif char == "[":
+            j = i + 1
+            if pattern[j:j + 1] == "^":
+                j += 1
+            if pattern[j:j + 1] == "]":
+                j += 1
+            while j < size and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            i = j + 1
+            flush()
+        elif char == "(":
+            depth, j = 1, i + 1
+            while j < size and depth:
+                if pattern[j] == "\\":
+                    j += 1
+                elif pattern[j] == "(":
+                    depth += 1
+                elif pattern[j] == ")":
+                    depth -= 1
+                j += 1
+            i = j
+            flush()
+        elif char in "*?{":
+            # 量词作用于前一个字符：它可能不出现
+            if run:
+                run.pop()
+            flush()
+            if char == "{":
+                closing = pattern.find("}", i)
+                i = closing + 1 if closing != -1 else size
+            else:
+                i += 1
+            if pattern[i:i + 1] in ("?", "+"):
+                i += 1
+        elif char == "+":
+            flush()
+            i += 1
+            if pattern[i:i + 1] in ("?", "+"):
+                i += 1
+        elif char in ".^$)":
+            flush()
+            i += 1
+        else:
+            run.append(char)
+            i += 1
+    flush()
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class ContentIndex:
+    """CodeIndex 中各文件内容的三元组索引"""
+
+    def __init__(self, files: CodeIndex, max_file_bytes: int = MAX_FILE_BYTES):
+        self.files = files
+        self.max_file_bytes = max_file_bytes
+        self._versions: Dict[str, Tuple[int, int]] = {}  # 相对路径 → (mtime_ns, size)
+        self._grams: Dict[str, Set[str]] = {}  # 相对路径 → 内容三元组
+        self._postings: Dict[str, Set[str]] = {}
+        self._unindexed: Set[str] = set()  # 过大或读取失败、每次都要直接搜索的文件
+        self._checked_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def refresh(self, force: bool = False):
+        """同步文件列表，重新索引 mtime / size 变化的文件；与 CodeIndex 使用相同的刷新间隔"""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.files.refresh_interval:
+            return
+        self.files.refresh(force)
+        with self._lock:
+            current = set(self.files.under())
+            for rel_path in set(self._versions) - current:
+                self._forget(rel_path)
+            for rel_path in current:
+                full_path = os.path.join(self.files.root, rel_path)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    self._forget(rel_path)
+                    continue
+                version = (stat.st_mtime_ns, stat.st_size)
+                if self._versions.get(rel_path) != version:
+                    self._forget(rel_path)
+                    self._versions[rel_path] = version
+                    self._index(rel_path, full_path, version)
+            self._checked_at = time.monotonic()
+
+    def _index(self, rel_path: str, full_path: str, version: Tuple[int, int]):
+        if version[1] > self.max_file_bytes:
+            self._unindexed.add(rel_path)
+            return
+        try:
+            with open(full_path, "rb") as f:
+                # 编码检测与 get_code_context 共用缓存，同一文件版本只检测一次
+                grams = content_trigrams(source_cache.decode_text(full_path, version, f.read()))
+        except OSError:
+            self._unindexed.add(rel_path)
+            return
+        self._grams[rel_path] = grams
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {rel_path}
+            else:
+                posting.add(rel_path)
+
+    def _forget(self, rel_path: str):
+        self._versions.pop(rel_path, None)
+        self._unindexed.discard(rel_path)
+        for gram in self._grams.pop(rel_path, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(rel_path)
+                if not posting:
+                    del self._postings[gram]
+
+    def candidates(self, literals: List[str]) -> Set[str]:
+        """可能包含全部 literals 的文件（小写比较）；没有可用的字面量时返回全部文件"""
+        with self._lock:
+            grams = set()
+            for literal in literals:
+                lowered = literal.lower()
+                grams.update(lowered[i:i + 3] for i in range(len(lowered) - 2))
+            if not grams:
+                return set(self._versions)
+            postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+            matched = set.intersection(*postings) if postings[0] else set()
+            return matched | self._unindexed
+
+    def search(
+            self,
+            query: str,
+            regex: bool = False,
+            case_sensitive: bool = False,
+            file_pattern: Optional[str] = None,
+            context_lines: int = 2,
+            max_results: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        在代码内容中搜索，每个命中行返回一条结果（行号 + 前后 context_lines 行代码片段）
+
+        Raises:
+            re.error: regex=True 且正则不合法
+        """
+        self.refresh()
+        compiled = re.compile(query if regex else re.escape(query), re.MULTILINE | (0 if case_sensitive else re.IGNORECASE))
+        candidates = self.candidates(required_literals(query) if regex else [query])
+        if file_pattern:
+            allowed = {result["file_path"] for result in self.files.search_glob(file_pattern)}
+            candidates &= allowed
+
+        matches: List[Dict[str, Any]] = []
+        files_matched = 0
+        truncated = False
+        for rel_path in sorted(candidates):
+            if truncated:
+                break
+            try:
+                # 与 get_code_context 共用解码缓存：编码和行号与它一致，重复搜索同一文件不再读盘
+                lines = load_source(os.path.join(self.files.root, rel_path)).lines
+            except (OSError, UnicodeDecodeError, LookupError):
+                continue
+            text = "\n".join(lines)
+            starts = None
+            seen_lines = set()
+            for match in compiled.finditer(text):
+                if starts is None:
+                    starts = list(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+                line_index = bisect_right(starts, match.start()) - 1
+                if line_index in seen_lines:
+                    continue
+                if len(matches) == max_results:
+                    truncated = True
+                    break
+                seen_lines.add(line_index)
+                first = max(0, line_index - context_lines)
+                last = min(len(lines), line_index + context_lines + 1)
+                matches.append({
+                    "file_path": rel_path,
+                    "line_number": line_index + 1,
+                    "match": match.group(0)[:MAX_LINE_CHARS],
+                    "snippet": [
+                        {
+                            "line_number": number + 1,
+                            "content": lines[number][:MAX_LINE_CHARS],
+                            "highlighted": number == line_index,
+                        }
+                        for number in range(first, last)
+                    ],
+                })
+            if seen_lines:
+                files_matched += 1
+
+        return {
+            "query": query,
+            "regex": regex,
+            "case_sensitive": case_sensitive,
+            "file_pattern": file_pattern,
+            "matches": matches,
+            "total_count": len(matches),
+            "files_matched": files_matched,
+            "files_searched": len(candidates),
+            "files_indexed": len(self._versions),
+            "truncated": truncated,
+        }
+
+
+_indexes: Dict[str, ContentIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_content_index(root: str, extensions: Tuple[str, ...] = (".py",)) -> ContentIndex:
+    """取（进程内共享的）内容索引；第一次取时读取并索引全部文件"""
+    files = get_code_index(root, extensions)
+    key = f"{files.root}|{','.join(extensions)}"
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ContentIndex(files)
+    index.refresh()
+    return index
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+证据预采集模块 - 在智能体启动之前，直接调用原始工具函数并发采集每台服务器的数据
+
+智能体逐轮决定调用 get_nginx_servers → get_server_logs → get_server_metrics ……，
+每次工具调用都要消耗一次 LLM 往返。这里先用确定性的代码把这些数据一次性取回来，
+压缩成紧凑的证据包（错误数、延迟分位数、Top 慢 SQL、Redis 错误、指标离群点），
+再注入到任务描述中，智能体直接基于已有数据推理。
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from .tool_tracing import bind_context
+from .mock_tools import (
+    get_nginx_servers_raw,
+    get_server_logs_simple_raw,
+    get_mysql_logs_simple_raw,
+    get_redis_logs_simple_raw,
+    get_server_metrics_simple_raw,
+)
+from .log_pagination import MAX_PAGE_SIZE
+from .keyword_matcher import get_matcher
+
+# 参与离群点检测的指标：(指标名, 展示名)
+OUTLIER_METRICS = [
+    ("success_rate", "成功率"),
+    ("avg_latency_ms", "平均延迟(ms)"),
+    ("p99_latency_ms", "P99延迟(ms)"),
+    ("cpu_percent", "CPU(%)"),
+    ("memory_percent", "内存(%)"),
+    ("active_connections", "活跃连接数"),
+    ("queue_length", "队列长度"),
+    ("database_latency_ms", "数据库延迟(ms)"),
+    ("cache_hit_rate", "缓存命中率"),
+]
+
+TOP_SLOW_SQL = 5
+TOP_REDIS_ITEMS = 5
+REDIS_SLOW_THRESHOLD_S = 0.05
+
+
+def _percentile(values: List[float], p: float) -> float:
+    """最近秩法求分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def _count_by(items, key) -> Dict[str, int]:
+    counts = {}
+    for item in items:
+        value = key(item)
+        counts[value] = counts.get(value, 0) + 1
+    return dict(sorted(counts.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def _all_pages(fetch, server_ip: str, **kwargs) -> List[Dict[str, Any]]:
+    """顺着 next_cursor 取完分页日志工具的所有页（证据包要基于全部匹配的日志统计）"""
+    logs, cursor = fetch(server_ip, page_size=MAX_PAGE_SIZE, **kwargs)
+    while cursor:
+        page, cursor = fetch(server_ip, cursor=cursor, page_size=MAX_PAGE_SIZE, **kwargs)
+        logs.extend(page)
+    return logs
+
+
+# ==================== 单项证据 ====================
+
+def summarize_nginx(server_ip: str, api_endpoint: str = None, keywords: List[str] = None) -> Dict[str, Any]:
+    """Nginx 日志：错误数、状态码分布、延迟分位数"""
+    logs = _all_pages(get_server_logs_simple_raw, server_ip, api_endpoint=api_endpoint)
+    errors = [log for log in logs if log["severity"] == "ERROR"]
+    latencies = [float(log["latency_ms"]) for log in logs]
+
+    matcher = get_matcher(keywords)
+    keyword_hits = matcher.count(log["raw"] for log in logs) if matcher else {}
+
+    return {
+        "sampled": len(logs),
+        "errors": len(errors),
+        "status_counts": _count_by(logs, lambda log: log["status"]),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 1),
+            "p95": round(_percentile(latencies, 95), 1),
+            "p99": round(_percentile(latencies, 99), 1),
+        },
+        "keyword_hits": keyword_hits,
+    }
+
+
+def summarize_mysql(server_ip: str) -> Dict[str, Any]:
+    """MySQL 日志：级别分布、错误类型、Top 慢 SQL"""
+    logs, _ = get_mysql_logs_simple_raw(server_ip)
+
+    errors = [log for log in logs if log["severity"] == "ERROR"]
+    error_types = _count_by(errors, lambda log: _extract_quoted(log["raw"], "error") or "unknown")
+
+    # 同一条 SQL 只保留最慢的一次
+    slowest = {}
+    for log in logs:
+        if log["latency_ms"] <= 0:
+            continue
+        sql = log["operation"]
+        if sql not in slowest or log["latency_ms"] > slowest[sql]["latency_ms"]:
+            slowest[sql] = log
+    top_slow = sorted(slowest.values(), key=lambda log: log["latency_ms"], reverse=True)[:TOP_SLOW_SQL]
+
+    return {
+        "total": len(logs),
+        "severity_counts": _count_by(logs, lambda log: log["severity"]),
+        "deadlocks": sum(1 for log in logs if "[Deadlock]" in log["raw"]),
+        "error_types": error_types,
+        "top_slow_sql": [
+            {"sql": log["operation"], "latency_ms": round(log["latency_ms"], 1), "timestamp": log["timestamp"]}
+            for log in top_slow
+        ],
+    }
+
+
+def summarize_redis(server_ip: str) -> Dict[str, Any]:
+    """Redis 日志：错误类型、慢命令"""
+    errors = _all_pages(get_redis_logs_simple_raw, server_ip, keywords=["ERROR"])
+    slow = _all_pages(get_redis_logs_simple_raw, server_ip, min_duration=REDIS_SLOW_THRESHOLD_S)
+
+    error_types = _count_by(errors, lambda log: _extract_quoted(log["raw"], "error") or "unknown")
+    top_slow = sorted(slow, key=lambda log: log["latency_ms"], reverse=True)[:TOP_REDIS_ITEMS]
+
+    return {
+        "errors": len(errors),
+        "error_types": dict(list(error_types.items())[:TOP_REDIS_ITEMS]),
+        "error_commands": _count_by(errors, lambda log: log["operation"]),
+        "slow_commands": [
+            {"command": log["operation"], "latency_ms": log["latency_ms"]} for log in top_slow
+        ],
+    }
+
+
+def _extract_quoted(raw: str, field: str) -> Optional[str]:
+    """从 key="value" 形式的原始日志中取出字段值"""
+    marker = f'{field}="'
+    start = raw.find(marker)
+    if start == -1:
+        return None
+    start += len(marker)
+    end = raw.find('"', start)
+    return raw[start:end] if end != -1 else None
+
+
+def find_metric_outliers(metrics_by_server: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    跨服务器比较指标，用中位数绝对偏差（MAD）找出离群的服务器
+
+    偏离中位数超过 3.5 个稳健标准差视为离群；服务器很少时 MAD 可能接近 0，
+    因此稳健标准差至少取中位数的 5%，避免把正常波动判成离群
+    """
+    outliers = []
+    for metric, label in OUTLIER_METRICS:
+        values = {
+            ip: float(metrics[metric])
+            for ip, metrics in metrics_by_server.items()
+            if isinstance(metrics.get(metric), (int, float))
+        }
+        if len(values) < 3:
+            continue
+
+        median = _median(list(values.values()))
+        mad = _median([abs(v - median) for v in values.values()])
+        spread = max(1.4826 * mad, 0.05 * abs(median))
+        if not spread:
+            continue
+        for ip, value in values.items():
+            deviation = value - median
+            score = abs(deviation) / spread
+            if score > 3.5:
+                outliers.append({
+                    "server_ip": ip,
+                    "metric": metric,
+                    "label": label,
+                    "value": round(value, 3),
+                    "median": round(median, 3),
+                    "direction": "偏高" if deviation > 0 else "偏低",
+                    "score": round(score, 1),
+                })
+
+    outliers.sort(key=lambda item: item["score"], reverse=True)
+    return outliers
+
+
+# ==================== 采集入口 ====================
+
+def _collect_server(server_ip: str, api_endpoint: str, keywords: List[str]) -> Dict[str, Any]:
+    """采集单台服务器的全部证据；某一项失败只记录错误，不影响其它项"""
+    start = time.time()
+    evidence = {"server_ip": server_ip}
+    collectors = {
+        "nginx": lambda: summarize_nginx(server_ip, api_endpoint, keywords),
+        "metrics": lambda: get_server_metrics_simple_raw(server_ip),
+        "mysql": lambda: summarize_mysql(server_ip),
+        "redis": lambda: summarize_redis(server_ip),
+    }
+    for name, collect in collectors.items():
+        try:
+            evidence[name] = collect()
+        except Exception as e:
+            print(f"[警告] 采集 {server_ip} 的 {name} 证据失败: {e}")
+            evidence[name] = {"error": str(e)}
+    evidence["elapsed_s"] = round(time.time() - start, 3)
+    return evidence
+
+
+def collect_evidence(api_endpoint: str = None, keywords: List[str] = None,
+                     max_workers: int = 8) -> Dict[str, Any]:
+    """
+    对每台服务器并发调用原始工具函数，生成证据包
+
+    Returns:
+        {
+            "api_endpoint": "...",
+            "servers": [{"ip": ..., "role": ..., "status": ...}, ...],
+            "per_server": {ip: {"nginx": {...}, "metrics": {...}, "mysql": {...}, "redis": {...}}},
+            "metric_outliers": [...],
+            "elapsed_s": 0.12
+        }
+    """
+    start = time.time()
+    servers = get_nginx_servers_raw()
+    ips = [server["ip"] for server in servers]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ips)))) as executor:
+        # bind_context：工作线程沿用调用方的追踪上下文（任务名、运行 ID）
+        collect = bind_context(lambda ip: _collect_server(ip, api_endpoint, keywords))
+        results = list(executor.map(collect, ips))
+    per_server = {evidence["server_ip"]: evidence for evidence in results}
+
+    metrics_by_server = {
+        ip: evidence["metrics"] for ip, evidence in per_server.items()
+        if "error" not in evidence["metrics"]
+    }
+
+    return {
+        "api_endpoint": api_endpoint,
+        "servers": [
+            {"ip": s["ip"], "hostname": s.get("hostname"), "role": s.get("role"), "status": s.get("status")}
+            for s in servers
+        ],
+        "per_server": per_server,
+        "metric_outliers": find_metric_outliers(metrics_by_server),
+        "elapsed_s": round(time.time() - start, 3),
+    }
+
+
+# ==================== 证据包 → 任务描述文本 ====================
+
+def _fmt_counts(counts: Dict[str, int]) -> str:
+    return ", ".join(f"{k}={v}" for k, v in counts.items()) or "无"
+
+
+def _server_header(server: Dict[str, Any]) -> str:
+    return f"{server['ip']} ({server['hostname']}, {server['role']}, 状态 {server['status']})"
+
+
+def format_nginx_section(bundle: Dict[str, Any]) -> str:
+    lines = [f"## Nginx 日志（接口 {bundle['api_endpoint'] or '全部'}）"]
+    for server in bundle["servers"]:
+        nginx = bundle["per_server"][server["ip"]]["nginx"]
+        if "error" in nginx:
+            lines.append(f"- {server['ip']}: 采集失败 {nginx['error']}")
+            continue
+        latency = nginx["latency_ms"]
+        line = (f"- {_server_header(server)}: 样本 {nginx['sampled']} 条, 错误 {nginx['errors']}, "
+                f"状态码 {_fmt_counts(nginx['status_counts'])}, "
+                f"延迟 p50={latency['p50']} p95={latency['p95']} p99={latency['p99']}ms")
+        if nginx["keyword_hits"]:
+            line += f", 关键词 {_fmt_counts(nginx['keyword_hits'])}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def format_metrics_section(bundle: Dict[str, Any], metric_names: List[str] = None) -> str:
+    names = metric_names or [metric for metric, _ in OUTLIER_METRICS[:5]]
+    lines = ["## 服务器指标"]
+    for server in bundle["servers"]:
+        metrics = bundle["per_server"][server["ip"]]["metrics"]
+        if "error" in metrics:
+            lines.append(f"- {server['ip']}: 采集失败 {metrics['error']}")
+            continue
+        values = ", ".join(
+            f"{name}={metrics[name]:.3f}" if isinstance(metrics.get(name), float) else f"{name}={metrics.get(name)}"
+            for name in names
+        )
+        lines.append(f"- {_server_header(server)}: {values}")
+
+    lines.append("### 指标离群点（与其它服务器的中位数相比）")
+    if not bundle["metric_outliers"]:
+        lines.append("- 无")
+    for item in bundle["metric_outliers"]:
+        lines.append(f"- {item['server_ip']} {item['label']} {item['direction']}: "
+                     f"{item['value']}（中位数 {item['median']}，偏离 {item['score']}）")
+    return "\n".join(lines)
+
+
+def format_mysql_section(bundle: Dict[str, Any]) -> str:
+    lines = ["## MySQL 日志"]
+    for server in bundle["servers"]:
+        mysql = bundle["per_server"][server["ip"]]["mysql"]
+        if "error" in mysql:
+            lines.append(f"- {server['ip']}: 采集失败 {mysql['error']}")
+            continue
+        lines.append(f"- {server['ip']}: 共 {mysql['total']} 条, 级别 {_fmt_counts(mysql['severity_counts'])}, "
+                     f"死锁 {mysql['deadlocks']}, 错误类型 {_fmt_counts(mysql['error_types'])}")
+        for item in mysql["top_slow_sql"]:
+            lines.append(f"    · {item['latency_ms']}ms {item['sql']} @ {item['timestamp']}")
+    return "\n".join(lines)
+
+
+def format_redis_section(bundle: Dict[str, Any]) -> str:
+    lines = ["## Redis 日志"]
+    for server in bundle["servers"]:
+        redis = bundle["per_server"][server["ip"]]["redis"]
+        if "error" in redis:
+            lines.append(f"- {server['ip']}: 采集失败 {redis['error']}")
+            continue
+        slow = ", ".join(f"{item['command']}({item['latency_ms']}ms)" for item in redis["slow_commands"]) or "无"
+        lines.append(f"- {server['ip']}: 错误 {redis['errors']} 条 {_fmt_counts(redis['error_types'])}, "
+                     f"出错命令 {_fmt_counts(redis['error_commands'])}, 慢命令 {slow}")
+    return "\n".join(lines)
+
+
+def format_evidence(bundle: Dict[str, Any], sections: List[str] = None, metric_names: List[str] = None) -> str:
+    """
+    把证据包格式化为注入任务描述的紧凑文本
+
+    Args:
+        sections: 需要的部分，可选 nginx / metrics / mysql / redis，不传表示全部
+    """
+    formatters = {
+        "nginx": format_nginx_section,
+        "metrics": lambda b: format_metrics_section(b, metric_names),
+        "mysql": format_mysql_section,
+        "redis": format_redis_section,
+    }
+    parts = [formatters[name](bundle) for name in (sections or formatters)]
+    return "\n\n".join(parts)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+运维 MCP 服务器并发负载测试：对比不同工具执行方式（MCP_TOOL_EXECUTOR）下的延迟分位数
+
+对每种执行方式各启动一个独立的 ops 服务器（uvicorn 子进程，临时端口），
+模拟多个智能体同时调用：每个智能体循环发起一组“重”调用（代码上下文 / 代码搜索 / 日志）
+和“轻”调用（服务器列表），统计每个工具及整体的 p50 / p95 / p99。
+inline 即旧的行为：工具直接在事件循环里执行，一个慢调用会拖住其它所有请求。
+
+用法：
+    python tools/load_test_mcp_servers.py --agents 16 --rounds 20
+    python tools/load_test_mcp_servers.py --modes inline,thread,process
+"""
+import os
+import sys
+import time
+import json
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import aiohttp
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVERS_DIR = os.path.join(PROJECT_ROOT, "mcp-servers")
+
+# 每个智能体每一轮依次发起的调用
+WORKLOAD = [
+    ("get_code_context", {"file_path": "app/services/data_service.py", "line_start": 1, "line_end": 200}),
+    ("search_code_in_repository", {"file_pattern": "*.py", "keyword": "cursor"}),
+    ("get_server_logs_simple", {"server_ip": "10.0.2.101"}),
+    ("get_nginx_servers", {}),
+    ("get_mysql_logs_simple", {"server_ip": "10.0.3.101"}),
+    ("get_redis_logs_simple", {"server_ip": "10.0.3.101"}),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    """以指定执行方式启动 ops 服务器，等待 /health 可用"""
+    env = dict(os.environ, MCP_TOOL_EXECUTOR=mode, MCP_TOOL_WORKERS=str(workers), TOOL_TRACE="0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "ops_mcp_server_fixed:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVERS_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} 模式的服务器启动失败（退出码 {process.returncode}）")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} 模式的服务器 30 秒内没有就绪")
+
+
+async def run_agents(port: int, agents: int, rounds: int):
+    """并发模拟多个智能体，返回 {工具名: [延迟ms, ...]}"""
+    url = f"http://127.0.0.1:{port}/tools/call"
+    latencies = {tool_name: [] for tool_name, _ in WORKLOAD}
+    errors = 0
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=agents)) as session:
+        async def call(tool_name, arguments):
+            nonlocal errors
+            start = time.perf_counter()
+            async with session.post(url, json={"tool_name": tool_name, "arguments": arguments}) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            latencies[tool_name].append((time.perf_counter() - start) * 1000)
+
+        async def agent():
+            for _ in range(rounds):
+                for tool_name, arguments in WORKLOAD:
+                    await call(tool_name, arguments)
+
+        # 预热：建立连接、加载模块
+        await asyncio.gather(*(call(tool_name, arguments) for tool_name, arguments in WORKLOAD))
+        for values in latencies.values():
+            values.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(agent() for _ in range(agents)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def report(mode: str, latencies, errors: int, elapsed: float):
+    all_values = [value for values in latencies.values() for value in values]
+    print(f"\n📊 MCP_TOOL_EXECUTOR={mode}：{len(all_values)} 次调用，{elapsed:.2f}s，"
+          f"{len(all_values) / elapsed:.1f} 次/秒，失败 {errors}")
+    print(f"  {'工具':<28}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}{'最大ms':>10}")
+    for tool_name, values in list(latencies.items()) + [("（全部）", all_values)]:
+        print(f"  {tool_name:<28}{_percentile(values, 50):>10.2f}{_percentile(values, 95):>10.2f}"
+              f"{_percentile(values, 99):>10.2f}{max(values):>10.2f}")
+    return {"p50": _percentile(all_values, 50), "p99": _percentile(all_values, 99),
+            "fast_p99": _percentile(latencies["get_nginx_servers"], 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运维 MCP 服务器并发负载测试")
+    parser.add_argument("--agents", type=int, default=16, help="并发智能体数")
+    parser.add_argument("--rounds", type=int, default=20, help="每个智能体的调用轮数")
+    parser.add_argument("--workers", type=int, default=16, help="服务器端线程池 / 进程池大小")
+    parser.add_argument("--modes", default="inline,thread", help="要对比的执行方式，逗号分隔")
+    args = parser.parse_args()
+
+    summary = {}
+    for mode in [mode.strip() for mode in args.modes.split(",") if mode.strip()]:
+        port = _free_port()
+        process = start_server(mode, port, args.workers)
+        try:
+            latencies, errors, elapsed = asyncio.run(run_agents(port, args.agents, args.rounds))
+            summary[mode] = report(mode, latencies, errors, elapsed)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    if len(summary) > 1:
+        print("\n📈 对比（整体 p99 / 轻量调用 get_nginx_servers 的 p99）")
+        for mode, stats in summary.items():
+            print(f"  {mode:<10} 整体 p99 {stats['p99']:8.2f}ms   轻量调用 p99 {stats['fast_p99']:8.2f}ms")
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
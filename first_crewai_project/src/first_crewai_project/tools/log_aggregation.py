@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Nginx 访问日志的服务端聚合统计 - 按接口、按时间桶汇总请求数、状态码类别和延迟分位数
+
+智能体逐条阅读日志只能看到一小页样本，错误激增（例如某一分钟内连续的 502）很容易被漏掉。
+这里在服务器端一次扫描全部日志，只把小而完整的汇总交给 LLM：
+
+    {
+        "total_requests": 110,
+        "skipped_lines": 0,
+        "bucket_minutes": 5,
+        "timezone": "UTC",
+        "endpoints": [
+            {
+                "endpoint": "/api/v2/data.json",
+                "requests": 60,
+                "status_classes": {"2xx": 31, "5xx": 29},
+                "latency_ms": {"p50": 412.0, "p95": 8456.0, "p99": 9876.0},
+                "buckets": [{"start": "2026-10-17 04:30", "requests": 12, "status_classes": {...}, "latency_ms": {...}}]
+            }
+        ]
+    }
+
+分位数用最近秩法（排序后第 ceil(p/100 * n) 个值，不插值），与 numpy 的 inverted_cdf 一致。
+装了 numpy 时分组计数和分位数用数组运算一次算完，否则退回纯 Python，两者结果相同。
+"""
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    from .unified_log import get_parser
+except ImportError:
+    from unified_log import get_parser
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，没有时用纯 Python 计算
+    np = None
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+PERCENTILES = (50, 95, 99)
+
+
+def _minute_of(timestamp: str, cache: Dict[str, int]) -> Optional[int]:
+    """'17/Oct/2026:04:26:06 +0000' → 自 1970 年起的 UTC 分钟数；同一分钟只解析一次"""
+    key = timestamp[:17] + timestamp[20:]
+    minute = cache.get(key)
+    if minute is None:
+        try:
+            minute = int(datetime.strptime(key, "%d/%b/%Y:%H:%M %z").timestamp()) // 60
+        except ValueError:
+            return None
+        cache[key] = minute
+    return minute
+
+
+def _columns(lines: Iterable[str], bucket_minutes: int, api_endpoint: Optional[str]):
+    """逐行取字段，转换成四列整数 / 浮点数：接口编号、时间桶编号、状态码类别、延迟毫秒"""
+    parser = get_parser("nginx")
+    endpoints: Dict[str, int] = {}
+    buckets: Dict[int, int] = {}
+    minute_cache: Dict[str, int] = {}
+    endpoint_ids, bucket_ids, class_ids, latencies = [], [], [], []
+    skipped = 0
+
+    for line in lines:
+        if api_endpoint and api_endpoint not in line:
+            continue
+        timestamp, _, path, status_code, response_time = parser.parse_fields(line)
+        minute = _minute_of(timestamp, minute_cache) if timestamp else None
+        status_class = int(status_code) // 100 - 1
+        if minute is None or not 0 <= status_class < len(STATUS_CLASSES):
+            skipped += 1
+            continue
+
+        bucket = minute - minute % bucket_minutes
+        endpoint_ids.append(endpoints.setdefault(path, len(endpoints)))
+        bucket_ids.append(buckets.setdefault(bucket, len(buckets)))
+        class_ids.append(status_class)
+        latencies.append(response_time * 1000)
+
+    return list(endpoints), list(buckets), (endpoint_ids, bucket_ids, class_ids, latencies), skipped
+
+
+def _group_stats(groups: Sequence[int], n_groups: int, class_ids: Sequence[int], latencies: Sequence[float]):
+    """
+    每组的请求数、各状态码类别计数、延迟分位数
+
+    Returns:
+        (counts[n_groups], class_counts[n_groups][5], percentiles[n_groups][len(PERCENTILES)])，空组的分位数为 None
+    """
+    n_classes = len(STATUS_CLASSES)
+    if not len(groups):
+        return [0] * n_groups, [[0] * n_classes for _ in range(n_groups)], [None] * n_groups
+
+    if np is not None:
+        groups = np.asarray(groups, dtype=np.int64)
+        latencies = np.asarray(latencies, dtype=np.float64)
+        counts = np.bincount(groups, minlength=n_groups)
+        class_counts = np.bincount(groups * n_classes + np.asarray(class_ids, dtype=np.int64),
+                                   minlength=n_groups * n_classes).reshape(n_groups, n_classes)
+        # 按 (组, 延迟) 排序后每组是一段连续的升序区间，分位数直接按下标取（空组的下标截断到末尾，结果不用）
+        ordered = latencies[np.lexsort((latencies, groups))]
+        starts = np.cumsum(counts) - counts
+        columns = [
+            ordered[np.minimum(starts + np.maximum(np.ceil(p / 100 * counts).astype(np.int64) - 1, 0),
+                               len(ordered) - 1)]
+            for p in PERCENTILES
+        ]
+        rows = [[float(column[g]) for column in columns] if counts[g] else None for g in range(n_groups)]
+        return counts.tolist(), class_counts.tolist(), rows
+
+    counts = [0] * n_groups
+    class_counts = [[0] * n_classes for _ in range(n_groups)]
+    values: List[List[float]] = [[] for _ in range(n_groups)]
+    for group, status_class, latency in zip(groups, class_ids, latencies):
+        counts[group] += 1
+        class_counts[group][status_class] += 1
+        values[group].append(latency)
+    rows = []
+    for group_values in values:
+        if not group_values:
+            rows.append(None)
+            continue
+        group_values.sort()
+        n = len(group_values)
+        rows.append([group_values[max(math.ceil(p / 100 * n) - 1, 0)] for p in PERCENTILES])
+    return counts, class_counts, rows
+
+
+def _summary(count: int, class_counts: Sequence[int], percentiles: Sequence[float]) -> Dict[str, Any]:
+    return {
+        "requests": count,
+        "status_classes": {name: n for name, n in zip(STATUS_CLASSES, class_counts) if n},
+        "latency_ms": {f"p{p}": round(value, 1) for p, value in zip(PERCENTILES, percentiles)},
+    }
+
+
+def aggregate_nginx_logs(lines: Iterable[str], bucket_minutes: int = 5,
+                         api_endpoint: Optional[str] = None) -> Dict[str, Any]:
+    """
+    一次扫描 Nginx 访问日志，按接口（路径，不含查询串）和时间桶聚合
+
+    Args:
+        lines: 原始 Nginx 日志行
+        bucket_minutes: 时间桶宽度（分钟），按 UTC 整分钟对齐
+        api_endpoint: 只统计包含该接口路径的日志
+    """
+    bucket_minutes = max(1, int(bucket_minutes))
+    endpoints, buckets, (endpoint_ids, bucket_ids, class_ids, latencies), skipped = \
+        _columns(lines, bucket_minutes, api_endpoint)
+
+    n_endpoints, n_buckets = len(endpoints), len(buckets)
+    per_endpoint = _group_stats(endpoint_ids, n_endpoints, class_ids, latencies)
+    per_cell = _group_stats([e * n_buckets + b for e, b in zip(endpoint_ids, bucket_ids)],
+                            n_endpoints * n_buckets, class_ids, latencies)
+
+    # 时间桶按时间先后输出
+    bucket_order = sorted(range(n_buckets), key=lambda b: buckets[b])
+    labels = [time.strftime("%Y-%m-%d %H:%M", time.gmtime(bucket * 60)) for bucket in buckets]
+
+    summaries = []
+    for e, endpoint in enumerate(endpoints):
+        summary = {"endpoint": endpoint, **_summary(per_endpoint[0][e], per_endpoint[1][e], per_endpoint[2][e])}
+        summary["buckets"] = []
+        for b in bucket_order:
+            cell = e * n_buckets + b
+            if per_cell[0][cell]:
+                summary["buckets"].append(
+                    {"start": labels[b], **_summary(per_cell[0][cell], per_cell[1][cell], per_cell[2][cell])})
+        summaries.append(summary)
+    summaries.sort(key=lambda summary: summary["requests"], reverse=True)
+
+    return {
+        "total_requests": len(latencies),
+        "skipped_lines": skipped,
+        "bucket_minutes": bucket_minutes,
+        "timezone": "UTC",
+        "endpoints": summaries,
+    }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+UnifiedLogV1 日志的列式编码 - 批量拉取日志时的紧凑响应格式
+
+日志工具返回的是字典列表，每条记录都重复同样的 8 个键。列式格式改为每个字段一个数组，
+取值很少的 source / server_ip / severity / status 再做字典编码（数组里只存下标）：
+
+    {
+        "format": "columnar/v1",
+        "count": 2,
+        "fields": ["source", "server_ip", "timestamp", ...],
+        "dicts": {"source": ["nginx"], "status": ["200", "502"], ...},
+        "columns": {"source": [0, 0], "status": [0, 1], "timestamp": ["...", "..."], ...}
+    }
+
+客户端在请求体里带 "format": "columnar" 申请这种格式；传输层在双方都安装了 msgpack
+时用 msgpack（Accept: application/x-msgpack），否则用紧凑 JSON。
+"""
+from typing import Any, Dict, List, Optional
+
+try:
+    from .unified_log import UNIFIED_LOG_FIELDS
+except ImportError:
+    from unified_log import UNIFIED_LOG_FIELDS
+
+try:
+    import msgpack
+except ImportError:  # msgpack 是可选依赖，没有时退回紧凑 JSON
+    msgpack = None
+
+COLUMNAR_FORMAT = "columnar/v1"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# 取值很少、做字典编码的字段
+DICT_ENCODED_FIELDS = ("source", "server_ip", "severity", "status")
+
+
+def is_log_records(value: Any) -> bool:
+    """是否为可以列式编码的日志记录列表（字典列表）"""
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+
+def encode_columnar(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    把日志记录列表编码为列式格式
+
+    字段取所有记录键的并集（UnifiedLogV1 字段在前），某条记录缺少的字段在列中记为 None
+    """
+    fields = [field for field in UNIFIED_LOG_FIELDS if any(field in record for record in records)]
+    seen = set(fields)
+    for record in records:
+        for key in record:
+            if key not in seen:
+                seen.add(key)
+                fields.append(key)
+
+    columns = {}
+    dicts = {}
+    for field in fields:
+        values = [record.get(field) for record in records]
+        if field in DICT_ENCODED_FIELDS:
+            index = {}
+            codes = []
+            for value in values:
+                code = index.get(value)
+                if code is None:
+                    code = index[value] = len(index)
+                codes.append(code)
+            dicts[field] = list(index)
+            columns[field] = codes
+        else:
+            columns[field] = values
+
+    return {
+        "format": COLUMNAR_FORMAT,
+        "count": len(records),
+        "fields": fields,
+        "dicts": dicts,
+        "columns": columns,
+    }
+
+
+def decode_columnar(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """把列式格式还原为日志记录列表"""
+    fields = payload["fields"]
+    dicts = payload.get("dicts", {})
+    columns = []
+    for field in fields:
+        column = payload["columns"][field]
+        lookup = dicts.get(field)
+        if lookup is not None:
+            column = [lookup[code] for code in column]
+        columns.append(column)
+    return [dict(zip(fields, row)) for row in zip(*columns)] if fields else [{} for _ in range(payload["count"])]
+
+
+def is_columnar(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("format") == COLUMNAR_FORMAT
+
+
+def maybe_encode(result: Any) -> Any:
+    """
+    工具结果是日志记录列表时编码为列式格式，否则原样返回
+
+    分页日志工具返回 {"logs": [...], "next_cursor": ...}，只编码其中的 logs
+    """
+    if is_log_records(result):
+        return encode_columnar(result)
+    if isinstance(result, dict) and is_log_records(result.get("logs")):
+        return {**result, "logs": encode_columnar(result["logs"])}
+    return result
+
+
+def maybe_decode(result: Any) -> Any:
+    """结果是列式格式时还原为记录列表（分页结果还原其中的 logs），否则原样返回"""
+    if is_columnar(result):
+        return decode_columnar(result)
+    if isinstance(result, dict) and is_columnar(result.get("logs")):
+        return {**result, "logs": decode_columnar(result["logs"])}
+    return result
+
+
+def pack(payload: Any) -> Optional[bytes]:
+    """用 msgpack 编码；没有安装 msgpack 时返回 None"""
+    if msgpack is None:
+        return None
+    return msgpack.packb(payload, use_bin_type=True, default=str)
+
+
+def unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False)
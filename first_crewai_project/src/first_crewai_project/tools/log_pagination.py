@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+日志工具的游标分页 - 过滤后的日志按页返回，游标记住扫描停在哪一行
+
+第一次查询（不带 cursor）生成一份原始日志快照，放进有上限的 LRU 缓存；
+返回的 next_cursor 是不透明字符串，编码了快照 ID、下一页从快照的哪一行继续扫描、查询条件指纹。
+带着 cursor 再查时直接从该位置继续过滤，不重新生成日志，也不重复扫描前面的行；
+只有返回的这一页会解析成 UnifiedLogV1，其余行只做过滤判断。
+
+next_cursor 为 None 表示已经没有更多匹配的日志。快照被挤出缓存（或 MCP 服务器以 process
+模式运行、请求落在另一个工作进程）时游标失效，抛出 InvalidCursorError，调用方需不带 cursor 重新查询。
+"""
+import os
+import json
+import base64
+import hashlib
+import threading
+import itertools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .unified_log import UnifiedLogV1, parse_logs
+    from .keyword_matcher import keyword_hits
+except ImportError:
+    from unified_log import UnifiedLogV1, parse_logs
+    from keyword_matcher import keyword_hits
+
+# 最多缓存多少份日志快照（LRU），LOG_SNAPSHOT_CACHE_SIZE 覆盖
+SNAPSHOT_CACHE_SIZE = int(os.environ.get("LOG_SNAPSHOT_CACHE_SIZE", "64"))
+# 单页最多返回的条数
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析、已过期，或与本次查询条件不匹配"""
+
+
+class SnapshotCache:
+    """有上限的 LRU 快照缓存（MCP 服务器在线程池中执行工具，读写加锁）"""
+
+    def __init__(self, capacity: int = SNAPSHOT_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self._snapshots: "OrderedDict[str, Sequence[str]]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._prefix = os.urandom(4).hex()
+        self._lock = threading.Lock()
+
+    def put(self, lines: Sequence[str]) -> str:
+        with self._lock:
+            snapshot_id = f"{self._prefix}{next(self._ids):x}"
+            self._snapshots[snapshot_id] = lines
+            while len(self._snapshots) > self.capacity:
+                self._snapshots.popitem(last=False)
+            return snapshot_id
+
+    def get(self, snapshot_id: str) -> Optional[Sequence[str]]:
+        with self._lock:
+            lines = self._snapshots.get(snapshot_id)
+            if lines is not None:
+                self._snapshots.move_to_end(snapshot_id)
+            return lines
+
+    def __len__(self):
+        return len(self._snapshots)
+
+
+_snapshots = SnapshotCache()
+
+
+def query_fingerprint(*query: Any) -> str:
+    """查询条件指纹：防止把一个查询的游标用到另一个查询上"""
+    return hashlib.sha1(repr(query).encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(snapshot_id: str, offset: int, fingerprint: str) -> str:
+    raw = json.dumps([snapshot_id, offset, fingerprint], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        snapshot_id, offset, fingerprint = json.loads(raw)
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError(offset)
+        return str(snapshot_id), offset, str(fingerprint)
+    except (ValueError, TypeError):
+        raise InvalidCursorError(f"无法解析的游标: {cursor!r}") from None
+
+
+def paginate(
+        source: str,
+        server_ip: str,
+        generate: Callable[[], Sequence[str]],
+        predicate: Optional[Callable[[str], bool]],
+        query: Tuple[Any, ...],
+        cursor: Optional[str] = None,
+        page_size: int = 10,
+) -> Tuple[List[UnifiedLogV1], Optional[str]]:
+    """
+    从快照中取一页匹配的日志
+
+    Args:
+        source: 日志来源（nginx / redis ...），决定解析器
+        server_ip: 服务器 IP
+        generate: 不带 cursor 时生成原始日志快照
+        predicate: 过滤条件，None 表示不过滤
+        query: 本次查询的过滤参数，用于校验游标
+        cursor: 上一页返回的 next_cursor
+        page_size: 每页条数（1 ~ MAX_PAGE_SIZE）
+
+    Returns:
+        (本页记录, next_cursor)，没有更多匹配的日志时 next_cursor 为 None
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    fingerprint = query_fingerprint(source, server_ip, *query)
+
+    if cursor:
+        snapshot_id, offset, cursor_fingerprint = decode_cursor(cursor)
+        if cursor_fingerprint != fingerprint:
+            raise InvalidCursorError("游标与本次查询条件不匹配，翻页时请保持 server_ip 和过滤参数不变")
+        lines = _snapshots.get(snapshot_id)
+        if lines is None:
+            raise InvalidCursorError("游标已过期，请不带 cursor 重新查询")
+    else:
+        # 快照等确定有下一页时再保存：单页结果不占用 LRU，不会挤掉还在翻页的游标
+        lines = generate()
+        snapshot_id, offset = None, 0
+
+    # 扫描到第 page_size + 1 条匹配时停下：它就是下一页的起点，这样 next_cursor 只在确实还有数据时返回
+    page = []
+    next_offset = None
+    for index in range(offset, len(lines)):
+        line = lines[index]
+        if predicate is None or predicate(line):
+            if len(page) == page_size:
+                next_offset = index
+                break
+            page.append(line)
+
+    next_cursor = None
+    if next_offset is not None:
+        if snapshot_id is None:
+            snapshot_id = _snapshots.put(lines)
+        next_cursor = encode_cursor(snapshot_id, next_offset, fingerprint)
+    return parse_logs(source, page, server_ip), next_cursor
+
+
+def paged_result(result: Tuple[List[Dict[str, Any]], Optional[str]],
+                 cursor_field: str = "next_cursor") -> Dict[str, Any]:
+    """
+    (logs, next_cursor) → {"logs": [...], "next_cursor": ...}，供 HTTP / CrewAI 工具返回
+
+    cursor_field 为游标的字段名（MySQL 日志按时间翻页，用 next_start_time）；
+    按关键词查询时日志带有 matched_keywords，另外附上本页每个关键词的命中条数 keyword_hits
+    """
+    logs, next_cursor = result
+    paged = {"logs": logs, cursor_field: next_cursor}
+    if any("matched_keywords" in log for log in logs):
+        paged["keyword_hits"] = keyword_hits(logs)
+    return paged
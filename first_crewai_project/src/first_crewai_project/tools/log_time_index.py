@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+按时间戳排序的日志索引 - 时间窗过滤用二分查找，分页游标精确到同一秒内的第几条
+
+每行日志的时间戳只解析一次（同一秒的字符串只调用一次 strptime），转换成整数秒后稳定排序；
+start_time / end_time 用 bisect 直接定位到下标区间，不再逐行比较 datetime。
+
+分页游标是 "时间戳#序号"，例如 "2026-10-17 04:23:54#2"：从该秒开始，跳过这一秒内已经返回过的
+前 2 条匹配日志。不带 #序号 的普通时间字符串等价于 #0（包含这一秒的全部日志），与原来的
+start_time 含义一致。同一秒内有多条日志时，翻页既不会重复也不会遗漏。
+"""
+import calendar
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+CURSOR_SEPARATOR = "#"
+
+
+def to_epoch(moment: datetime) -> int:
+    """datetime → 整数秒（按字面时间计算，不做时区换算，只用于同一来源日志之间的比较）"""
+    return calendar.timegm(moment.timetuple())
+
+
+def format_cursor(timestamp: str, seq: int) -> str:
+    return f"{timestamp}{CURSOR_SEPARATOR}{seq}"
+
+
+def split_cursor(value: str) -> Tuple[str, int]:
+    """"时间戳#序号" → (时间戳, 序号)；没有序号或序号不合法时序号为 0"""
+    timestamp, _, seq = value.partition(CURSOR_SEPARATOR)
+    return timestamp, int(seq) if seq.isdigit() else 0
+
+
+class TimeIndex:
+    """按时间戳稳定排序后的日志，以及对应的整数秒数组"""
+
+    __slots__ = ("lines", "epochs", "unparsed")
+
+    def __init__(self, lines: Sequence[str], timestamp_of: Callable[[str], str] = lambda line: line[:19]):
+        cache: Dict[str, Optional[int]] = {}
+        keyed = []
+        for line in lines:
+            text = timestamp_of(line)
+            epoch = cache.get(text, False)
+            if epoch is False:
+                try:
+                    epoch = to_epoch(datetime.strptime(text, LOG_TIME_FORMAT))
+                except ValueError:
+                    epoch = None
+                cache[text] = epoch
+            keyed.append((epoch, line))
+
+        # 无法解析时间戳的日志排在最前面（与原来按 datetime.min 排序一致），时间窗过滤时排除
+        unparsed = [line for epoch, line in keyed if epoch is None]
+        parsed = sorted(((epoch, line) for epoch, line in keyed if epoch is not None), key=lambda item: item[0])
+        self.unparsed = len(unparsed)
+        self.lines: List[str] = unparsed + [line for _, line in parsed]
+        self.epochs: List[float] = [float("-inf")] * len(unparsed) + [epoch for epoch, _ in parsed]
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> range:
+        """时间戳落在 [start, end] 内的下标区间；不限制时间时包含无法解析时间戳的日志"""
+        if start is None and end is None:
+            return range(len(self.lines))
+        lo = bisect_left(self.epochs, start) if start is not None else 0
+        hi = bisect_right(self.epochs, end) if end is not None else len(self.lines)
+        return range(max(lo, self.unparsed), hi)
+
+    def __len__(self):
+        return len(self.lines)
@@ -4,14 +4,110 @@ MCP客户端 - 完全修复版，修正405错误
 
 import asyncio
 import aiohttp
+import atexit
+import contextvars
+import concurrent.futures
 import json
 import sys
 import os
+import threading
+import time
 import traceback
 
 # ✅ 添加类型导入
 from typing import Optional, List, Union, Dict, Any, Tuple
 
+try:
+    from .tool_tracing import tracer, trace_headers
+    from . import log_columnar
+except ImportError:
+    from tool_tracing import tracer, trace_headers
+    import log_columnar
+
+# 连接池配置：每个 MCP 服务器一个 keep-alive 连接池
+POOL_LIMIT = int(os.environ.get("MCP_CLIENT_POOL_LIMIT", "32"))
+KEEPALIVE_TIMEOUT = float(os.environ.get("MCP_CLIENT_KEEPALIVE", "30"))
+CALL_TIMEOUT = float(os.environ.get("MCP_CLIENT_TIMEOUT", "120"))
+# 日志类工具是否申请列式响应格式（见 log_columnar.py），MCP_CLIENT_COLUMNAR=0 关闭
+COLUMNAR_LOGS = os.environ.get("MCP_CLIENT_COLUMNAR", "1").lower() not in ("0", "false", "off")
+
+
+class MCPClientRuntime:
+    """
+    客户端运行时：一个常驻后台线程运行唯一的事件循环
+
+    同步的 CrewAI 工具函数通过 submit() 线程安全地把协程交给这个循环执行，
+    不再每次调用都新建事件循环；aiohttp 会话也绑定在这个循环上长期复用。
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="mcp-client-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit_future(self, coro) -> concurrent.futures.Future:
+        """把协程提交到后台循环，返回 concurrent.futures.Future；协程沿用调用方的 contextvars（追踪信息）"""
+        context = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def _start():
+            if not future.set_running_or_notify_cancel():
+                coro.close()
+                return
+            try:
+                task = self.loop.create_task(coro, context=context)
+            except TypeError:
+                # Python 3.10 的 create_task 不支持 context 参数
+                task = context.run(self.loop.create_task, coro)
+
+            def _done(t):
+                if t.cancelled():
+                    future.cancel()
+                elif t.exception() is not None:
+                    future.set_exception(t.exception())
+                else:
+                    future.set_result(t.result())
+
+            task.add_done_callback(_done)
+            future.add_done_callback(
+                lambda f: f.cancelled() and self.loop.call_soon_threadsafe(task.cancel))
+
+        self.loop.call_soon_threadsafe(_start)
+        return future
+
+    def submit(self, coro, timeout: float = CALL_TIMEOUT):
+        """在后台循环上执行协程并同步等待结果（供同步代码调用）"""
+        if self.in_loop_thread():
+            raise RuntimeError("不能在客户端事件循环线程内同步等待协程")
+        future = self.submit_future(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def close(self):
+        """关闭所有客户端会话并停止后台循环"""
+        if not self.loop.is_running():
+            return
+        try:
+            self.submit(_close_clients(), timeout=5)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+runtime = MCPClientRuntime()
+
+
 class MCPClient:
     """MCP客户端，通过HTTP连接到远程MCP服务器"""
 
@@ -19,6 +115,8 @@ class MCPClient:
         self.server_type = server_type
         self.base_url = None
         self.tools = {}
+        # keep-alive 会话，只在 runtime 的事件循环中创建和使用
+        self._session = None
 
         self.servers = {
             "ops": {
@@ -31,8 +129,35 @@ class MCPClient:
             }
         }
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取（必要时创建）该服务器的 keep-alive 会话"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=POOL_LIMIT, keepalive_timeout=KEEPALIVE_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """关闭 keep-alive 会话（会话属于 runtime 的事件循环，在那里关闭）"""
+        if self._session is None:
+            return
+        return await self._on_runtime(self._close())
+
+    async def _close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _on_runtime(self, coro):
+        """会话绑定在 runtime 的事件循环上；在其它事件循环中调用时转交给 runtime 执行"""
+        if runtime.in_loop_thread():
+            return await coro
+        return await asyncio.wrap_future(runtime.submit_future(coro))
+
     async def connect(self):
         """连接到MCP服务器"""
+        return await self._on_runtime(self._connect())
+
+    async def _connect(self):
         try:
             server_config = self.servers[self.server_type]
             self.base_url = f"http://localhost:{server_config['port']}"
@@ -40,64 +165,66 @@ class MCPClient:
             print(f"🔗 正在连接到{server_config['name']} ({self.base_url})...", file=sys.stderr)
 
             # 测试连接 - 只使用 GET 请求
-            async with aiohttp.ClientSession() as session:
-                # 1. 首先测试根路径
+            session = self._get_session()
+            # 1. 首先测试根路径
+            try:
+                print("   1. 测试 GET / ...", file=sys.stderr)
+                async with session.get(self.base_url) as response:
+                    print(f"     状态码: {response.status}", file=sys.stderr)
+                    if response.status == 200:
+                        data = await response.json()
+                        print(f"     响应: {data}", file=sys.stderr)
+
+                        # 从根路径获取工具名称列表
+                        if "tools" in data:
+                            for tool_name in data["tools"]:
+                                self.tools[tool_name] = {"name": tool_name}
+                            print(f"✅ 从根路径获取到 {len(self.tools)} 个工具", file=sys.stderr)
+                            return True
+            except Exception as e:
+                print(f"     GET / 失败: {e}", file=sys.stderr)
+
+            # 2. 如果没有获取到工具，尝试 /tools/list
+            if not self.tools:
                 try:
-                    print("   1. 测试 GET / ...", file=sys.stderr)
-                    async with session.get(self.base_url) as response:
+                    print("   2. 尝试 GET /tools/list ...", file=sys.stderr)
+                    async with session.get(f"{self.base_url}/tools/list") as response:
                         print(f"     状态码: {response.status}", file=sys.stderr)
                         if response.status == 200:
                             data = await response.json()
                             print(f"     响应: {data}", file=sys.stderr)
 
-                            # 从根路径获取工具名称列表
                             if "tools" in data:
-                                for tool_name in data["tools"]:
-                                    self.tools[tool_name] = {"name": tool_name}
-                                print(f"✅ 从根路径获取到 {len(self.tools)} 个工具", file=sys.stderr)
+                                for tool in data["tools"]:
+                                    self.tools[tool["name"]] = tool
+                                print(f"✅ 从/tools/list获取到 {len(self.tools)} 个工具", file=sys.stderr)
                                 return True
                 except Exception as e:
-                    print(f"     GET / 失败: {e}", file=sys.stderr)
-
-                # 2. 如果没有获取到工具，尝试 /tools/list
-                if not self.tools:
-                    try:
-                        print("   2. 尝试 GET /tools/list ...", file=sys.stderr)
-                        async with session.get(f"{self.base_url}/tools/list") as response:
-                            print(f"     状态码: {response.status}", file=sys.stderr)
-                            if response.status == 200:
-                                data = await response.json()
-                                print(f"     响应: {data}", file=sys.stderr)
-
-                                if "tools" in data:
-                                    for tool in data["tools"]:
-                                        self.tools[tool["name"]] = tool
-                                    print(f"✅ 从/tools/list获取到 {len(self.tools)} 个工具", file=sys.stderr)
-                                    return True
-                    except Exception as e:
-                        print(f"     GET /tools/list 失败: {e}", file=sys.stderr)
-
-                # 3. 如果以上都失败，使用预设的工具列表
-                print("   3. 使用预设工具列表...", file=sys.stderr)
-                if self.server_type == "ops":
-                    self.tools = {
-                        "get_nginx_servers": {},
-                        "get_server_logs_simple": {},
-                        "get_mysql_logs_simple": {},
-                        "mysql_runtime_diagnosis": {},
-                        "get_redis_logs_simple": {},
-                        "search_code_in_repository": {},  # ✅ 添加
-                        "get_code_context": {},  # ✅ 添加
-                        "analyze_code_pattern": {}  # ✅ 添加
-                    }
-                else:
-                    self.tools = {
-                        "get_nginx_servers": {},
-                        "get_server_metrics_simple": {}
-                    }
+                    print(f"     GET /tools/list 失败: {e}", file=sys.stderr)
 
-                print(f"✅ 使用预设工具列表: {list(self.tools.keys())}", file=sys.stderr)
-                return True
+            # 3. 如果以上都失败，使用预设的工具列表
+            print("   3. 使用预设工具列表...", file=sys.stderr)
+            if self.server_type == "ops":
+                self.tools = {
+                    "get_nginx_servers": {},
+                    "get_server_logs_simple": {},
+                    "get_nginx_log_stats": {},
+                    "get_mysql_logs_simple": {},
+                    "mysql_runtime_diagnosis": {},
+                    "get_redis_logs_simple": {},
+                    "search_code_in_repository": {},  # ✅ 添加
+                    "search_code_content": {},
+                    "get_code_context": {},  # ✅ 添加
+                    "analyze_code_pattern": {}  # ✅ 添加
+                }
+            else:
+                self.tools = {
+                    "get_nginx_servers": {},
+                    "get_server_metrics_simple": {}
+                }
+
+            print(f"✅ 使用预设工具列表: {list(self.tools.keys())}", file=sys.stderr)
+            return True
 
         except Exception as e:
             print(f"❌ 连接失败: {e}", file=sys.stderr)
@@ -108,10 +235,12 @@ class MCPClient:
                 self.tools = {
                     "get_nginx_servers": {},
                     "get_server_logs_simple": {},
+                    "get_nginx_log_stats": {},
                     "get_mysql_logs_simple": {},
                     "mysql_runtime_diagnosis": {},
                     "get_redis_logs_simple": {},
                     "search_code_in_repository": {},  # ✅ 添加
+                    "search_code_content": {},
                     "get_code_context": {},  # ✅ 添加
                     "analyze_code_pattern": {}  # ✅ 添加
                 }
@@ -123,55 +252,203 @@ class MCPClient:
             print(f"⚠️  使用离线工具列表: {list(self.tools.keys())}", file=sys.stderr)
             return True
 
-    async def call_tool(self, tool_name: str, arguments: dict = None):
-        """调用远程工具"""
+    async def call_tool(self, tool_name: str, arguments: dict = None, columnar: bool = False):
+        """
+        调用远程工具，返回结果的 JSON 文本
+
+        columnar=True 时申请列式日志格式（装了 msgpack 时用 msgpack 传输），
+        在客户端还原为记录列表，返回的文本与普通调用一致，只是传输更小、编解码更快
+        """
+        return await self._on_runtime(self._call_tool(tool_name, arguments, columnar))
+
+    async def fetch_records(self, tool_name: str, arguments: dict = None):
+        """调用日志类工具，以列式格式传输，直接返回还原后的 Python 对象（不转成文本）"""
+        return await self._on_runtime(self._call_tool(tool_name, arguments, columnar=True, as_text=False))
+
+    async def _call_tool(self, tool_name: str, arguments: dict = None, columnar: bool = False,
+                         as_text: bool = True):
         if not self.tools:
-            await self.connect()
+            await self._connect()
 
         if tool_name not in self.tools:
             print(f"❌ 工具 '{tool_name}' 不存在", file=sys.stderr)
             return {"error": f"工具 '{tool_name}' 不存在"}
 
+        # 追踪：墙钟耗时、序列化耗时（请求编码 + 响应解析 + 结果转文本）、请求 / 响应字节数
+        start = time.perf_counter()
+        serialize_s = 0.0
+        request_bytes = response_bytes = None
         try:
             print(f"🛠️  调用工具: {tool_name}", file=sys.stderr)
             print(f"   参数: {arguments}", file=sys.stderr)
 
-            async with aiohttp.ClientSession() as session:
-                # 根据服务器代码，我们需要发送 POST 请求到 /tools/call
-                url = f"{self.base_url}/tools/call"
-                payload = {
-                    "tool_name": tool_name,
-                    "arguments": arguments or {}
-                }
+            session = self._get_session()
+            # 根据服务器代码，我们需要发送 POST 请求到 /tools/call
+            url = f"{self.base_url}/tools/call"
+            payload = {
+                "tool_name": tool_name,
+                "arguments": arguments or {}
+            }
+            headers = {"Content-Type": "application/json", **trace_headers(tool_name)}
+            if columnar:
+                payload["format"] = "columnar"
+                if log_columnar.msgpack is not None:
+                    headers["Accept"] = log_columnar.MSGPACK_MEDIA_TYPE
+
+            print(f"   请求URL: {url}", file=sys.stderr)
+            print(f"   请求数据: {json.dumps(payload, indent=2)}", file=sys.stderr)
+
+            mark = time.perf_counter()
+            body = json.dumps(payload).encode("utf-8")
+            serialize_s += time.perf_counter() - mark
+            request_bytes = len(body)
+
+            async with session.post(url, data=body, headers=headers) as response:
+                print(f"   响应状态码: {response.status}", file=sys.stderr)
+                response_body = await response.read()
+                response_bytes = len(response_body)
+
+                if response.status == 200:
+                    mark = time.perf_counter()
+                    if response.content_type == log_columnar.MSGPACK_MEDIA_TYPE:
+                        result = log_columnar.unpack(response_body)
+                    else:
+                        result = json.loads(response_body)
+                    if "result" in result:
+                        result = log_columnar.maybe_decode(result["result"])
+                    if not as_text:
+                        serialize_s += time.perf_counter() - mark
+                        self._trace(tool_name, start, serialize_s, request_bytes, response_bytes)
+                        return result
+                    text = json.dumps(result, ensure_ascii=False, indent=2)
+                    serialize_s += time.perf_counter() - mark
+
+                    print(f"✅ 工具调用成功", file=sys.stderr)
+                    print(f"   响应: {text[:500]}...", file=sys.stderr)
+                    self._trace(tool_name, start, serialize_s, request_bytes, response_bytes)
+                    return text
+                else:
+                    error_text = response_body.decode("utf-8", "replace")
+                    print(f"❌ HTTP错误: {response.status}", file=sys.stderr)
+                    print(f"   错误详情: {error_text[:200]}", file=sys.stderr)
+                    self._trace(tool_name, start, serialize_s, request_bytes, response_bytes,
+                                error=f"HTTP {response.status}")
+                    return {
+                        "error": f"HTTP错误: {response.status}",
+                        "details": error_text[:500]
+                    }
+
+        except Exception as e:
+            print(f"❌ 工具调用失败: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            self._trace(tool_name, start, serialize_s, request_bytes, response_bytes, error=str(e)[:200])
+            return {"error": str(e)}
 
-                print(f"   请求URL: {url}", file=sys.stderr)
-                print(f"   请求数据: {json.dumps(payload, indent=2)}", file=sys.stderr)
+    async def call_tools(self, calls: List[Tuple[str, dict]]):
+        """
+        批量调用远程工具：一次 HTTP 往返，服务器端并发执行
 
-                async with session.post(url, json=payload) as response:
-                    print(f"   响应状态码: {response.status}", file=sys.stderr)
+        calls 为 [(tool_name, arguments), ...]，返回与之一一对应的结果列表；
+        每一项与 call_tool 的返回一致（成功为 JSON 文本，失败为 {"error": ...}）
+        """
+        return await self._on_runtime(self._call_tools(calls))
 
-                    if response.status == 200:
-                        result = await response.json()
-                        print(f"✅ 工具调用成功", file=sys.stderr)
-                        print(f"   响应: {json.dumps(result, ensure_ascii=False, indent=2)[:500]}...", file=sys.stderr)
-
-                        if "result" in result:
-                            return json.dumps(result["result"], ensure_ascii=False, indent=2)
-                        else:
-                            return json.dumps(result, ensure_ascii=False, indent=2)
-                    else:
-                        error_text = await response.text()
-                        print(f"❌ HTTP错误: {response.status}", file=sys.stderr)
-                        print(f"   错误详情: {error_text[:200]}", file=sys.stderr)
-                        return {
-                            "error": f"HTTP错误: {response.status}",
-                            "details": error_text[:500]
+    async def _call_tools(self, calls: List[Tuple[str, dict]]):
+        if not self.tools:
+            await self._connect()
+
+        calls = list(calls)
+        results = [None] * len(calls)
+        # 未知工具在本地直接报错，不发给服务器
+        pending = []
+        for index, (tool_name, arguments) in enumerate(calls):
+            if tool_name not in self.tools:
+                print(f"❌ 工具 '{tool_name}' 不存在", file=sys.stderr)
+                results[index] = {"error": f"工具 '{tool_name}' 不存在"}
+            else:
+                pending.append((index, tool_name, arguments))
+        if not pending:
+            return results
+
+        trace_name = f"call_batch[{','.join(sorted({tool_name for _, tool_name, _ in pending}))}]"
+        start = time.perf_counter()
+        serialize_s = 0.0
+        request_bytes = response_bytes = None
+        try:
+            print(f"🛠️  批量调用 {len(pending)} 个工具: {[tool_name for _, tool_name, _ in pending]}",
+                  file=sys.stderr)
+
+            session = self._get_session()
+            url = f"{self.base_url}/tools/call_batch"
+            payload = {
+                "calls": [
+                    {"tool_name": tool_name, "arguments": arguments or {}}
+                    for _, tool_name, arguments in pending
+                ]
+            }
+
+            mark = time.perf_counter()
+            body = json.dumps(payload).encode("utf-8")
+            serialize_s += time.perf_counter() - mark
+            request_bytes = len(body)
+            headers = {"Content-Type": "application/json", **trace_headers(trace_name)}
+
+            async with session.post(url, data=body, headers=headers) as response:
+                print(f"   响应状态码: {response.status}", file=sys.stderr)
+                response_body = await response.read()
+                response_bytes = len(response_body)
+
+                if response.status != 200:
+                    error_text = response_body.decode("utf-8", "replace")
+                    print(f"❌ HTTP错误: {response.status}", file=sys.stderr)
+                    print(f"   错误详情: {error_text[:200]}", file=sys.stderr)
+                    self._trace(trace_name, start, serialize_s, request_bytes, response_bytes,
+                                error=f"HTTP {response.status}")
+                    error = {"error": f"HTTP错误: {response.status}", "details": error_text[:500]}
+                    for index, _, _ in pending:
+                        results[index] = dict(error)
+                    return results
+
+                mark = time.perf_counter()
+                items = json.loads(response_body).get("results", [])
+                for (index, tool_name, _), item in zip(pending, items):
+                    if "error" in item:
+                        results[index] = {
+                            "error": f"HTTP错误: {item.get('status', 500)}",
+                            "details": str(item["error"])[:500]
                         }
+                    else:
+                        results[index] = json.dumps(item.get("result"), ensure_ascii=False, indent=2)
+                serialize_s += time.perf_counter() - mark
+
+            failed = sum(1 for index, _, _ in pending if isinstance(results[index], dict))
+            print(f"✅ 批量调用完成: {len(pending) - failed} 成功, {failed} 失败", file=sys.stderr)
+            self._trace(trace_name, start, serialize_s, request_bytes, response_bytes,
+                        error=f"{failed}/{len(pending)} 项失败" if failed else None)
+            for index, _, _ in pending:
+                if results[index] is None:
+                    results[index] = {"error": "服务器未返回该项结果"}
+            return results
 
         except Exception as e:
-            print(f"❌ 工具调用失败: {e}", file=sys.stderr)
+            print(f"❌ 批量调用失败: {e}", file=sys.stderr)
             traceback.print_exc(file=sys.stderr)
-            return {"error": str(e)}
+            self._trace(trace_name, start, serialize_s, request_bytes, response_bytes, error=str(e)[:200])
+            for index, _, _ in pending:
+                results[index] = {"error": str(e)}
+            return results
+
+    def _trace(self, tool_name, start, serialize_s, request_bytes, response_bytes, error=None):
+        """记录一次 call_tool 的追踪数据"""
+        tracer.record(
+            f"client:{self.server_type}", tool_name,
+            (time.perf_counter() - start) * 1000,
+            serialize_ms=serialize_s * 1000,
+            request_bytes=request_bytes,
+            response_bytes=response_bytes,
+            ok=error is None,
+            error=error,
+        )
 
 # 创建全局客户端实例
 ops_client = None
@@ -196,59 +473,88 @@ async def init_clients():
     else:
         print("⚠️  MCP客户端部分初始化失败", file=sys.stderr)
 
+
+async def _close_clients():
+    """关闭所有客户端的 keep-alive 会话"""
+    for client in (ops_client, monitor_client):
+        if client is not None:
+            await client.close()
+
+
+def _call_sync(client: MCPClient, tool_name: str, arguments: dict, columnar: bool = False):
+    """同步调用远程工具：提交到常驻事件循环执行，复用 keep-alive 连接"""
+    try:
+        return runtime.submit(client.call_tool(tool_name, arguments, columnar))
+    except Exception as e:
+        return {"error": str(e)}
+
+def _call_batch_sync(client: MCPClient, calls: List[Tuple[str, dict]]) -> List[Any]:
+    """同步批量调用远程工具（一次往返），返回与 calls 一一对应的结果列表"""
+    try:
+        return runtime.submit(client.call_tools(calls))
+    except Exception as e:
+        return [{"error": str(e)} for _ in calls]
+
 # 同步包装函数（供CrewAI使用）
 from crewai.tools import tool
 
 @tool("获取Nginx服务器列表")
 def get_nginx_servers() -> Dict[str, Any]:
     """获取所有Nginx服务器的IP地址和基本信息。"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("get_nginx_servers", {}))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "get_nginx_servers", {})
 
 @tool("获取服务器日志")
-def get_server_logs(server_ip: str, api_endpoint: str = None, keywords=None) -> Dict[str, Any]:
-    """获取指定服务器的Nginx日志。"""
+def get_server_logs(server_ip: str, api_endpoint: str = None, keywords=None,
+                    cursor: str = None, page_size: int = None) -> Dict[str, Any]:
+    """
+    获取指定服务器的Nginx日志，按页返回 {"logs": [...], "next_cursor": ...}。
+    next_cursor 不为空表示还有更多日志：保持其他参数不变、带上 cursor 再次调用获取下一页。
+    """
     arguments = {"server_ip": server_ip}
     if api_endpoint:
         arguments["api_endpoint"] = api_endpoint
     if keywords:
         arguments["keywords"] = keywords
+    if cursor:
+        arguments["cursor"] = cursor
+    if page_size:
+        arguments["page_size"] = page_size
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("get_server_logs_simple", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "get_server_logs_simple", arguments, columnar=COLUMNAR_LOGS)
+
+@tool("Nginx日志聚合统计")
+def get_nginx_log_stats(server_ip: str, api_endpoint: str = None, bucket_minutes: int = 5) -> Dict[str, Any]:
+    """
+    按接口、按时间桶汇总指定服务器的 Nginx 请求数、状态码类别（2xx/4xx/5xx...）和延迟 p50/p95/p99。
+    结果覆盖全部日志且很小，适合先定位错误激增的接口和时间段，再用“获取服务器日志”查看原始日志。
+    """
+    arguments = {"server_ip": server_ip, "bucket_minutes": bucket_minutes}
+    if api_endpoint:
+        arguments["api_endpoint"] = api_endpoint
+
+    return _call_sync(ops_client, "get_nginx_log_stats", arguments)
 
 @tool("获取MySQL日志")
-def get_mysql_logs_simple(server_ip: str, keywords: str = "", min_duration_s: float = 0.0) -> Dict[str, Any]:
-    """获取MySQL日志。"""
+def get_mysql_logs_simple(server_ip: str, keywords: str = "", min_duration_s: float = 0.0,
+                          start_time: str = None, end_time: str = None, limit: int = None) -> Dict[str, Any]:
+    """
+    获取MySQL日志，按时间升序返回 {"logs": [...], "next_start_time": ...}。
+    start_time / end_time 格式为 YYYY-MM-DD HH:MM:SS，limit 为本次最多返回的条数。
+    next_start_time 不为空表示还有更多日志：保持其他参数不变、把它原样作为 start_time 再次调用获取下一页。
+    """
     arguments = {
         "server_ip": server_ip,
         "keywords": keywords,
         "min_duration_s": min_duration_s
     }
+    if start_time:
+        arguments["start_time"] = start_time
+    if end_time:
+        arguments["end_time"] = end_time
+    if limit:
+        arguments["limit"] = limit
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("get_mysql_logs_simple", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "get_mysql_logs_simple", arguments, columnar=COLUMNAR_LOGS)
 
 @tool("获取服务器指标")
 def get_server_metrics(
@@ -268,37 +574,61 @@ def get_server_metrics(
     if metric_name is not None:
         arguments["metric_name"] = metric_name
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(monitor_client.call_tool("get_server_metrics_simple", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(monitor_client, "get_server_metrics_simple", arguments)
+
+
+@tool("批量获取服务器指标")
+def get_servers_metrics_batch(
+    server_ips: Optional[List[str]] = None,
+    metric_name: Union[str, List[str], None] = None
+) -> Dict[str, Any]:
+    """
+    一次性获取多台服务器的性能指标（一次请求，服务器端并发查询）。
+
+    server_ips 不传时查询全部 Nginx 服务器；metric_name 的用法与“获取服务器指标”相同。
+    返回 {服务器IP: 指标结果}，便于直接对比不同服务器的指标差异。
+    """
+    if not server_ips:
+        servers = _call_sync(monitor_client, "get_nginx_servers", {})
+        if isinstance(servers, dict):
+            return servers
+        server_ips = [server["ip"] for server in json.loads(servers)]
+
+    arguments = {} if metric_name is None else {"metric_name": metric_name}
+    calls = [("get_server_metrics_simple", {"server_ip": ip, **arguments}) for ip in server_ips]
+    results = _call_batch_sync(monitor_client, calls)
+
+    merged = {}
+    for ip, result in zip(server_ips, results):
+        if isinstance(result, str):
+            try:
+                result = json.loads(result)
+            except ValueError:
+                pass
+        merged[ip] = result
+    return merged
 
 
 # 添加缺失的工具函数
 
 @tool("获取Redis日志")
-def get_redis_logs_simple(server_ip: str, keywords=None, min_duration=None) -> Dict[str, Any]:
-    """获取Redis日志。"""
+def get_redis_logs_simple(server_ip: str, keywords=None, min_duration=None,
+                          cursor: str = None, page_size: int = None) -> Dict[str, Any]:
+    """
+    获取Redis日志，按页返回 {"logs": [...], "next_cursor": ...}。
+    next_cursor 不为空表示还有更多日志：保持其他参数不变、带上 cursor 再次调用获取下一页。
+    """
     arguments = {"server_ip": server_ip}
     if keywords:
         arguments["keywords"] = keywords
     if min_duration is not None:
         arguments["min_duration"] = min_duration
+    if cursor:
+        arguments["cursor"] = cursor
+    if page_size:
+        arguments["page_size"] = page_size
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("get_redis_logs_simple", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "get_redis_logs_simple", arguments, columnar=COLUMNAR_LOGS)
 
 
 @tool("MySQL运行时诊断")
@@ -309,15 +639,7 @@ def mysql_runtime_diagnosis(server_ip: str, action: str) -> Dict[str, Any]:
         "action": action
     }
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("mysql_runtime_diagnosis", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "mysql_runtime_diagnosis", arguments)
 
 
 @tool("搜索代码仓库")
@@ -339,15 +661,34 @@ def search_code_in_repository(
     if file_path is not None:
         arguments["file_path"] = file_path
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("search_code_in_repository", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "search_code_in_repository", arguments)
+
+
+@tool("搜索代码内容")
+def search_code_content(
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        file_pattern: Optional[str] = None,
+        context_lines: int = 2,
+        max_results: int = 50
+) -> Dict[str, Any]:
+    """
+    在代码文件内容中全文搜索（如 "time.sleep"、"requests.get("），返回命中的文件、行号和前后几行代码片段。
+    regex=True 时按正则表达式搜索；file_pattern 限定文件范围（如 "app/services/*.py"）。
+    一次调用即可定位可疑代码，不必逐个文件获取代码上下文。
+    """
+    arguments = {
+        "query": query,
+        "regex": regex,
+        "case_sensitive": case_sensitive,
+        "context_lines": context_lines,
+        "max_results": max_results
+    }
+    if file_pattern:
+        arguments["file_pattern"] = file_pattern
+
+    return _call_sync(ops_client, "search_code_content", arguments)
 
 
 @tool("获取代码上下文")
@@ -375,15 +716,7 @@ def get_code_context(
     if highlight_lines:
         arguments["highlight_lines"] = highlight_lines
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("get_code_context", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "get_code_context", arguments)
 
 
 @tool("分析代码模式")
@@ -400,15 +733,7 @@ def analyze_code_pattern(
     if issue_type:
         arguments["issue_type"] = issue_type
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(ops_client.call_tool("analyze_code_pattern", arguments))
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        loop.close()
+    return _call_sync(ops_client, "analyze_code_pattern", arguments)
 
 # 初始化客户端连接
 print("🚀 正在启动MCP客户端...", file=sys.stderr)
@@ -422,9 +747,8 @@ try:
         subprocess.check_call([sys.executable, "-m", "pip", "install", "aiohttp"])
         import aiohttp
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(init_clients())
+    runtime.submit(init_clients())
+    atexit.register(runtime.close)
     print("✅ MCP客户端启动成功", file=sys.stderr)
 except Exception as e:
     print(f"❌ MCP客户端启动失败: {e}", file=sys.stderr)
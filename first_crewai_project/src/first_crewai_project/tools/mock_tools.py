@@ -9,8 +9,6 @@ import os
 import re
 import json
 from typing import Dict, List, Any, Optional, Tuple
-import fnmatch
-import chardet
 
 # ==================== 统一路径配置 ====================
 # 方案1：使用相对路径（推荐，方便移植）
@@ -66,8 +64,33 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from redis_test_data import generate_redis_logs_for_server
 
-# ==================== 原始函数（不装饰）====================
-
+# 工具调用追踪（作为 tools 包导入时用相对导入，MCP 服务器直接导入 mock_tools 时用绝对导入）
+try:
+    from .tool_tracing import traced
+    from .unified_log import parse_logs, to_dicts
+    from .log_pagination import paginate, paged_result
+    from .log_aggregation import aggregate_nginx_logs
+    from .keyword_matcher import get_matcher, annotate_matches
+    from .log_time_index import TimeIndex, to_epoch, split_cursor, format_cursor
+    from .code_index import get_code_index
+    from .content_index import get_content_index
+    from .source_cache import read_lines
+    from .code_patterns import pattern_library
+except ImportError:
+    from tool_tracing import traced
+    from unified_log import parse_logs, to_dicts
+    from log_pagination import paginate, paged_result
+    from log_aggregation import aggregate_nginx_logs
+    from keyword_matcher import get_matcher, annotate_matches
+    from log_time_index import TimeIndex, to_epoch, split_cursor, format_cursor
+    from code_index import get_code_index
+    from content_index import get_content_index
+    from source_cache import read_lines
+    from code_patterns import pattern_library
+
+# ==================== 原始函数（不经 @tool 装饰，只加追踪）====================
+
+@traced
 def get_nginx_servers_raw() -> List[Dict[str, Any]]:
     """获取所有Nginx服务器的IP地址和基本信息。"""
     print(f"[工具调用] get_nginx_servers() - 获取服务器列表")
@@ -78,14 +101,17 @@ def get_nginx_servers_raw() -> List[Dict[str, Any]]:
     return servers
 
 
+@traced
 def get_server_logs_simple_raw(
         server_ip: str,
         api_endpoint: str = None,
-        keywords: Union[str, List[str]] = None
-) -> List[Dict[str, Any]]:
+        keywords: Union[str, List[str]] = None,
+        cursor: Optional[str] = None,
+        page_size: int = 10
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
     获取服务器日志（Nginx），并输出统一日志结构 UnifiedLogV1：
-    根据【关键词或者时间戳】【分批】搜索出来
+    根据【关键词或者接口路径】过滤，按【游标】分页返回
     {
         "source": "nginx",
         "server_ip": "...",
@@ -96,86 +122,81 @@ def get_server_logs_simple_raw(
         "latency_ms": 200.5,
         "raw": "原始日志"
     }
-    """
-    print(f"[工具调用] get_server_logs_simple('{server_ip}', api_endpoint={api_endpoint}, keywords={keywords})")
 
-    # 生成日志
-    logs = generate_nginx_logs_for_server(server_ip, 60)
+    Args:
+        server_ip: 服务器IP
+        api_endpoint: 只返回包含该接口路径的日志
+        keywords: 关键词（不区分大小写），多个关键词满足其一即可
+        cursor: 上一页返回的 next_cursor，不传则从头查询
+        page_size: 每页条数
 
-    # 按 接口路径 过滤
-    if api_endpoint:
-        logs = [log for log in logs if api_endpoint in log]
+    Returns:
+        (本页日志, next_cursor)，next_cursor 为 None 表示没有更多日志
+    """
+    print(f"[工具调用] get_server_logs_simple('{server_ip}', api_endpoint={api_endpoint}, keywords={keywords}, "
+          f"cursor={cursor}, page_size={page_size})")
+
+    matcher = get_matcher(keywords)
+
+    # 按 接口路径 和 关键词（不区分大小写）过滤，只在翻页扫描时逐行判断
+    def matches(log: str) -> bool:
+        if api_endpoint and api_endpoint not in log:
+            return False
+        return matcher is None or matcher.search(log)
+
+    records, next_cursor = paginate(
+        "nginx", server_ip,
+        generate=lambda: generate_nginx_logs_for_server(server_ip, 60),
+        predicate=matches if api_endpoint or matcher else None,
+        query=(api_endpoint, matcher and [k.lower() for k in matcher.keywords]),
+        cursor=cursor,
+        page_size=page_size,
+    )
 
-    # 按关键词过滤：不区分大小写
-    if keywords:
-        if isinstance(keywords, str):
-            keywords = [keywords]
+    print(f"[工具调用] 本页 {len(records)} 条相关日志，{'还有更多' if next_cursor else '没有更多了'}")
+    return annotate_matches(to_dicts(records), matcher), next_cursor
 
-        logs = [
-            log for log in logs
-            if any(k.lower() in log.lower() for k in keywords)
-        ]
 
-    print(f"[工具调用] 找到 {len(logs)} 条相关日志")
+@traced
+def get_nginx_log_stats_raw(
+        server_ip: str,
+        api_endpoint: Optional[str] = None,
+        bucket_minutes: int = 5
+) -> Dict[str, Any]:
+    """
+    Nginx 日志聚合统计：按接口、按时间桶汇总请求数、状态码类别（2xx/4xx/5xx...）和延迟 p50/p95/p99。
+    一次覆盖全部日志，适合先看整体分布、定位错误激增的接口和时间段，再按需翻看原始日志。
 
-    # 解析 Nginx 日志 → 统一结构 UnifiedLogV1
-    structured_logs = []
+    Args:
+        server_ip: 服务器IP
+        api_endpoint: 只统计包含该接口路径的日志
+        bucket_minutes: 时间桶宽度（分钟）
+    """
+    print(f"[工具调用] get_nginx_log_stats('{server_ip}', api_endpoint={api_endpoint}, bucket_minutes={bucket_minutes})")
 
-    for log in logs[:10]:  # 仍然只处理前10条，避免LLM负载过大
-        try:
-            import re
-
-            # 路径
-            path_match = re.search(r'"(GET|POST)\s+([^\s?]+)', log)
-            method = path_match.group(1) if path_match else "UNKNOWN"
-            path = path_match.group(2) if path_match else "unknown"
-
-            # 状态码
-            status_match = re.search(r'"\s+(\d{3})\s+', log)
-            status_code = status_match.group(1) if status_match else "000"
-
-            # 响应时间
-            rt_match = re.search(r'([\d.]+)$', log)
-            response_time = float(rt_match.group(1)) if rt_match else 0.0
-            latency_ms = response_time * 1000
-
-            # IP
-            ip_match = re.match(r'(\S+)', log)
-            client_ip = ip_match.group(1) if ip_match else "0.0.0.0"
-
-            # 时间戳
-            time_match = re.search(r'\[(.*?)\]', log)
-            timestamp = time_match.group(1) if time_match else ""
-
-            # 统一结构 UnifiedLogV1
-            structured_logs.append({
-                "source": "nginx",
-                "server_ip": server_ip,
-                "timestamp": timestamp,
-                "severity": "ERROR" if int(status_code) >= 500 else "INFO",
-                "operation": f"{method} {path}",
-                "status": status_code,
-                "latency_ms": latency_ms,
-                "raw": log
-            })
+    stats = aggregate_nginx_logs(generate_nginx_logs_for_server(server_ip, 60), bucket_minutes, api_endpoint)
 
-        except Exception as e:
-            print(f"[警告] 解析日志失败: {e}")
-            continue
+    print(f"[工具调用] 统计 {stats['total_requests']} 条请求，{len(stats['endpoints'])} 个接口")
+    return {"server_ip": server_ip, **stats}
 
-    return structured_logs
 
+_MYSQL_DURATION = re.compile(r'duration=([\d.]+)s')
 
+
+@traced
 def get_mysql_logs_simple_raw(
         server_ip: str,
         start_time: str = "",
         end_time: str = "",
-        keywords: str = "",
+        keywords: Union[str, List[str]] = "",
         min_duration_s: float = 0.0,
         limit: int = 1000
 ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
     获取 MySQL 日志（模拟），并解析为统一日志结构 UnifiedLogV1 格式。
+
+    按时间升序返回最多 limit 条；返回的 next_start_time 是 "时间戳#序号" 形式的游标，
+    作为 start_time 传回即可获取下一页（同一秒内的多条日志不会重复或遗漏），为 None 表示没有更多日志。
     """
     print(f"[工具调用] get_mysql_logs_simple - server_ip: {server_ip}")
 
@@ -201,9 +222,8 @@ def get_mysql_logs_simple_raw(
     else:
         min_duration_s_val = None
 
-    # 原有的生成和解析逻辑保持不变...
-    # 1. 生成日志（原始字符串）
-    raw_logs = generate_mysql_logs_for_server(server_ip, 60)
+    # 1. 生成日志（原始字符串），每行的时间戳只解析一次，按时间稳定排序
+    index = TimeIndex(generate_mysql_logs_for_server(server_ip, 60))
 
     # 辅助函数：解析时间字符串（支持多种格式）
     def parse_time_string(time_str: str) -> Optional[datetime]:
@@ -228,93 +248,52 @@ def get_mysql_logs_simple_raw(
                 print(f"[警告] 无法解析时间格式: {time_str}")
                 return None
 
-    # 辅助函数：解析日志时间戳
-    def parse_ts(log: str) -> Optional[datetime]:
-        try:
-            ts_str = log[:19]  # 假设格式为 "YYYY-MM-DD HH:MM:SS"
-            return datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return None
-
-    # 关键词过滤
-    if keywords_list:
-        raw_logs = [log for log in raw_logs if any(k.lower() in log.lower() for k in keywords_list)]
-
-    # 最小耗时过滤（筛选慢 SQL）
-    if min_duration_s_val and min_duration_s_val > 0:
-        filtered = []
-        for log in raw_logs:
-            import re
-            duration_match = re.search(r'duration=([\d.]+)s', log)
-            if duration_match:
-                duration = float(duration_match.group(1))
-                if duration >= min_duration_s_val:
-                    filtered.append(log)
-        raw_logs = filtered
-
-    # 时间窗过滤（限流）
-    if start_time:
-        start_dt = parse_time_string(start_time)
-        if start_dt:
-            raw_logs = [log for log in raw_logs if parse_ts(log) and parse_ts(log) >= start_dt]
-
-    if end_time:
-        end_dt = parse_time_string(end_time)
-        if end_dt:
-            raw_logs = [log for log in raw_logs if parse_ts(log) and parse_ts(log) <= end_dt]
-
-    # 排序，将所有日志按照时间戳升序排序
-    raw_logs.sort(key=lambda x: parse_ts(x) or datetime.min)
-    print(f"[工具调用] 找到 {len(raw_logs)} 条 MySQL 日志")
-
-    # 解析 → 统一结构 UnifiedLogV1 → 并只筛选limit条日志
-    batch_logs = raw_logs[:limit]
-    structured_logs = []
+    # 2. 时间窗（限流）：start_time 可以是上一页返回的 "时间戳#序号" 游标，二分查找定位下标区间
+    start_text, skip = split_cursor(start_time) if start_time else (None, 0)
+    start_dt = parse_time_string(start_text)
+    end_dt = parse_time_string(end_time)
+    start_epoch = to_epoch(start_dt) if start_dt else None
+    window = index.window(start_epoch, to_epoch(end_dt) if end_dt else None)
+
+    # 3. 关键词 + 最小耗时过滤（筛选慢 SQL），只检查时间窗内的日志
+    matcher = get_matcher(keywords_list)
+    slow_only = bool(min_duration_s_val and min_duration_s_val > 0)
+
+    def matches(log: str) -> bool:
+        if matcher is not None and not matcher.search(log):
+            return False
+        if slow_only:
+            duration_match = _MYSQL_DURATION.search(log)
+            return bool(duration_match) and float(duration_match.group(1)) >= min_duration_s_val
+        return True
+
+    # 4. 取 limit 条；seq 是当前日志在同一秒内匹配日志中的序号，游标据此跳过上一页已返回的部分
+    batch_logs = []
     next_start_time = None
-
-    for log in batch_logs:
-        try:
-            import re
-            # 时间戳
-            ts = log[:19]
-            # 严重级别
-            sev_match = re.search(r"\[(INFO|WARN|ERROR)\]", log)
-            severity = sev_match.group(1) if sev_match else "INFO"
-
-            # SQL
-            sql_match = re.search(r'sql="([^"]+)"', log)
-            sql = sql_match.group(1) if sql_match else "UNKNOWN SQL"
-
-            # 耗时
-            dur_match = re.search(r'duration=([\d.]+)s', log)
-            latency_ms = float(dur_match.group(1)) * 1000 if dur_match else 0.0
-
-            status = "ERROR" if severity == "ERROR" else "OK"
-
-            structured_logs.append({
-                "source": "mysql",
-                "server_ip": server_ip,
-                "timestamp": ts,
-                "severity": severity,
-                "operation": sql,
-                "status": status,
-                "latency_ms": latency_ms,
-                "raw": log
-            })
-
-            next_start_time = ts
-
-        except Exception as e:
-            print(f"[警告] 解析 MySQL 日志失败: {e}")
+    last_epoch, seq = None, -1
+    for i in window:
+        log = index.lines[i]
+        if not matches(log):
+            continue
+        epoch = index.epochs[i]
+        seq = seq + 1 if epoch == last_epoch else 0
+        last_epoch = epoch
+        if epoch == start_epoch and seq < skip:
             continue
+        if len(batch_logs) == limit:
+            next_start_time = format_cursor(log[:19], seq)
+            break
+        batch_logs.append(log)
+
+    print(f"[工具调用] 本页 {len(batch_logs)} 条 MySQL 日志，next_start_time={next_start_time}")
 
-    # 检查是否还有下一页
-    if len(batch_logs) < limit:
-        next_start_time = None
+    # 解析 → 统一结构 UnifiedLogV1
+    records = parse_logs("mysql", batch_logs, server_ip)
 
-    return structured_logs, next_start_time
+    return annotate_matches(to_dicts(records), matcher), next_start_time
 
 
+@traced
 def mysql_runtime_diagnosis_raw(
         server_ip: str,
         action: str,
@@ -382,72 +361,59 @@ def mysql_runtime_diagnosis_raw(
         }
 
 
+_REDIS_DURATION = re.compile(r'duration=(\d+)ms')
+
+
+@traced
 def get_redis_logs_simple_raw(
     server_ip: str,
     keywords: Optional[Union[str, List[str]]] = None,
     min_duration: Optional[float] = None,
+    cursor: Optional[str] = None,
+    page_size: int = 15,
     **kwargs
-) -> List[Dict[str, Any]]:
-    """
-    获取 Redis 日志并解析成 UnifiedLogV1 格式
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    print(f"[工具调用] get_redis_logs_simple('{server_ip}', keywords={keywords}, min_duration_s={min_duration})")
-
-    logs = generate_redis_logs_for_server(server_ip, 60)
+    获取 Redis 日志并解析成 UnifiedLogV1 格式，按游标分页返回
 
-    # 关键词过滤
-    if keywords:
-        if isinstance(keywords, str):
-            keywords = [keywords]
-        logs = [log for log in logs if any(k.lower() in log.lower() for k in keywords)]
-
-    # 最小耗时过滤
-    if min_duration:
-        filtered = []
-        for log in logs:
-            import re
-            dur_match = re.search(r'duration=(\d+)ms', log)
-            if dur_match:
-                dur_ms = int(dur_match.group(1))
-                if dur_ms >= min_duration * 1000:
-                    filtered.append(log)
-        logs = filtered
-
-    # 统一结构化
-    structured = []
-    import re
-
-    for log in logs[:15]:
-        try:
-            ts = re.match(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})", log).group(1)
-            severity = re.search(r"\[(INFO|WARN|ERROR|SLOWLOG)\]", log).group(1)
-
-            cmd_match = re.search(r'command="([^"]+)"', log)
-            command = cmd_match.group(1) if cmd_match else "UNKNOWN"
-
-            dur_match = re.search(r'duration=(\d+)ms', log)
-            latency_ms = int(dur_match.group(1)) if dur_match else 0
-
-            status = "ERROR" if "ERROR" in severity else "OK"
-
-            structured.append({
-                "source": "redis",
-                "server_ip": server_ip,
-                "timestamp": ts,
-                "severity": severity,
-                "operation": command,
-                "status": status,
-                "latency_ms": latency_ms,
-                "raw": log
-            })
+    Args:
+        server_ip: 服务器IP
+        keywords: 关键词（不区分大小写），多个关键词满足其一即可
+        min_duration: 最小耗时（秒）
+        cursor: 上一页返回的 next_cursor，不传则从头查询
+        page_size: 每页条数
 
-        except Exception as e:
-            print(f"[警告] Redis 日志解析失败: {e}")
-            continue
+    Returns:
+        (本页日志, next_cursor)，next_cursor 为 None 表示没有更多日志
+    """
+    print(f"[工具调用] get_redis_logs_simple('{server_ip}', keywords={keywords}, min_duration_s={min_duration}, "
+          f"cursor={cursor}, page_size={page_size})")
+
+    matcher = get_matcher(keywords)
+
+    # 关键词过滤 + 最小耗时过滤（没有 duration 的行在设置了最小耗时时被过滤掉）
+    def matches(log: str) -> bool:
+        if matcher is not None and not matcher.search(log):
+            return False
+        if min_duration:
+            dur_match = _REDIS_DURATION.search(log)
+            return bool(dur_match) and int(dur_match.group(1)) >= min_duration * 1000
+        return True
+
+    records, next_cursor = paginate(
+        "redis", server_ip,
+        generate=lambda: generate_redis_logs_for_server(server_ip, 60),
+        predicate=matches if matcher or min_duration else None,
+        query=(matcher and [k.lower() for k in matcher.keywords], min_duration),
+        cursor=cursor,
+        page_size=page_size,
+    )
 
-    return structured
+    print(f"[工具调用] 本页 {len(records)} 条 Redis 日志，{'还有更多' if next_cursor else '没有更多了'}")
+    return annotate_matches(to_dicts(records), matcher), next_cursor
 
 
+@traced
 def get_server_metrics_simple_raw(
         server_ip: str,
         metric_name: Union[str, List[str]] = None
@@ -577,6 +543,7 @@ def get_server_metrics_simple_raw(
         }
 
 
+@traced
 def search_code_in_repository_raw(
         file_pattern: str = "*.py",
         keyword: str = None,
@@ -591,24 +558,27 @@ def search_code_in_repository_raw(
         f"[工具调用] search_code_in_repository(file_pattern={file_pattern}, keyword={keyword}, file_path={file_path})")
     print(f"[路径配置] CODE_BASE_PATH = {CODE_BASE_PATH}")
 
+    index = get_code_index(CODE_BASE_PATH)
+
     # 如果是直接指定文件路径
     if file_path:
         # 规范化路径
         file_path = file_path.replace('\\', '/')
 
-        # 检查文件是否存在
-        full_path = os.path.join(CODE_BASE_PATH, file_path.lstrip('/'))
+        # 检查文件是否存在（查索引，不逐个 stat）
+        full_path = index.get(file_path)
 
         # 如果不存在，尝试纠正 vv2 -> v2
-        if not os.path.exists(full_path) and "vv2" in file_path:
+        if not full_path and "vv2" in file_path:
             corrected = file_path.replace("vv2", "v2")
-            full_path = os.path.join(CODE_BASE_PATH, corrected.lstrip('/'))
-            if os.path.exists(full_path):
+            full_path = index.get(corrected)
+            if full_path:
                 return {
                     "search_results": [
                         {
                             "file_path": corrected,
                             "full_path": full_path,
+                            "score": 0.95,
                             "confidence": "high",
                             "reason": f"路径自动纠正: {file_path} -> {corrected}",
                             "exists": True,
@@ -621,12 +591,13 @@ def search_code_in_repository_raw(
                     "note": "路径已自动纠正"
                 }
 
-        if os.path.exists(full_path):
+        if full_path:
             return {
                 "search_results": [
                     {
                         "file_path": file_path,
                         "full_path": full_path,
+                        "score": 1.0,
                         "confidence": "high",
                         "reason": "直接文件路径匹配",
                         "exists": True
@@ -637,8 +608,15 @@ def search_code_in_repository_raw(
                 "file_pattern": file_pattern
             }
         else:
-            # 尝试搜索类似文件
-            return search_with_patterns(file_path, keyword, file_pattern)
+            # 尝试搜索类似文件：关键词 / 文件模式优先，否则在最接近的目录下找文件名相近的文件
+            similar = search_with_patterns(file_path, keyword, file_pattern) or index.nearest(file_path)
+            return {
+                "search_results": similar,
+                "total_count": len(similar),
+                "keyword": keyword,
+                "file_pattern": file_pattern,
+                "note": f"文件不存在: {file_path}"
+            }
 
     # 模拟搜索结果 - 实际项目中应该遍历目录
     results = []
@@ -664,11 +642,12 @@ def search_code_in_repository_raw(
             ]
 
             for file in possible_files:
-                full_path = os.path.join(CODE_BASE_PATH, file)
-                if os.path.exists(full_path):
+                full_path = index.get(file)
+                if full_path:
                     results.append({
                         "file_path": file,
                         "full_path": full_path,
+                        "score": 0.9,
                         "confidence": "high",
                         "reason": f"根据API路径 {api_path} 推断",
                         "exists": True
@@ -678,15 +657,7 @@ def search_code_in_repository_raw(
     if not results:
         results = search_with_patterns(file_path, keyword, file_pattern)
 
-    # 确保结果中的路径都是正确的
-    for result in results:
-        if result.get("exists"):
-            # 验证路径是否存在
-            if not os.path.exists(result["full_path"]):
-                result["exists"] = False
-                result["reason"] = f"路径不存在: {result['full_path']}"
-
-    # 过滤掉不存在的文件
+    # 过滤掉不存在的文件（结果都来自索引，这里只剩显式标记为不存在的）
     valid_results = [r for r in results if r.get("exists", False)]
 
     if not valid_results:
@@ -702,46 +673,18 @@ def search_code_in_repository_raw(
 
 
 def search_with_patterns(file_path=None, keyword=None, file_pattern=None):
-    """使用模式搜索文件"""
-    results = []
+    """使用模式搜索文件（查常驻内存的代码索引，按相关度排序）"""
+    if not os.path.exists(CODE_BASE_PATH):
+        return []
 
-    # 扫描代码库中的实际文件
-    if os.path.exists(CODE_BASE_PATH):
-        for root, dirs, files in os.walk(CODE_BASE_PATH):
-            for file in files:
-                if file.endswith('.py'):
-                    full_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(full_path, CODE_BASE_PATH).replace('\\', '/')
-
-                    # 根据关键词匹配
-                    if keyword:
-                        keyword_lower = keyword.lower()
-                        file_lower = file.lower()
-                        path_lower = rel_path.lower()
-
-                        if (keyword_lower in file_lower or
-                                keyword_lower in path_lower or
-                                keyword in rel_path):
-                            results.append({
-                                "file_path": rel_path,
-                                "full_path": full_path,
-                                "confidence": "medium",
-                                "reason": f"关键词 '{keyword}' 匹配",
-                                "exists": True
-                            })
-
-                    # 根据文件模式匹配
-                    elif file_pattern and file_pattern != "*.py":
-                        if fnmatch.fnmatch(file, file_pattern) or fnmatch.fnmatch(rel_path, file_pattern):
-                            results.append({
-                                "file_path": rel_path,
-                                "full_path": full_path,
-                                "confidence": "medium",
-                                "reason": f"文件模式 '{file_pattern}' 匹配",
-                                "exists": True
-                            })
-
-    return results
+    index = get_code_index(CODE_BASE_PATH)
+    # 根据关键词匹配
+    if keyword:
+        return index.search_keyword(keyword)
+    # 根据文件模式匹配
+    if file_pattern and file_pattern != "*.py":
+        return index.search_glob(file_pattern)
+    return []
 
 
 def get_available_example_files():
@@ -758,12 +701,14 @@ def get_available_example_files():
         "app/utils/db_manager.py"
     ]
 
+    index = get_code_index(CODE_BASE_PATH)
     for file in common_files:
-        full_path = os.path.join(CODE_BASE_PATH, file)
-        if os.path.exists(full_path):
+        full_path = index.get(file)
+        if full_path:
             example_files.append({
                 "file_path": file,
                 "full_path": full_path,
+                "score": 0.8,
                 "confidence": "high",
                 "reason": "常见代码文件",
                 "exists": True
@@ -772,6 +717,52 @@ def get_available_example_files():
     return example_files
 
 
+@traced
+def search_code_content_raw(
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        file_pattern: Optional[str] = None,
+        context_lines: int = 2,
+        max_results: int = 50
+) -> Dict[str, Any]:
+    """
+    在代码文件内容中全文搜索（如 "time.sleep"、"requests.get("），返回命中的文件、行号和前后几行代码片段。
+    一次调用即可定位可疑代码，不必逐个文件调用获取代码上下文。
+
+    Args:
+        query: 搜索内容；regex=True 时按正则表达式处理
+        regex: 是否为正则表达式
+        case_sensitive: 是否区分大小写
+        file_pattern: 只搜索匹配该模式的文件（如 "app/services/*.py"）
+        context_lines: 每个命中行前后各带几行代码
+        max_results: 最多返回的命中行数
+    """
+    print(f"[工具调用] search_code_content(query={query!r}, regex={regex}, file_pattern={file_pattern})")
+
+    if not query:
+        return {"error": "搜索内容不能为空", "matches": [], "total_count": 0}
+
+    try:
+        result = get_content_index(CODE_BASE_PATH).search(
+            query, regex, case_sensitive, file_pattern,
+            context_lines=max(0, min(int(context_lines), 10)),
+            max_results=max(1, min(int(max_results), 500)),
+        )
+    except re.error as e:
+        return {
+            "error": f"正则表达式不合法: {e}",
+            "suggestions": ["检查括号、转义是否完整", "或设置 regex=False 按普通字符串搜索"],
+            "matches": [],
+            "total_count": 0
+        }
+
+    print(f"[工具调用] 候选 {result['files_searched']}/{result['files_indexed']} 个文件，"
+          f"{result['files_matched']} 个文件命中，{result['total_count']} 处")
+    return result
+
+
+@traced
 def get_code_context_raw(
         file_path: str,
         line_start: int = 1,
@@ -798,52 +789,18 @@ def get_code_context_raw(
         }
 
     try:
-        # ====== 第一步：检测文件编码 ======
-        with open(file_path, 'rb') as f:
-            raw_data = f.read()
-
-        # 使用chardet检测编码
-        encoding_info = chardet.detect(raw_data)
-        file_encoding = encoding_info['encoding']
-        confidence = encoding_info['confidence']
-
-        print(f"[编码检测] 检测到编码: {file_encoding} (置信度: {confidence:.2%})")
-
-        # 如果置信度太低或无法检测，使用常用编码尝试
-        if not file_encoding or confidence < 0.5:
-            possible_encodings = ['utf-8', 'gbk', 'gb2312', 'gb18030', 'latin-1', 'cp1252']
-
-            # 尝试各种编码
-            for enc in possible_encodings:
-                try:
-                    content = raw_data.decode(enc)
-                    file_encoding = enc
-                    print(f"[编码回退] 使用编码: {enc}")
-                    break
-                except:
-                    continue
-
-            if not file_encoding:
-                # 最后尝试用错误忽略模式
-                content = raw_data.decode('utf-8', errors='ignore')
-                file_encoding = 'utf-8 (忽略错误)'
-        else:
-            # 使用检测到的编码
-            content = raw_data.decode(file_encoding)
-
-        lines = content.splitlines()
-        total_lines = len(lines)
+        # ====== 第一步：读取并解码（按文件版本缓存；大文件只流式读取所需的行） ======
+        window = read_lines(file_path, line_start, line_end)
+        file_encoding = window.encoding
+        # 大文件没有读到末尾时总行数未知，为 None
+        total_lines = window.total_lines
 
-        # ====== 第二步：处理行号范围 ======
-        line_start = max(1, min(line_start, total_lines))
-        line_end = max(line_start, min(line_end, total_lines))
+        # ====== 第二步：处理行号范围（已按文件实际行数收窄） ======
+        line_start, line_end = window.line_start, window.line_end
 
         # ====== 第三步：构建代码行信息 ======
         code_with_lines = []
-        for i in range(line_start - 1, line_end):
-            line_number = i + 1
-            line_content = lines[i]
-
+        for line_number, line_content in enumerate(window.lines, line_start):
             is_highlighted = highlight_lines and line_number in highlight_lines
             code_with_lines.append({
                 "line_number": line_number,
@@ -879,7 +836,7 @@ def get_code_context_raw(
             "language": "python" if file_path.endswith('.py') else
             "java" if file_path.endswith('.java') else
             "javascript" if file_path.endswith('.js') else "unknown",
-            "file_size": len(raw_data),
+            "file_size": window.size,
             "note": f"使用 {file_encoding} 编码读取成功"
         }
 
@@ -896,6 +853,7 @@ def get_code_context_raw(
             ]
         }
 
+@traced
 def analyze_code_pattern_raw(
         code_snippet: str,
         issue_type: str = None
@@ -912,83 +870,14 @@ def analyze_code_pattern_raw(
     """
     print(f"[工具调用] analyze_code_pattern(issue_type={issue_type})")
 
-    # 常见问题模式检测
-    patterns = {
-        "memory_leak": [
-            # 使用非贪婪匹配 .*? 避免匹配过多
-            (r"\.append\(.*?\)\s*# 没有清理", "列表不断追加可能导致内存泄漏"),
-            (r"global\s+\w+\s*=\s*\[\]", "全局变量累积数据"),
-            (r"while True:\s*\n\s*\w+\.append", "循环中不断追加到列表"),
-            # 修正：使用 [^)]* 匹配括号内任意非右括号字符
-            (r"PIL\.Image\.new\([^)]*\)\s*# 没有关闭", "图片资源未释放"),
-            # 还可以添加更多常见内存泄漏模式：
-            (r"open\([^)]*\)\s*(#.*)?$", "文件打开后没有关闭"),
-            (r"connection\s*=\s*.+\.connect\(\)", "数据库连接没有关闭"),
-            (r"self\.cache\s*=\s*{}\s*# 无限增长", "缓存字典无限增长"),
-            (r"\.add\(.*?\)\s*# 集合不断添加", "集合不断添加元素"),
-            (r"threading\.Thread\(target=.*\)", "线程没有正确管理")
-        ],
-        "deadlock": [
-            (r"with lock[12]:\s*\n\s*with lock[21]:", "嵌套锁可能导致死锁"),
-            (r"lock\.acquire\(\)\s*\n.*lock\.acquire\(\)", "重复获取锁"),
-            (r"threading\.Lock\(\)\s*# 多线程死锁风险", "多线程同步问题")
-        ],
-        "timeout": [
-            (r"time\.sleep\([5-9]\)", "长时间sleep"),
-            (r"requests\.\w+\([^)]*timeout=None", "网络请求未设置超时"),
-            (r"while True:\s*if.*break", "可能无法退出的循环"),
-            (r"socket\.settimeout\(None\)", "socket未设置超时")
-        ],
-        "database": [
-            (r"\.all\(\)\s*# 查询所有数据", "未分页的全表查询"),
-            (r"N\+1\s+query", "N+1查询问题"),
-            (r"SELECT \*\s+FROM", "SELECT * 性能问题"),
-            (r"for.*in.*:\s*\n\s*session\.add", "循环中逐个插入数据")
-        ],
-        "security": [
-            (r"eval\(", "使用eval有安全风险"),
-            (r"exec\(", "使用exec有安全风险"),
-            (r"subprocess\.call\(.*shell=True", "shell命令注入风险"),
-            (r"password\s*=\s*['\"]\w+['\"]", "硬编码密码")
-        ]
-    }
-
-    findings = []
-
+    # 常见问题模式检测（规则在 code_patterns.py 中，导入时编译）
     # 如果没有指定问题类型，检查所有类型
-    issue_types_to_check = [issue_type] if issue_type else patterns.keys()
-
-    for check_type in issue_types_to_check:
-        if check_type in patterns:
-            for pattern, description in patterns[check_type]:
-                matches = re.finditer(pattern, code_snippet, re.MULTILINE)
-                for match in matches:
-                    # 获取匹配的行
-                    line_start = code_snippet[:match.start()].count('\n') + 1
-                    line_content = match.group(0).strip()
-
-                    findings.append({
-                        "issue_type": check_type,
-                        "line": line_start,
-                        "pattern": pattern,
-                        "description": description,
-                        "matched_code": line_content,
-                        "severity": "high" if check_type in ["memory_leak", "deadlock"] else "medium"
-                    })
+    findings = pattern_library.scan(code_snippet, [issue_type] if issue_type else None)
 
     # 如果没有找到特定问题，进行通用分析
     if not findings:
-        # 检查代码复杂度
-        lines = code_snippet.split('\n')
-
         # 计算一些基本指标
-        metrics = {
-            "line_count": len(lines),
-            "function_count": len(re.findall(r"def \w+", code_snippet)),
-            "class_count": len(re.findall(r"class \w+", code_snippet)),
-            "import_count": len(re.findall(r"import |from ", code_snippet)),
-            "comment_ratio": sum(1 for line in lines if line.strip().startswith('#')) / len(lines) if lines else 0
-        }
+        metrics = pattern_library.metrics(code_snippet)
 
         # 简单复杂度分析
         if metrics["line_count"] > 100:
@@ -1019,10 +908,25 @@ def get_nginx_servers() -> List[Dict[str, Any]]:
 def get_server_logs_simple(
         server_ip: str,
         api_endpoint: str = None,
-        keywords: Union[str, List[str]] = None
-) -> List[Dict[str, Any]]:
-    """获取服务器日志（Nginx），并输出统一日志结构 UnifiedLogV1"""
-    return get_server_logs_simple_raw(server_ip, api_endpoint, keywords)
+        keywords: Union[str, List[str]] = None,
+        cursor: Optional[str] = None,
+        page_size: int = 10
+) -> Dict[str, Any]:
+    """
+    获取服务器日志（Nginx），并输出统一日志结构 UnifiedLogV1。
+    返回 {"logs": [...], "next_cursor": ...}；next_cursor 不为空时，带上它（其余参数不变）再次调用获取下一页。
+    """
+    return paged_result(get_server_logs_simple_raw(server_ip, api_endpoint, keywords, cursor, page_size))
+
+
+@tool("Nginx日志聚合统计")
+def get_nginx_log_stats(
+        server_ip: str,
+        api_endpoint: Optional[str] = None,
+        bucket_minutes: int = 5
+) -> Dict[str, Any]:
+    """按接口、按时间桶汇总 Nginx 请求数、状态码类别和延迟 p50/p95/p99（覆盖全部日志）"""
+    return get_nginx_log_stats_raw(server_ip, api_endpoint, bucket_minutes)
 
 
 @tool("获取MySQL日志")
@@ -1033,9 +937,13 @@ def get_mysql_logs_simple(
         keywords: str = "",
         min_duration_s: float = 0.0,
         limit: int = 1000
-) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-    """获取 MySQL 日志（模拟），并解析为统一日志结构 UnifiedLogV1 格式。"""
-    return get_mysql_logs_simple_raw(server_ip, start_time, end_time, keywords, min_duration_s, limit)
+) -> Dict[str, Any]:
+    """
+    获取 MySQL 日志（模拟），按时间升序返回 {"logs": [...], "next_start_time": ...}（UnifiedLogV1 格式）。
+    next_start_time 不为空时，保持其他参数不变、把它作为 start_time 再次调用获取下一页。
+    """
+    return paged_result(get_mysql_logs_simple_raw(server_ip, start_time, end_time, keywords, min_duration_s, limit),
+                        cursor_field="next_start_time")
 
 
 @tool("MYSQL运行时诊断")
@@ -1052,10 +960,15 @@ def get_redis_logs_simple(
     server_ip: str,
     keywords: Optional[Union[str, List[str]]] = None,
     min_duration: Optional[float] = None,
+    cursor: Optional[str] = None,
+    page_size: int = 15,
     **kwargs
-) -> List[Dict[str, Any]]:
-    """获取 Redis 日志并解析成 UnifiedLogV1 格式"""
-    return get_redis_logs_simple_raw(server_ip, keywords, min_duration, **kwargs)
+) -> Dict[str, Any]:
+    """
+    获取 Redis 日志并解析成 UnifiedLogV1 格式。
+    返回 {"logs": [...], "next_cursor": ...}；next_cursor 不为空时，带上它（其余参数不变）再次调用获取下一页。
+    """
+    return paged_result(get_redis_logs_simple_raw(server_ip, keywords, min_duration, cursor, page_size, **kwargs))
 
 @tool("获取服务器指标")
 def get_server_metrics_simple(
@@ -1075,6 +988,19 @@ def search_code_in_repository(
     return search_code_in_repository_raw(file_pattern, keyword, file_path)
 
 
+@tool("搜索代码内容")
+def search_code_content(
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        file_pattern: str = None,
+        context_lines: int = 2,
+        max_results: int = 50
+) -> Dict[str, Any]:
+    """在代码文件内容中全文搜索，返回命中的文件、行号和代码片段"""
+    return search_code_content_raw(query, regex, case_sensitive, file_pattern, context_lines, max_results)
+
+
 @tool("获取代码上下文")
 def get_code_context(
         file_path: str,
@@ -1106,8 +1032,8 @@ def test_tools_locally():
     # 测试获取特定服务器的日志
     test_server = "10.0.2.101"
     print(f"\n测试服务器 {test_server} 的日志:")
-    logs = get_server_logs_simple_raw(test_server, api_endpoint="/api/v2/data.json")
-    print(f"获取到 {len(logs)} 条日志")
+    logs, next_cursor = get_server_logs_simple_raw(test_server, api_endpoint="/api/v2/data.json")
+    print(f"获取到 {len(logs)} 条日志，next_cursor={next_cursor}")
 
     if logs:
         for log in logs[:3]:
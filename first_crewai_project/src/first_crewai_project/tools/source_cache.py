@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+解码后源码文件的 LRU 缓存 - get_code_context 连续查看同一文件的相邻行段时不再重复读文件、重复检测编码
+
+原来每次调用都以二进制读入整个文件、对全部内容执行 chardet.detect，置信度低时再逐个尝试备选编码，
+最后重新切分行。智能体经常先看 1-50 行、再看 50-100 行，这些工作每次都从头来一遍。
+
+这里按文件路径缓存解码后的行数组，并记录读取时文件的 (mtime, size)：
+- 版本不变时直接返回内存中的行，只多一次 os.stat；
+- 文件被修改（mtime 或 size 变化）时重新读取；
+- 编码检测结果按 (路径, mtime, size) 单独缓存（比行缓存大得多），
+  同一个文件版本最多执行一次 chardet，即使它的行数组已经被挤出缓存。
+
+缓存同时受文件个数（SOURCE_CACHE_SIZE，默认 64）和总字节数（SOURCE_CACHE_MAX_BYTES，默认 64MB）限制。
+
+编码检测只看文件开头 ENCODING_SAMPLE_BYTES 字节（默认 64KB）：先按 UTF-8 严格解码样本
+（样本末尾被截断的多字节字符不算错误），成功就不调用 chardet；否则对样本执行 chardet 和备选编码回退。
+
+超过 SOURCE_FULL_LOAD_BYTES（默认 4MB）的文件不整份解码、也不进缓存：read_lines() 按检测到的编码
+流式读取，读到 line_end 的下一行就停止，查看 100MB 生成文件的前 50 行只需读开头几十 KB。
+这时总行数未知（total_lines 为 None），除非这次读取已经到了文件末尾。
+
+行按 \\n、\\r\\n、\\r 切分（与 Python 报错信息里的行号一致），整份解码和流式读取的行号相同。
+"""
+import os
+import codecs
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import chardet
+
+# 最多缓存多少个文件的行数组（LRU）
+SOURCE_CACHE_SIZE = int(os.environ.get("SOURCE_CACHE_SIZE", "64"))
+# 缓存文件的总字节数上限（按磁盘上的文件大小计）
+SOURCE_CACHE_MAX_BYTES = int(os.environ.get("SOURCE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# 不超过该大小的文件整份解码并缓存，更大的文件流式读取所需的行
+FULL_LOAD_BYTES = int(os.environ.get("SOURCE_FULL_LOAD_BYTES", str(4 * 1024 * 1024)))
+# 编码检测的样本大小
+ENCODING_SAMPLE_BYTES = int(os.environ.get("ENCODING_SAMPLE_BYTES", str(64 * 1024)))
+# 编码检测结果缓存的条数（每条只有几十字节）
+ENCODING_CACHE_SIZE = 4096
+# chardet 置信度低于该值时，按顺序尝试的编码
+FALLBACK_ENCODINGS = ("utf-8", "gbk", "gb2312", "gb18030", "latin-1", "cp1252")
+MIN_CONFIDENCE = 0.5
+IGNORE_ERRORS = "utf-8 (忽略错误)"
+
+Version = Tuple[int, int]
+
+
+class SourceFile:
+    """一个文件版本解码后的内容"""
+
+    __slots__ = ("path", "version", "encoding", "confidence", "lines", "size")
+
+    def __init__(self, path: str, version: Version, encoding: str, confidence: float, lines: Tuple[str, ...]):
+        self.path = path
+        self.version = version
+        self.encoding = encoding
+        self.confidence = confidence
+        self.lines = lines
+        self.size = version[1]
+
+
+class LineWindow:
+    """read_lines() 的结果：[line_start, line_end] 范围内的行（已按文件实际行数收窄）"""
+
+    __slots__ = ("encoding", "line_start", "line_end", "lines", "total_lines", "size")
+
+    def __init__(self, encoding: str, line_start: int, line_end: int, lines: Tuple[str, ...],
+                 total_lines: Optional[int], size: int):
+        self.encoding = encoding
+        self.line_start = line_start
+        self.line_end = line_end
+        self.lines = lines
+        self.total_lines = total_lines
+        self.size = size
+
+
+def _decodes(sample: bytes, encoding: str, complete: bool) -> bool:
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+def detect_encoding(sample: bytes, complete: bool = True) -> Tuple[str, float]:
+    """
+    检测编码：样本能按 UTF-8 严格解码就直接返回 UTF-8；否则 chardet 检测，
+    置信度太低、检测不出或解码不了样本时，返回备选编码中第一个能解码样本的
+
+    Args:
+        sample: 完整文件内容或文件开头的一段
+        complete: sample 是否为完整文件（不是时，末尾被截断的多字节字符不算解码错误）
+
+    Returns:
+        (编码, 置信度)；都解码失败时编码为 "utf-8 (忽略错误)"
+    """
+    if _decodes(sample, "utf-8", complete):
+        return "utf-8", 1.0
+
+    info = chardet.detect(sample)
+    encoding, confidence = info["encoding"], info["confidence"] or 0.0
+    print(f"[编码检测] 检测到编码: {encoding} (置信度: {confidence:.2%})")
+    if encoding and confidence >= MIN_CONFIDENCE and _decodes(sample, encoding, complete):
+        return encoding, confidence
+
+    for candidate in FALLBACK_ENCODINGS:
+        if _decodes(sample, candidate, complete):
+            print(f"[编码回退] 使用编码: {candidate}")
+            return candidate, confidence
+    return IGNORE_ERRORS, confidence
+
+
+def _codec(encoding: str) -> Tuple[str, str]:
+    """检测结果 → (open() / decode() 用的编码名, errors)"""
+    return ("utf-8", "ignore") if encoding == IGNORE_ERRORS else (encoding, "strict")
+
+
+def decode(raw: bytes, encoding: str) -> str:
+    return raw.decode(*_codec(encoding))
+
+
+def split_lines(text: str) -> Tuple[str, ...]:
+    """按 \\n、\\r\\n、\\r 切分；末尾的换行不产生空行（与逐行读取文本文件一致）"""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return tuple(lines)
+
+
+class SourceCache:
+    """按路径缓存解码后的行数组，(mtime, size) 变化时失效（在线程池中并发访问，读写加锁）"""
+
+    def __init__(self, capacity: int = SOURCE_CACHE_SIZE, max_bytes: int = SOURCE_CACHE_MAX_BYTES,
+                 full_load_bytes: int = FULL_LOAD_BYTES):
+        self.capacity = max(1, capacity)
+        self.max_bytes = max_bytes
+        self.full_load_bytes = full_load_bytes
+        self._files: "OrderedDict[str, SourceFile]" = OrderedDict()
+        self._bytes = 0
+        self._encodings: "OrderedDict[Tuple[str, int, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.detections = self.streamed = 0
+
+    def _cached(self, path: str, version: Version) -> Optional[SourceFile]:
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is not None and cached.version == version:
+                self._files.move_to_end(path)
+                self.hits += 1
+                return cached
+        return None
+
+    def load(self, path: str) -> SourceFile:
+        """
+        取文件当前版本的全部内容
+
+        Raises:
+            OSError: 文件不存在或无法读取
+            UnicodeDecodeError / LookupError: 按检测到的编码解码失败
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        cached = self._cached(path, (stat.st_mtime_ns, stat.st_size))
+        if cached is not None:
+            return cached
+
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            raw = f.read()
+        version = (stat.st_mtime_ns, stat.st_size)
+        complete = len(raw) <= ENCODING_SAMPLE_BYTES
+        encoding, confidence = self.encoding_for(path, version, raw[:ENCODING_SAMPLE_BYTES], complete)
+        try:
+            text = decode(raw, encoding)
+        except UnicodeDecodeError:
+            if complete:
+                raise
+            # 样本之后出现了样本编码解不了的字节：按完整内容重新检测
+            encoding, confidence = detect_encoding(raw)
+            self._remember((path, *version), (encoding, confidence))
+            text = decode(raw, encoding)
+        source = SourceFile(path, version, encoding, confidence, split_lines(text))
+
+        with self._lock:
+            self.misses += 1
+            previous = self._files.pop(path, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if source.size <= self.max_bytes:
+                self._files[path] = source
+                self._bytes += source.size
+                while len(self._files) > self.capacity or self._bytes > self.max_bytes:
+                    _, evicted = self._files.popitem(last=False)
+                    self._bytes -= evicted.size
+        return source
+
+    def read_lines(self, path: str, line_start: int, line_end: int) -> LineWindow:
+        """
+        取第 line_start ~ line_end 行（从 1 开始，含两端）
+
+        行号超出文件范围时与原来一样收窄：line_start 超过总行数时返回最后一行。
+        小文件（或已缓存的文件）走 load()，total_lines 准确；大文件流式读取到 line_end 的下一行为止，
+        没有读到文件末尾时 total_lines 为 None。
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        source = self._cached(path, version)
+        if source is None and stat.st_size <= self.full_load_bytes:
+            source = self.load(path)
+        if source is not None:
+            total = len(source.lines)
+            line_start = max(1, min(line_start, total))
+            line_end = max(line_start, min(line_end, total))
+            return LineWindow(source.encoding, line_start, line_end, source.lines[line_start - 1:line_end],
+                              total, source.size)
+
+        with open(path, "rb") as f:
+            sample = f.read(ENCODING_SAMPLE_BYTES)
+        encoding, _ = self.encoding_for(path, version, sample, complete=len(sample) >= stat.st_size)
+        with self._lock:
+            self.streamed += 1
+        name, errors = _codec(encoding)
+        try:
+            with open(path, "r", encoding=name, errors=errors, newline=None) as f:
+                return self._window(f, encoding, line_start, line_end, stat.st_size)
+        except UnicodeDecodeError:
+            # 样本之后有无法按该编码解码的字节：这一次用替换字符读出来，不为了几十行去解码整个大文件
+            with open(path, "r", encoding=name, errors="replace", newline=None) as f:
+                return self._window(f, f"{encoding} (已替换无法解码的字节)", line_start, line_end, stat.st_size)
+
+    @staticmethod
+    def _window(lines: Iterable[str], encoding: str, line_start: int, line_end: int, size: int) -> LineWindow:
+        line_start = max(1, line_start)
+        line_end = max(line_start, line_end)
+        window = []
+        count = 0
+        last = None
+        total = None
+        for count, line in enumerate(lines, 1):
+            if count > line_end:
+                break
+            if count >= line_start:
+                window.append(line.rstrip("\n"))
+            last = line
+        else:
+            total = count
+
+        if total is not None:
+            if not window and total:
+                window, line_start = [last.rstrip("\n")], total
+            line_end = line_start + max(len(window), 1) - 1
+        return LineWindow(encoding, line_start, line_end, tuple(window), total, size)
+
+    def decode_text(self, path: str, version: Version, raw: bytes) -> str:
+        """按（缓存的）检测编码解码文件内容，无法解码的字节用替换字符代替，不抛异常（建索引用）"""
+        encoding, _ = self.encoding_for(os.path.abspath(path), version, raw[:ENCODING_SAMPLE_BYTES],
+                                        len(raw) <= ENCODING_SAMPLE_BYTES)
+        return raw.decode(_codec(encoding)[0], errors="replace")
+
+    def encoding_for(self, path: str, version: Version, sample: bytes, complete: bool = True) -> Tuple[str, float]:
+        """(路径, mtime, size) 对应的编码；同一文件版本只检测一次"""
+        key = (path, *version)
+        with self._lock:
+            cached = self._encodings.get(key)
+            if cached is not None:
+                self._encodings.move_to_end(key)
+                return cached
+        detected = detect_encoding(sample, complete)
+        self._remember(key, detected)
+        return detected
+
+    def _remember(self, key: Tuple[str, int, int], detected: Tuple[str, float]):
+        with self._lock:
+            self.detections += 1
+            self._encodings[key] = detected
+            self._encodings.move_to_end(key)
+            while len(self._encodings) > ENCODING_CACHE_SIZE:
+                self._encodings.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._files), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "detections": self.detections, "streamed": self.streamed}
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._encodings.clear()
+            self._bytes = 0
+
+
+source_cache = SourceCache()
+
+
+def load_source(path: str) -> SourceFile:
+    return source_cache.load(path)
+
+
+def read_lines(path: str, line_start: int, line_end: int) -> LineWindow:
+    return source_cache.read_lines(path, line_start, line_end)
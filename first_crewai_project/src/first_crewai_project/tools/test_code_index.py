@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+代码文件索引 CodeIndex 的测试脚本
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from code_index import CodeIndex
+from mock_tools import search_code_in_repository_raw
+
+FILES = [
+    "app/routes.py",
+    "app/api/v2/data.py",
+    "app/controllers/data_controller.py",
+    "app/services/data_service.py",
+    "app/utils/redis_client.py",
+    "docs/data.md",
+]
+
+
+def make_tree(root):
+    for rel_path in FILES:
+        full_path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write("# test\n")
+
+
+def test_keyword_ranking():
+    """关键词结果与子串匹配一致（只索引 .py），按相关度排序"""
+    print("🧪 测试关键词查询和排序")
+    root = tempfile.mkdtemp()
+    try:
+        make_tree(root)
+        index = CodeIndex(root)
+        index.refresh(force=True)
+        results = index.search_keyword("DATA")
+        paths = [r["file_path"] for r in results]
+        print(f"  {[(r['file_path'], r['score'], r['confidence']) for r in results]}")
+        return (sorted(paths) == sorted(p for p in FILES if p.endswith(".py") and "data" in p)
+                and paths[0] == "app/api/v2/data.py" and results[0]["confidence"] == "high"
+                and [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+                and [r["file_path"] for r in index.search_glob("app/*/*_client.py")] == ["app/utils/redis_client.py"]
+                and sorted(index.under("app/api")) == ["app/api/v2/data.py"])
+    finally:
+        shutil.rmtree(root)
+
+
+def test_incremental_refresh():
+    """新增、删除文件和目录后刷新，索引与磁盘一致"""
+    print("🧪 测试增量刷新")
+    root = tempfile.mkdtemp()
+    try:
+        make_tree(root)
+        index = CodeIndex(root, refresh_interval=0)
+        index.refresh()
+        os.remove(os.path.join(root, "app/routes.py"))
+        shutil.rmtree(os.path.join(root, "app/utils"))
+        os.makedirs(os.path.join(root, "app/jobs"))
+        open(os.path.join(root, "app/jobs/redis_sync.py"), "w").close()
+        index.refresh()
+        expected = {"app/api/v2/data.py", "app/controllers/data_controller.py",
+                    "app/services/data_service.py", "app/jobs/redis_sync.py"}
+        print(f"  {len(index)} 个文件: {sorted(index.under())}")
+        return (set(index.under()) == expected and len(index) == 4
+                and index.get("app/routes.py") is None
+                and [r["file_path"] for r in index.search_keyword("redis")] == ["app/jobs/redis_sync.py"]
+                and not index.refresh())
+    finally:
+        shutil.rmtree(root)
+
+
+def test_search_tool():
+    """search_code_in_repository：直接路径、vv2 纠正、不存在路径给出同目录的相近文件"""
+    print("🧪 测试代码搜索工具")
+    direct = search_code_in_repository_raw(file_path="app/api/v2/data.py")
+    corrected = search_code_in_repository_raw(file_path="app/api/vv2/data.py")
+    missing = search_code_in_repository_raw(file_path="app/services/data_services.py")
+    print(f"  不存在的路径 → {[r['file_path'] for r in missing['search_results']]}")
+    return (direct["search_results"][0]["score"] == 1.0
+            and corrected["search_results"][0]["file_path"] == "app/api/v2/data.py"
+            and missing["search_results"][0]["file_path"] == "app/services/data_service.py")
+
+
+def main():
+    tests = [
+        ("关键词查询和排序", test_keyword_ranking),
+        ("增量刷新", test_incremental_refresh),
+        ("代码搜索工具", test_search_tool),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
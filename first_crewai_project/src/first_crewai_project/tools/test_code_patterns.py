@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+代码问题模式库 PatternLibrary 的测试脚本
+"""
+
+import sys
+import os
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from code_patterns import pattern_library
+from mock_tools import analyze_code_pattern_raw
+
+SNIPPET = """import time
+import threading
+
+cache = []
+lock = threading.Lock()  # 多线程死锁风险
+
+
+def worker(password="admin123"):
+    while True:
+        cache.append(time.time())
+    time.sleep(8)
+    lock.acquire()
+    lock.acquire()
+    return eval("1 + 1")
+"""
+
+
+def test_scan_lines():
+    """命中的问题类型、行号和匹配内容"""
+    print("🧪 测试模式扫描和行号")
+    got = [(f["issue_type"], f["line"], f["matched_code"]) for f in pattern_library.scan(SNIPPET)]
+    for finding in got:
+        print(f"  {finding}")
+    return got == [
+        ("memory_leak", 9, "while True:\n        cache.append"),
+        ("deadlock", 12, "lock.acquire()\n    lock.acquire()"),
+        ("deadlock", 5, "threading.Lock()  # 多线程死锁风险"),
+        ("timeout", 11, "time.sleep(8)"),
+        ("security", 14, "eval("),
+        ("security", 8, 'password="admin123"'),
+    ]
+
+
+def test_issue_type_filter():
+    """按问题类型过滤；未知类型没有命中，退回通用指标"""
+    print("🧪 测试问题类型过滤")
+    deadlock = analyze_code_pattern_raw(SNIPPET, "deadlock")
+    unknown = analyze_code_pattern_raw(SNIPPET, "unknown")
+    metrics = pattern_library.metrics(SNIPPET)
+    print(f"  deadlock: {deadlock['total_issues_found']} 个; unknown: {unknown['summary']}; 指标: {metrics}")
+    return (deadlock["total_issues_found"] == 2
+            and all(f["severity"] == "high" for f in deadlock["findings"])
+            and unknown["total_issues_found"] == 0
+            and metrics["line_count"] == 15 and metrics["function_count"] == 1 and metrics["import_count"] == 2)
+
+
+def main():
+    tests = [
+        ("模式扫描和行号", test_scan_lines),
+        ("问题类型过滤", test_issue_type_filter),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+代码内容全文检索 ContentIndex 的测试脚本
+"""
+
+import sys
+import os
+import re
+import shutil
+import tempfile
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from code_index import CodeIndex
+from content_index import ContentIndex, required_literals
+from source_cache import load_source
+from mock_tools import CODE_BASE_PATH, search_code_content_raw
+
+
+def brute_force(root, pattern, flags):
+    """逐个文件、逐行搜索：(文件, 行号) 集合"""
+    compiled = re.compile(pattern, flags | re.MULTILINE)
+    hits = set()
+    for current, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(".py"):
+                full_path = os.path.join(current, name)
+                text = "\n".join(load_source(full_path).lines)
+                for match in compiled.finditer(text):
+                    hits.add((os.path.relpath(full_path, root).replace("\\", "/"),
+                              text.count("\n", 0, match.start()) + 1))
+    return hits
+
+
+def test_required_literals():
+    """从正则中提取必须出现的字面量，拿不准时不提取"""
+    print("🧪 测试正则字面量提取")
+    cases = {
+        r"requests\.get\(": ["requests.get("],
+        r"time\.sleep\(\d+\)": ["time.sleep("],
+        r"redis_?client": ["redis", "client"],
+        r"def \w+_controller": ["def ", "_controller"],
+        r"conn(ection)?\.close": ["conn", ".close"],
+        r"timeout|retry": [],
+        r"(?x) time \. sleep": [],
+        r"[Ss]elect .* from": ["elect ", " from"],
+    }
+    ok = True
+    for pattern, expected in cases.items():
+        got = required_literals(pattern)
+        print(f"  {pattern!r:28} → {got}")
+        ok = ok and got == expected
+    return ok
+
+
+def test_matches_brute_force():
+    """索引 + 正则确认的结果与逐个文件搜索一致"""
+    print("🧪 测试与逐文件搜索结果一致")
+    index = ContentIndex(CodeIndex(CODE_BASE_PATH))
+    ok = True
+    for query, regex in (("time.sleep", False), ("REDIS", False), (r"except\s+\w+", True),
+                         (r"def \w+\(self", True), ("no_such_call(", False)):
+        result = index.search(query, regex=regex, max_results=500)
+        got = {(m["file_path"], m["line_number"]) for m in result["matches"]}
+        expected = brute_force(CODE_BASE_PATH, query if regex else re.escape(query), re.IGNORECASE)
+        print(f"  {query!r:18} 候选 {result['files_searched']}/{result['files_indexed']}，命中 {len(got)} 行")
+        ok = ok and got == expected and not result["truncated"]
+    return ok
+
+
+def test_reindex_and_tool():
+    """文件改动后重新索引；工具返回行号、代码片段，非法正则返回错误"""
+    print("🧪 测试重新索引和搜索工具")
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "worker.py")
+        with open(path, "w") as f:
+            f.write("import time\n\n\ndef run():\n    time.sleep(5)\n")
+        index = ContentIndex(CodeIndex(root, refresh_interval=0))
+        before = index.search("time.sleep(", context_lines=1)
+        with open(path, "w") as f:
+            f.write("import asyncio\n")
+        os.utime(path, ns=(1, 1))
+        after = index.search("time.sleep(")
+        print(f"  修改前: {before['matches'][0]['snippet']}")
+        reindexed = (before["matches"][0]["line_number"] == 5
+                     and [line["line_number"] for line in before["matches"][0]["snippet"]] == [4, 5]
+                     and before["matches"][0]["snippet"][1]["highlighted"]
+                     and after["total_count"] == 0 and after["files_searched"] == 0)
+    finally:
+        shutil.rmtree(root)
+
+    tool = search_code_content_raw("sleep", file_pattern="app/services/*.py", max_results=1)
+    bad = search_code_content_raw("time.sleep(", regex=True)
+    print(f"  工具: {tool['total_count']} 处, truncated={tool['truncated']}; 非法正则: {bad.get('error')}")
+    return (reindexed and all(m["file_path"].startswith("app/services/") for m in tool["matches"])
+            and "error" in bad)
+
+
+def main():
+    tests = [
+        ("正则字面量提取", test_required_literals),
+        ("与逐文件搜索一致", test_matches_brute_force),
+        ("重新索引和搜索工具", test_reindex_and_tool),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
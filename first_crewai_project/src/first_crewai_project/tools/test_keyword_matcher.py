@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+共用关键词匹配器 KeywordMatcher 的测试脚本
+"""
+
+import sys
+import os
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_matcher import get_matcher
+from mock_tools import get_redis_logs_simple
+
+LINE = '2026-10-17 04:23:54 [ERROR] command="GET user:1" error="Connection Timeout" duration=3ms'
+
+
+def test_matches_overlapping_keywords():
+    """不区分大小写；重叠、嵌套的关键词都能报告，顺序与传入一致"""
+    print("🧪 测试命中关键词")
+    matcher = get_matcher(["timeout", "TIME", "error", "err", "OOM", "  "])
+    print(f"  {matcher!r} → {matcher.matches(LINE)}")
+    return (matcher.keywords == ("timeout", "TIME", "error", "err", "OOM")
+            and matcher.matches(LINE) == ["timeout", "TIME", "error", "err"]
+            and matcher.search(LINE)
+            and not matcher.search("2026-10-17 04:23:54 [INFO] command=\"PING\"")
+            and matcher.count([LINE, "oom killer", "nothing"]) == {"timeout": 1, "TIME": 1, "error": 1, "err": 1, "OOM": 1})
+
+
+def test_matcher_cache():
+    """同一关键词集合只编译一次；空关键词返回 None"""
+    print("🧪 测试匹配器缓存")
+    return (get_matcher(["a.b", "c"]) is get_matcher(["a.b", "c", "A.B"])
+            and get_matcher("a.b") is not get_matcher(["a.b", "c"])
+            and get_matcher(None) is None and get_matcher(["", " "]) is None
+            and not get_matcher("a.b").search("axb"))
+
+
+def test_tool_reports_hits():
+    """日志工具返回每条日志命中的关键词和本页的命中条数"""
+    print("🧪 测试日志工具的关键词命中统计")
+    result = get_redis_logs_simple.func("10.0.3.101", keywords=["error", "timeout"], page_size=50)
+    print(f"  {len(result['logs'])} 条, keyword_hits={result['keyword_hits']}")
+    counted = {}
+    for log in result["logs"]:
+        for keyword in log["matched_keywords"]:
+            counted[keyword] = counted.get(keyword, 0) + 1
+    return (result["logs"] and all(log["matched_keywords"] for log in result["logs"])
+            and result["keyword_hits"] == counted)
+
+
+def main():
+    tests = [
+        ("命中关键词", test_matches_overlapping_keywords),
+        ("匹配器缓存", test_matcher_cache),
+        ("工具命中统计", test_tool_reports_hits),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Nginx 日志聚合统计的测试脚本
+"""
+
+import sys
+import os
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import log_aggregation
+from log_aggregation import aggregate_nginx_logs
+from mock_tools import get_nginx_log_stats_raw
+from test_data import generate_nginx_logs_for_server
+
+
+def _line(timestamp: str, path: str, status: int, seconds: float) -> str:
+    return (f'192.168.1.10 - - [{timestamp} +0000] "GET {path}?x=1 HTTP/1.1" {status} 100 "-" '
+            f'"Mozilla/5.0" {seconds:.3f}')
+
+
+def test_counts_and_percentiles():
+    """计数、状态码类别、最近秩分位数按手算结果核对"""
+    print("🧪 测试计数与分位数")
+    lines = [_line("17/Oct/2026:04:01:10", "/health", 200, 0.001 * i) for i in range(1, 101)]
+    lines += [_line("17/Oct/2026:04:07:00", "/health", 502, 8.0), "garbage"]
+    stats = aggregate_nginx_logs(lines, bucket_minutes=5)
+    print(f"  {stats}")
+
+    endpoint = stats["endpoints"][0]
+    first, second = endpoint["buckets"]
+    return (stats["total_requests"] == 101 and stats["skipped_lines"] == 1
+            and endpoint["endpoint"] == "/health"
+            and endpoint["status_classes"] == {"2xx": 100, "5xx": 1}
+            and first["start"] == "2026-10-17 04:00" and second["start"] == "2026-10-17 04:05"
+            and first["latency_ms"] == {"p50": 50.0, "p95": 95.0, "p99": 99.0}
+            and second == {"start": "2026-10-17 04:05", "requests": 1,
+                           "status_classes": {"5xx": 1}, "latency_ms": {"p50": 8000.0, "p95": 8000.0, "p99": 8000.0}})
+
+
+def test_numpy_matches_python():
+    """装了 numpy 时的数组计算与纯 Python 计算结果一致"""
+    print("🧪 测试 numpy 与纯 Python 结果一致")
+    if log_aggregation.np is None:
+        print("  未安装 numpy，跳过")
+        return True
+    lines = []
+    for ip in ["10.0.1.101", "10.0.2.101", "10.0.2.102"] * 20:
+        lines.extend(generate_nginx_logs_for_server(ip))
+
+    vectorized = aggregate_nginx_logs(lines, bucket_minutes=3)
+    numpy_module, log_aggregation.np = log_aggregation.np, None
+    try:
+        pure_python = aggregate_nginx_logs(lines, bucket_minutes=3)
+    finally:
+        log_aggregation.np = numpy_module
+    print(f"  {vectorized['total_requests']} 条请求, {len(vectorized['endpoints'])} 个接口")
+    return vectorized == pure_python
+
+
+def test_error_spike_visible():
+    """10.0.2.101 在第 30 分钟的 502 激增出现在 /api/v2/data.json 的某个 1 分钟时间桶里"""
+    print("🧪 测试错误激增可见")
+    stats = get_nginx_log_stats_raw("10.0.2.101", api_endpoint="/api/v2/data.json", bucket_minutes=1)
+    endpoint = stats["endpoints"][0]
+    spike = max(endpoint["buckets"], key=lambda bucket: bucket["status_classes"].get("5xx", 0))
+    print(f"  {spike}")
+    return (len(stats["endpoints"]) == 1 and endpoint["endpoint"] == "/api/v2/data.json"
+            and spike["status_classes"].get("5xx", 0) >= 10)
+
+
+def main():
+    tests = [
+        ("计数与分位数", test_counts_and_percentiles),
+        ("numpy 与纯 Python 一致", test_numpy_matches_python),
+        ("错误激增可见", test_error_spike_visible),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Nginx / Redis 日志工具游标分页的测试脚本
+"""
+
+import sys
+import os
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import log_pagination
+from log_pagination import InvalidCursorError, SnapshotCache, paginate
+from mock_tools import get_server_logs_simple, get_server_logs_simple_raw, get_redis_logs_simple_raw
+
+LINES = [f"2026-10-17 04:23:{i:02d} [INFO] command=\"GET k{i}\" duration={i}ms" for i in range(50)]
+
+
+def test_pages_cover_all_matches():
+    """逐页翻完的结果与一次性过滤的结果一致，不丢、不重"""
+    print("🧪 测试翻页覆盖全部匹配日志")
+    pages = []
+    logs, cursor = get_server_logs_simple_raw("10.0.2.101", keywords=["POST"], page_size=4)
+    pages.append(logs)
+    while cursor:
+        logs, cursor = get_server_logs_simple_raw("10.0.2.101", keywords=["POST"], cursor=cursor, page_size=4)
+        pages.append(logs)
+
+    raws = [log["raw"] for page in pages for log in page]
+    print(f"  {len(pages)} 页，共 {len(raws)} 条")
+    return (len(raws) > 10
+            and all(len(page) == 4 for page in pages[:-1]) and 0 < len(pages[-1]) <= 4
+            and len(set(raws)) == len(raws)
+            and all("POST" in raw for raw in raws))
+
+
+def test_lazy_parsing():
+    """只解析返回的这一页；最后一页恰好取完时 next_cursor 为 None"""
+    print("🧪 测试只解析当前页")
+    parsed = []
+    parser = log_pagination.parse_logs
+
+    def counting_parse(source, lines, server_ip):
+        parsed.append(len(lines))
+        return parser(source, lines, server_ip)
+
+    log_pagination.parse_logs = counting_parse
+    try:
+        records, cursor = paginate("redis", "10.0.3.101", lambda: LINES, None, (), page_size=20)
+        records2, cursor2 = paginate("redis", "10.0.3.101", None, None, (), cursor=cursor, page_size=30)
+    finally:
+        log_pagination.parse_logs = parser
+
+    print(f"  每次解析的行数: {parsed}")
+    return (parsed == [20, 30] and cursor and cursor2 is None
+            and [r.operation for r in records + records2] == [f"GET k{i}" for i in range(50)])
+
+
+def test_invalid_cursors():
+    """查询条件变化、快照被挤出缓存、游标损坏都抛出 InvalidCursorError"""
+    print("🧪 测试无效游标")
+    _, cursor = get_redis_logs_simple_raw("10.0.3.101", keywords="ERROR", page_size=1)
+    failures = 0
+    attempts = [
+        lambda: get_redis_logs_simple_raw("10.0.3.101", keywords="WARN", cursor=cursor, page_size=1),
+        lambda: get_redis_logs_simple_raw("10.0.3.102", keywords="ERROR", cursor=cursor, page_size=1),
+        lambda: get_redis_logs_simple_raw("10.0.3.101", keywords="ERROR", cursor="not-a-cursor"),
+    ]
+
+    cache = log_pagination._snapshots
+    log_pagination._snapshots = SnapshotCache(capacity=1)
+    try:
+        _, old_cursor = paginate("redis", "10.0.3.101", lambda: LINES, None, (), page_size=5)
+        paginate("redis", "10.0.3.101", lambda: LINES, None, (), page_size=5)
+        attempts.append(lambda: paginate("redis", "10.0.3.101", None, None, (), cursor=old_cursor))
+        for attempt in attempts:
+            try:
+                attempt()
+            except InvalidCursorError as e:
+                print(f"  {e}")
+                failures += 1
+    finally:
+        log_pagination._snapshots = cache
+    return failures == len(attempts)
+
+
+def test_single_page_not_cached():
+    """只有一页的查询不保存快照，不会挤掉还在翻页的游标"""
+    print("🧪 测试单页结果不占用快照缓存")
+    cache = log_pagination._snapshots
+    log_pagination._snapshots = SnapshotCache(capacity=1)
+    try:
+        _, cursor = paginate("redis", "10.0.3.101", lambda: LINES, None, (), page_size=5)
+        for _ in range(3):
+            _, single = paginate("redis", "10.0.3.101", lambda: LINES, None, (), page_size=len(LINES))
+        records, _ = paginate("redis", "10.0.3.101", None, None, (), cursor=cursor, page_size=5)
+        cached = len(log_pagination._snapshots)
+    finally:
+        log_pagination._snapshots = cache
+    print(f"  单页 next_cursor={single}, 缓存快照 {cached} 个, 旧游标取到 {len(records)} 条")
+    return single is None and cached == 1 and len(records) == 5
+
+
+def test_tool_returns_dict():
+    """CrewAI 工具返回 {"logs": [...], "next_cursor": ...}"""
+    print("🧪 测试工具返回结构")
+    result = get_server_logs_simple.func("10.0.2.101", page_size=3)
+    print(f"  logs={len(result['logs'])} 条, next_cursor={result['next_cursor']}")
+    return list(result) == ["logs", "next_cursor"] and len(result["logs"]) == 3 and result["next_cursor"]
+
+
+def main():
+    tests = [
+        ("翻页覆盖全部匹配", test_pages_cover_all_matches),
+        ("只解析当前页", test_lazy_parsing),
+        ("无效游标", test_invalid_cursors),
+        ("单页结果不占用快照缓存", test_single_page_not_cached),
+        ("工具返回结构", test_tool_returns_dict),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -11,7 +11,8 @@ from datetime import datetime, timedelta
 # 添加路径以便导入
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from mock_tools import get_mysql_logs_simple
+import mock_tools
+from mock_tools import get_mysql_logs_simple_raw
 
 
 def test_simple_call():
@@ -21,7 +22,7 @@ def test_simple_call():
 
     try:
         # 使用 .func 属性调用原始函数
-        logs, next_start = get_mysql_logs_simple.func(
+        logs, next_start = get_mysql_logs_simple_raw(
             server_ip="10.0.3.101",
             limit=5
         )
@@ -46,7 +47,7 @@ def test_pagination():
 
     try:
         # 第一次拉取
-        logs1, next_start = get_mysql_logs_simple.func(
+        logs1, next_start = get_mysql_logs_simple_raw(
             server_ip="10.0.3.101",
             limit=3
         )
@@ -56,7 +57,7 @@ def test_pagination():
 
         if next_start:
             # 第二次拉取
-            logs2, next_start2 = get_mysql_logs_simple.func(
+            logs2, next_start2 = get_mysql_logs_simple_raw(
                 server_ip="10.0.3.101",
                 start_time=next_start,
                 limit=3
@@ -65,15 +66,15 @@ def test_pagination():
             print(f"第二次拉取 {len(logs2)} 条日志")
             print(f"新的下一页起始时间: {next_start2}")
 
-            # 检查是否有重复
-            timestamps1 = {log['timestamp'] for log in logs1}
-            timestamps2 = {log['timestamp'] for log in logs2}
-            duplicates = timestamps1 & timestamps2
+            # 检查是否有重复：同一秒可以有多条日志，按 (时间戳, 原始日志) 判断
+            entries1 = {(log['timestamp'], log['raw']) for log in logs1}
+            entries2 = {(log['timestamp'], log['raw']) for log in logs2}
+            duplicates = entries1 & entries2
 
             if duplicates:
-                print(f"⚠️ 警告: 发现 {len(duplicates)} 个重复时间戳")
-            else:
-                print("✅ 分页正常，无重复日志")
+                print(f"❌ 发现 {len(duplicates)} 条重复日志")
+                return False
+            print("✅ 分页正常，无重复日志")
         else:
             print("第一页就已经没有下一页了")
 
@@ -83,6 +84,41 @@ def test_pagination():
         return False
 
 
+def test_same_second_pagination():
+    """同一秒内有多条日志时，逐页翻完与一次取完的结果完全一致（不重复、不遗漏）"""
+    print("\n📄 测试同一秒内多条日志的分页")
+    print("=" * 60)
+
+    lines = [
+        f"2026-10-17 04:{minute:02d}:00 [INFO] [Query] duration=0.0{n}s sql=\"SELECT {minute}{n};\""
+        for minute in (3, 1, 2) for n in range(4)
+    ] + ['bad-timestamp [ERROR] [Query] duration=0s sql="SELECT 0;"']
+
+    original = mock_tools.generate_mysql_logs_for_server
+    mock_tools.generate_mysql_logs_for_server = lambda server_ip, minutes: list(lines)
+    try:
+        everything, cursor = get_mysql_logs_simple_raw(server_ip="10.0.3.101", limit=100)
+        pages = []
+        cursor = ""
+        while True:
+            page, cursor = get_mysql_logs_simple_raw(server_ip="10.0.3.101", start_time=cursor, limit=3)
+            pages.extend(page)
+            print(f"  本页 {len(page)} 条, next_start_time={cursor}")
+            if not cursor:
+                break
+        window, _ = get_mysql_logs_simple_raw(server_ip="10.0.3.101", start_time="2026-10-17 04:02:00",
+                                               end_time="2026-10-17 04:02:59", limit=100)
+    finally:
+        mock_tools.generate_mysql_logs_for_server = original
+
+    sql = [log["operation"] for log in everything]
+    return (len(everything) == len(lines)
+            and sql[0] == "SELECT 0;"
+            and sql[1:] == [f"SELECT {minute}{n};" for minute in (1, 2, 3) for n in range(4)]
+            and [log["raw"] for log in pages] == [log["raw"] for log in everything]
+            and [log["operation"] for log in window] == [f"SELECT 2{n};" for n in range(4)])
+
+
 def test_time_filter():
     """测试时间过滤"""
     print("\n⏰ 测试时间过滤")
@@ -92,7 +128,7 @@ def test_time_filter():
         end_time = datetime.now()
         start_time = end_time - timedelta(minutes=10)
 
-        logs, _ = get_mysql_logs_simple.func(
+        logs, _ = get_mysql_logs_simple_raw(
             server_ip="10.0.3.101",
             start_time=start_time.strftime("%Y-%m-%d %H:%M:%S"),
             end_time=end_time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -117,7 +153,7 @@ def test_keyword_filter():
     print("=" * 60)
 
     try:
-        logs, _ = get_mysql_logs_simple.func(
+        logs, _ = get_mysql_logs_simple_raw(
             server_ip="10.0.3.101",
             keywords="SELECT",
             limit=5
@@ -141,7 +177,7 @@ def test_slow_query_filter():
     print("=" * 60)
 
     try:
-        logs, _ = get_mysql_logs_simple.func(
+        logs, _ = get_mysql_logs_simple_raw(
             server_ip="10.0.3.101",
             min_duration_s=2.0,
             limit=5
@@ -166,7 +202,7 @@ def test_invalid_server():
     print("=" * 60)
 
     try:
-        logs, next_start = get_mysql_logs_simple.func(
+        logs, next_start = get_mysql_logs_simple_raw(
             server_ip="999.999.999.999",  # 无效IP
             limit=3
         )
@@ -189,7 +225,7 @@ def simulate_agent_scenario():
 
     # 步骤1: 查找慢查询
     print("\n步骤1: 查找慢查询...")
-    slow_logs, next_start = get_mysql_logs_simple.func(
+    slow_logs, next_start = get_mysql_logs_simple_raw(
         server_ip="10.0.3.101",
         min_duration_s=1.0,
         limit=5
@@ -209,7 +245,7 @@ def simulate_agent_scenario():
     # 步骤3: 如果需要更多数据，继续拉取
     if next_start and len(slow_logs) == 5:
         print("\n步骤2: 继续拉取更多慢查询数据...")
-        more_logs, _ = get_mysql_logs_simple.func(
+        more_logs, _ = get_mysql_logs_simple_raw(
             server_ip="10.0.3.101",
             start_time=next_start,
             min_duration_s=1.0,
@@ -239,6 +275,7 @@ def main():
     tests = [
         ("简单调用", test_simple_call),
         ("分页功能", test_pagination),
+        ("同一秒分页", test_same_second_pagination),
         ("时间过滤", test_time_filter),
         ("关键词过滤", test_keyword_filter),
         ("慢查询过滤", test_slow_query_filter),
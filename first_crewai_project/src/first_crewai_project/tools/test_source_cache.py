@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+解码后源码文件缓存 SourceCache 的测试脚本
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from source_cache import SourceCache, source_cache, detect_encoding, ENCODING_SAMPLE_BYTES
+from mock_tools import get_code_context_raw
+
+
+def test_adjacent_windows_hit_cache():
+    """同一文件连续取相邻行段：只读取、检测编码一次，内容与直接解码一致"""
+    print("🧪 测试相邻行段命中缓存")
+    source_cache.clear()
+    before = source_cache.stats()
+    first = get_code_context_raw("app/services/data_service.py", 1, 50)
+    second = get_code_context_raw("app/services/data_service.py", 50, 100)
+    after = source_cache.stats()
+    print(f"  {first['encoding']}, {first['total_lines']} 行, 缓存: {after}")
+    with open(first["file_path"], "rb") as f:
+        expected = f.read().decode(first["encoding"]).splitlines()
+    return (after["misses"] - before["misses"] == 1 and after["hits"] - before["hits"] == 1
+            and after["detections"] - before["detections"] == 1
+            and [line["content"] for line in first["code"]] == expected[0:50]
+            and [line["content"] for line in second["code"]] == expected[49:100])
+
+
+def test_invalidated_on_change():
+    """文件修改（mtime / size 变化）后重新读取；编码检测按文件版本缓存"""
+    print("🧪 测试文件修改后失效")
+    root = tempfile.mkdtemp()
+    try:
+        cache = SourceCache()
+        path = os.path.join(root, "job.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# 任务\nx = 1\n")
+        first = cache.load(path)
+        cache._files.clear()  # 行数组被挤出缓存，编码检测结果仍在
+        again = cache.load(path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# 任务\nx = 2\ny = 3\n")
+        os.utime(path, ns=(1, 1))
+        changed = cache.load(path)
+        print(f"  {first.lines} → {changed.lines}, {cache.stats()}")
+        return (again.lines == first.lines and changed.lines == ("# 任务", "x = 2", "y = 3")
+                and cache.stats()["detections"] == 2 and cache.stats()["misses"] == 3)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_bounded():
+    """按文件个数和总字节数淘汰最久未使用的文件"""
+    print("🧪 测试缓存上限")
+    root = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(4):
+            paths.append(os.path.join(root, f"m{i}.py"))
+            with open(paths[-1], "w") as f:
+                f.write("x = 1\n" * 100)  # 600 字节
+        by_count = SourceCache(capacity=2)
+        by_bytes = SourceCache(capacity=10, max_bytes=1500)
+        for cache in (by_count, by_bytes):
+            for path in paths:
+                cache.load(path)
+            cache.load(paths[3])
+        print(f"  个数上限: {by_count.stats()}, 字节上限: {by_bytes.stats()}")
+        return (by_count.stats()["files"] == 2 and by_bytes.stats()["bytes"] == 1200
+                and by_count.stats()["hits"] == 1 and by_bytes.stats()["hits"] == 1)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_sampled_detection():
+    """编码只按文件开头的样本检测：UTF-8 不调用 chardet，样本末尾截断的多字节字符不影响判断"""
+    print("🧪 测试按样本检测编码")
+    text = "# 数据服务\n" * (ENCODING_SAMPLE_BYTES // 5)
+    utf8 = text.encode("utf-8")
+    gbk = text.encode("gbk")
+    # 每行 15 字节，"# " 之后是 3 字节的 "数"：在它中间截断
+    truncated = utf8[:15 * (ENCODING_SAMPLE_BYTES // 15 - 1) + 3]
+    results = (detect_encoding(utf8), detect_encoding(truncated, complete=False),
+               detect_encoding(gbk[:ENCODING_SAMPLE_BYTES], complete=False))
+    print(f"  UTF-8: {results[0]}, 截断的 UTF-8 样本: {results[1]}, GBK 样本: {results[2]}")
+    return (results[0] == ("utf-8", 1.0) and results[1] == ("utf-8", 1.0)
+            and gbk.decode(results[2][0]) == text and detect_encoding(truncated)[0] != "utf-8")
+
+
+def test_streamed_line_range():
+    """大文件流式读取所需的行：行号与整份解码一致，读到末尾才知道总行数"""
+    print("🧪 测试大文件流式读取")
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "generated.py")
+        with open(path, "w", encoding="gbk", newline="") as f:
+            for i in range(1, 20001):
+                f.write(f"value_{i} = '数据{i}'" + ("\r\n" if i % 3 else "\n"))
+        full = SourceCache(full_load_bytes=1 << 30).read_lines(path, 100, 149)
+        streaming = SourceCache(full_load_bytes=1024)
+        head = streaming.read_lines(path, 100, 149)
+        tail = streaming.read_lines(path, 19990, 20100)
+        beyond = streaming.read_lines(path, 30000, 30010)
+        print(f"  {head.encoding}: {head.lines[0]!r}..{head.lines[-1]!r}, total={head.total_lines}; "
+              f"末尾 {tail.line_start}-{tail.line_end} total={tail.total_lines}; 越界 {beyond.line_start} {beyond.lines}")
+        return (head.lines == full.lines and head.lines[0] == "value_100 = '数据100'" and len(head.lines) == 50
+                and head.total_lines is None and full.total_lines == 20000
+                and (tail.line_start, tail.line_end, tail.total_lines, len(tail.lines)) == (19990, 20000, 20000, 11)
+                and (beyond.line_start, beyond.line_end, beyond.lines) == (20000, 20000, ("value_20000 = '数据20000'",))
+                and streaming.stats()["streamed"] == 3 and streaming.stats()["files"] == 0
+                and streaming.stats()["detections"] == 1)
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    tests = [
+        ("相邻行段命中缓存", test_adjacent_windows_hit_cache),
+        ("文件修改后失效", test_invalidated_on_change),
+        ("缓存上限", test_bounded),
+        ("按样本检测编码", test_sampled_detection),
+        ("大文件流式读取", test_streamed_line_range),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
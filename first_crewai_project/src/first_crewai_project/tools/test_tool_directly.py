@@ -36,8 +36,8 @@ try:
     print("\n🔧 测试2: 获取服务器日志")
     if servers:
         test_ip = servers[0]['ip']
-        logs = get_server_logs_simple_raw(test_ip, api_endpoint="/api/v2/data.json")
-        print(f"获取到 {len(logs)} 条日志")
+        logs, next_cursor = get_server_logs_simple_raw(test_ip, api_endpoint="/api/v2/data.json")
+        print(f"获取到 {len(logs)} 条日志，next_cursor={next_cursor}")
         if logs:
             print(f"第一条日志示例: {logs[0]}")
 
@@ -62,8 +62,8 @@ try:
 
     # 测试6: 获取Redis日志
     print("\n🔧 测试6: 获取Redis日志")
-    redis_logs = get_redis_logs_simple_raw(test_ip, keywords="error")
-    print(f"获取到 {len(redis_logs)} 条Redis日志")
+    redis_logs, next_cursor = get_redis_logs_simple_raw(test_ip, keywords="error")
+    print(f"获取到 {len(redis_logs)} 条Redis日志，next_cursor={next_cursor}")
     if redis_logs:
         print(f"第一条Redis日志示例: {redis_logs[0]}")
 
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+UnifiedLogV1 记录类型与各来源解析器的测试脚本
+"""
+
+import sys
+import os
+
+# 添加路径以便导入
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from unified_log import UnifiedLogV1, UNIFIED_LOG_FIELDS, parse_logs, get_parser, to_dicts
+from mock_tools import get_server_logs_simple_raw, get_mysql_logs_simple_raw, get_redis_logs_simple_raw
+
+NGINX_LINE = ('192.168.1.10 - - [17/Oct/2026:04:26:06 +0000] "POST /api/v2/data.json?id=3 HTTP/1.1" 502 357 "-" '
+              '"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36" 6.966')
+MYSQL_LINE = '2026-10-17 04:23:54 [WARN] [SlowQuery] duration=4.21s sql="UPDATE products SET stock = stock - 1 WHERE id=10;"'
+REDIS_LINE = '2026-10-17 04:23:54 [SLOWLOG] command="KEYS *" duration=120ms'
+
+
+def test_record_type():
+    """记录类型：__slots__、统一的字段类型、字典互转"""
+    print("🧪 测试 UnifiedLogV1 记录类型")
+    record = UnifiedLogV1("redis", "10.0.3.101", "2026-10-17 04:23:54", "SLOWLOG", "KEYS *", 200, 120, "raw")
+
+    ok = True
+    ok &= not hasattr(record, "__dict__")
+    ok &= isinstance(record.latency_ms, float) and record.latency_ms == 120.0
+    ok &= isinstance(record.status, str) and record.status == "200"
+    ok &= list(record.to_dict()) == list(UNIFIED_LOG_FIELDS)
+    ok &= UnifiedLogV1.from_dict(record.to_dict()) == record
+    print(f"  {record!r}")
+    return ok
+
+
+def test_nginx_parser():
+    """Nginx：方法 + 路径（去掉查询串）、状态码、秒转毫秒、>=500 为 ERROR"""
+    print("🧪 测试 Nginx 解析器")
+    record = get_parser("nginx").parse_line(NGINX_LINE, "10.0.2.101")
+    print(f"  {record!r}")
+    return (record.operation == "POST /api/v2/data.json"
+            and record.status == "502"
+            and record.severity == "ERROR"
+            and abs(record.latency_ms - 6966.0) < 1e-6
+            and record.timestamp == "17/Oct/2026:04:26:06 +0000")
+
+
+def test_nginx_malformed_line():
+    """Nginx：不符合 combined 格式的行退回逐字段查找，缺失字段取默认值"""
+    print("🧪 测试 Nginx 残缺日志行")
+    records = parse_logs("nginx", ['"GET /health HTTP/1.1" 404 ', "garbage"], "10.0.2.101")
+    print(f"  {records}")
+    return ([(r.operation, r.status, r.latency_ms, r.timestamp) for r in records]
+            == [("GET /health", "404", 0.0, ""), ("UNKNOWN unknown", "000", 0.0, "")])
+
+
+def test_mysql_parser():
+    """MySQL：SQL、秒转毫秒、WARN 的状态为 OK"""
+    print("🧪 测试 MySQL 解析器")
+    record = get_parser("mysql").parse_line(MYSQL_LINE, "10.0.3.101")
+    print(f"  {record!r}")
+    return (record.operation.startswith("UPDATE products")
+            and record.severity == "WARN"
+            and record.status == "OK"
+            and abs(record.latency_ms - 4210.0) < 1e-6
+            and record.timestamp == "2026-10-17 04:23:54")
+
+
+def test_redis_parser():
+    """Redis：毫秒耗时为 float，无法解析的行被跳过"""
+    print("🧪 测试 Redis 解析器")
+    records = parse_logs("redis", [REDIS_LINE, "garbage line"], "10.0.3.101")
+    print(f"  {records}")
+    return (len(records) == 1
+            and records[0].operation == "KEYS *"
+            and records[0].latency_ms == 120.0
+            and isinstance(records[0].latency_ms, float))
+
+
+def test_unknown_source():
+    """未注册的来源抛出 ValueError"""
+    print("🧪 测试未注册的日志来源")
+    try:
+        parse_logs("kafka", [], "10.0.0.1")
+    except ValueError as e:
+        print(f"  {e}")
+        return True
+    return False
+
+
+def test_tools_share_types():
+    """三个日志工具的输出字段和类型一致"""
+    print("🧪 测试三个日志工具的输出类型")
+    outputs = {
+        "nginx": get_server_logs_simple_raw("10.0.2.101")[0],
+        "mysql": get_mysql_logs_simple_raw("10.0.3.101", limit=20)[0],
+        "redis": get_redis_logs_simple_raw("10.0.3.101")[0],
+    }
+    ok = True
+    for source, logs in outputs.items():
+        types = {(type(log["latency_ms"]).__name__, type(log["status"]).__name__) for log in logs}
+        fields = {tuple(log) for log in logs}
+        print(f"  {source}: {len(logs)} 条, latency_ms/status 类型 {types}")
+        ok &= bool(logs) and types == {("float", "str")} and fields == {UNIFIED_LOG_FIELDS}
+    return ok
+
+
+def test_memory():
+    """10 万条记录：__slots__ 对象与字典本身的内存对比（字段值两者共享，不计入）"""
+    print("🧪 测试内存占用")
+    records = parse_logs("nginx", [NGINX_LINE] * 100_000, "10.0.2.101")
+    dicts = to_dicts(records)
+
+    slots_bytes = sum(sys.getsizeof(record) for record in records)
+    dict_bytes = sum(sys.getsizeof(log) for log in dicts)
+    print(f"  UnifiedLogV1: {slots_bytes / 1e6:.1f} MB, 字典: {dict_bytes / 1e6:.1f} MB "
+          f"（{dict_bytes / slots_bytes:.1f}x）")
+    return slots_bytes * 2 < dict_bytes
+
+
+def main():
+    tests = [
+        ("记录类型", test_record_type),
+        ("Nginx 解析", test_nginx_parser),
+        ("Nginx 残缺行", test_nginx_malformed_line),
+        ("MySQL 解析", test_mysql_parser),
+        ("Redis 解析", test_redis_parser),
+        ("未注册来源", test_unknown_source),
+        ("工具输出类型", test_tools_share_types),
+        ("内存占用", test_memory),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
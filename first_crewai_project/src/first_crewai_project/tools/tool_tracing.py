@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+工具调用追踪模块 - 记录每次工具调用的耗时和数据量
+
+覆盖三层：
+- raw:            mock_tools 中的 *_raw 原始函数（@traced 装饰）
+- client:         MCPClient.call_tool 发起的 HTTP 调用
+- server:<名称>:   运维 / 监控 MCP 服务器的每个 HTTP 端点（中间件）
+
+每条记录包含墙钟耗时、请求 / 响应字节数，以及发起调用的智能体和任务
+（通过 contextvars 传递；跨进程时由客户端通过 HTTP 头带给服务器），
+以 JSONL 追加写入 TOOL_TRACE_FILE，并可在诊断结束时打印汇总表。
+字节数只取已经序列化好的数据（客户端的请求 / 响应体、服务器响应的 content-length），
+raw 层只记耗时，不为了统计再把参数和返回值 json.dumps 一遍。
+
+追踪默认关闭：诊断入口（crew.py）调用 tracer.enable() 打开，或设置 TOOL_TRACE=1。
+服务器进程没有打开追踪时，只记录带着 X-Trace-Run 头的请求（即打开了追踪的客户端发来的调用）。
+记录写入一个常驻的缓冲文件句柄，内存中只保留最近 TOOL_TRACE_MEMORY 条。
+
+环境变量：
+    TOOL_TRACE=1                打开追踪
+    TOOL_TRACE_FILE=...         JSONL 文件路径，默认 <项目>/logs/tool_traces.jsonl
+    TOOL_TRACE_MEMORY=1000      内存中保留的最近记录条数
+    TOOL_TRACE_FLUSH_SECONDS=1  缓冲的记录最多多久写一次盘
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+DEFAULT_TRACE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "tool_traces.jsonl"
+)
+
+# 当前发起工具调用的智能体 / 任务 / 诊断运行 ID
+current_agent = contextvars.ContextVar("tool_trace_agent", default=None)
+current_task = contextvars.ContextVar("tool_trace_task", default=None)
+current_run = contextvars.ContextVar("tool_trace_run", default=None)
+
+# 客户端 → 服务器传递调用上下文的 HTTP 头
+HEADER_AGENT = "X-Trace-Agent"
+HEADER_TASK = "X-Trace-Task"
+HEADER_RUN = "X-Trace-Run"
+HEADER_TOOL = "X-Trace-Tool"
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class ToolTracer:
+    """收集工具调用记录，写入 JSONL 并生成汇总"""
+
+    def __init__(self, path: str = None, enabled: bool = None, max_records: int = None):
+        self.path = path or os.environ.get("TOOL_TRACE_FILE", DEFAULT_TRACE_FILE)
+        if enabled is None:
+            enabled = os.environ.get("TOOL_TRACE", "0").lower() in ("1", "true", "on")
+        self.enabled = enabled
+        self.run_id = None
+        # 只保留最近的记录（长期运行的服务器进程不能无限增长），完整记录在 JSONL 里
+        self.records = deque(maxlen=max_records or int(os.environ.get("TOOL_TRACE_MEMORY", "1000")))
+        self.flush_seconds = float(os.environ.get("TOOL_TRACE_FLUSH_SECONDS", "1"))
+        self._file = None
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def enable(self):
+        """打开追踪（诊断入口调用）"""
+        self.enabled = True
+
+    def active(self) -> bool:
+        """本进程打开了追踪，或者当前请求来自打开了追踪的客户端"""
+        return self.enabled or current_run.get() is not None
+
+    def start_run(self) -> str:
+        """开始一次诊断运行，之后的记录都带上这个运行 ID"""
+        self.run_id = uuid.uuid4().hex[:12]
+        return self.run_id
+
+    def active_run(self) -> Optional[str]:
+        return current_run.get() or self.run_id
+
+    def record(self, layer: str, tool: str, wall_ms: float, serialize_ms: float = None,
+               request_bytes: int = None, response_bytes: int = None, ok: bool = True,
+               error: str = None, agent: str = None, task: str = None):
+        """记录一次调用并追加写入 JSONL（缓冲写入，最多 flush_seconds 秒落盘一次）"""
+        if not self.active():
+            return
+        entry = {
+            "ts": round(time.time(), 3),
+            "run_id": self.active_run(),
+            "pid": os.getpid(),
+            "layer": layer,
+            "tool": tool,
+            "agent": agent if agent is not None else current_agent.get(),
+            "task": task if task is not None else current_task.get(),
+            "wall_ms": round(wall_ms, 3),
+            "serialize_ms": round(serialize_ms, 3) if serialize_ms is not None else None,
+            "request_bytes": request_bytes,
+            "response_bytes": response_bytes,
+            "ok": ok,
+            "error": error,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.records.append(entry)
+            try:
+                if self._file is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line)
+                now = time.monotonic()
+                if now - self._last_flush >= self.flush_seconds:
+                    self._file.flush()
+                    self._last_flush = now
+            except OSError as e:
+                print(f"[警告] 写入工具追踪记录失败: {e}")
+
+    def flush(self):
+        """把缓冲中的记录写到磁盘"""
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.flush()
+                except OSError as e:
+                    print(f"[警告] 写入工具追踪记录失败: {e}")
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except OSError:
+                    pass
+                self._file = None
+
+    def load_run(self, run_id: str) -> List[Dict[str, Any]]:
+        """从 JSONL 读取某次运行的全部记录（包括 MCP 服务器进程写入的记录）"""
+        self.flush()
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("run_id") == run_id:
+                        entries.append(entry)
+        except OSError:
+            pass
+        return entries
+
+    def summarize(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按 (层, 工具) 汇总调用次数、耗时分位数和平均数据量"""
+        groups = {}
+        for entry in entries:
+            groups.setdefault((entry["layer"], entry["tool"]), []).append(entry)
+
+        rows = []
+        for (layer, tool), items in groups.items():
+            walls = [item["wall_ms"] for item in items]
+            serializes = [item["serialize_ms"] for item in items if item.get("serialize_ms") is not None]
+            requests = [item["request_bytes"] for item in items if item.get("request_bytes") is not None]
+            responses = [item["response_bytes"] for item in items if item.get("response_bytes") is not None]
+            rows.append({
+                "layer": layer,
+                "tool": tool,
+                "calls": len(items),
+                "errors": sum(1 for item in items if not item.get("ok", True)),
+                "total_ms": sum(walls),
+                "p50_ms": _percentile(walls, 50),
+                "p95_ms": _percentile(walls, 95),
+                "max_ms": max(walls),
+                "avg_serialize_ms": sum(serializes) / len(serializes) if serializes else None,
+                "avg_request_bytes": sum(requests) / len(requests) if requests else None,
+                "avg_response_bytes": sum(responses) / len(responses) if responses else None,
+                # 调用方：智能体角色；没有智能体时（如证据预采集）用任务名
+                "callers": sorted({item.get("agent") or f"[{item['task']}]"
+                                   for item in items if item.get("agent") or item.get("task")}),
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def print_summary(self, run_id: str = None):
+        """打印某次运行（默认当前运行）的工具调用汇总表"""
+        if not self.enabled:
+            return
+        run_id = run_id or self.run_id
+        entries = self.load_run(run_id) if run_id else list(self.records)
+        if not entries:
+            print("\n🔬 工具调用追踪: 没有记录")
+            return
+
+        def _num(value, fmt, width=10):
+            return format(format(value, fmt) if value is not None else "-", f">{width}")
+
+        print(f"\n🔬 工具调用追踪汇总（运行 {run_id}，共 {len(entries)} 条，明细见 {self.path}）")
+        header = (f"  {'层':<16}{'工具':<32}{'次数':>6}{'失败':>6}{'总耗时ms':>12}{'p50ms':>10}"
+                  f"{'p95ms':>10}{'最大ms':>10}{'序列化ms':>10}{'请求B':>10}{'响应B':>10}")
+        print(header)
+        print("  " + "-" * (len(header) + 8))
+        for row in self.summarize(entries):
+            print(f"  {row['layer']:<16}{row['tool']:<32}{row['calls']:>6}{row['errors']:>6}"
+                  f"{row['total_ms']:>12.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['max_ms']:>10.1f}"
+                  f"{_num(row['avg_serialize_ms'], '.2f')}"
+                  f"{_num(row['avg_request_bytes'], '.0f')}"
+                  f"{_num(row['avg_response_bytes'], '.0f')}")
+            if row["callers"]:
+                print(f"  {'':<16}↳ 调用方: {', '.join(row['callers'])}")
+
+
+# 进程内共享的追踪器
+tracer = ToolTracer()
+
+
+@contextmanager
+def trace_context(agent: str = None, task: str = None, run_id: str = None):
+    """在 with 块内设置当前的智能体 / 任务 / 运行 ID"""
+    tokens = [
+        (var, var.set(value))
+        for var, value in ((current_agent, agent), (current_task, task), (current_run, run_id))
+        if value is not None
+    ]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def bind_context(func):
+    """
+    捕获调用方当前的 contextvars，让 func 在线程池里执行时也带着同样的智能体 / 任务信息
+
+    每次调用使用上下文的一份拷贝，同一个包装函数可以被多个线程同时执行
+    """
+    context = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def trace_headers(tool_name: str) -> Dict[str, str]:
+    """客户端发请求时携带的追踪头（HTTP 头只能是 latin-1，中文角色名做 URL 编码）"""
+    from urllib.parse import quote
+
+    headers = {HEADER_TOOL: tool_name}
+    if not tracer.active():
+        return headers
+    for header, value in ((HEADER_AGENT, current_agent.get()), (HEADER_TASK, current_task.get()),
+                          (HEADER_RUN, tracer.active_run())):
+        if value:
+            headers[header] = quote(str(value))
+    return headers
+
+
+def traced(func=None, *, layer: str = "raw", name: str = None):
+    """
+    装饰器：记录函数的墙钟耗时
+
+    不统计参数 / 返回值的字节数：那需要再 json.dumps 一遍整个结果，比很多工具本身还慢；
+    数据量看 client / server 层的记录
+
+    用法：@traced 或 @traced(layer="raw", name="get_nginx_servers")
+    """
+    def decorator(fn):
+        tool_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.active():
+                return fn(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                tracer.record(layer, tool_name, (time.perf_counter() - start) * 1000,
+                              ok=False, error=str(e)[:200])
+                raise
+            tracer.record(layer, tool_name, (time.perf_counter() - start) * 1000)
+            return result
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def install_tracing_middleware(app, server_name: str):
+    """
+    给 FastAPI 应用安装追踪中间件：每个端点的耗时和请求 / 响应字节数
+
+    工具名取客户端带来的 X-Trace-Tool 头，没有时用请求路径；
+    智能体 / 任务 / 运行 ID 从请求头还原到 contextvars，端点内 *_raw 函数的记录也能带上。
+    服务器进程没有打开追踪时，只记录带 X-Trace-Run 头的请求；每个请求结束时落盘，
+    客户端打印汇总时能读到服务器这边的记录
+    """
+    from urllib.parse import unquote
+
+    layer = f"server:{server_name}"
+
+    @app.middleware("http")
+    async def tool_tracing_middleware(request, call_next):
+        headers = request.headers
+        if not tracer.enabled and HEADER_RUN not in headers:
+            return await call_next(request)
+
+        agent = unquote(headers.get(HEADER_AGENT, "")) or None
+        task = unquote(headers.get(HEADER_TASK, "")) or None
+        run_id = unquote(headers.get(HEADER_RUN, "")) or None
+        tool = headers.get(HEADER_TOOL) or f"{request.method} {request.url.path}"
+        request_bytes = int(headers.get("content-length") or 0)
+
+        start = time.perf_counter()
+        with trace_context(agent, task, run_id):
+            try:
+                response = await call_next(request)
+            except Exception as e:
+                tracer.record(layer, tool, (time.perf_counter() - start) * 1000,
+                              request_bytes=request_bytes, ok=False, error=str(e)[:200])
+                raise
+            wall_ms = (time.perf_counter() - start) * 1000
+            response_bytes = response.headers.get("content-length")
+            tracer.record(layer, tool, wall_ms,
+                          request_bytes=request_bytes,
+                          response_bytes=int(response_bytes) if response_bytes else None,
+                          ok=response.status_code < 400,
+                          error=None if response.status_code < 400 else f"HTTP {response.status_code}")
+        tracer.flush()
+        return response
+
+    return app
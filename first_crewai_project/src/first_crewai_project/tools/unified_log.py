@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+统一日志结构 UnifiedLogV1 与各日志来源的解析器
+
+Nginx / MySQL / Redis 三个日志工具共用这里的解析代码：
+- UnifiedLogV1 是带 __slots__ 的记录类型，没有逐条的 __dict__，大批量日志的内存只有字典的几分之一；
+  字段类型统一：latency_ms 一律为 float（毫秒），status 一律为 str
+- 每种来源一个解析器类，用 @register_parser 注册，parse_logs(source, lines, server_ip) 按来源分发
+- 工具对外（MCP / JSON）仍返回字典，边界处调用 to_dicts()
+
+    {
+        "source": "nginx",
+        "server_ip": "...",
+        "timestamp": "...",
+        "severity": "...",
+        "operation": "GET /api/v2/data.json",
+        "status": "502",
+        "latency_ms": 200.5,
+        "raw": "原始日志"
+    }
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+UNIFIED_LOG_FIELDS = ("source", "server_ip", "timestamp", "severity", "operation", "status", "latency_ms", "raw")
+
+
+class UnifiedLogV1:
+    """一条统一结构的日志"""
+
+    __slots__ = UNIFIED_LOG_FIELDS
+
+    def __init__(self, source: str, server_ip: str, timestamp: str, severity: str,
+                 operation: str, status: Any, latency_ms: Any, raw: str):
+        self.source = source
+        self.server_ip = server_ip
+        self.timestamp = timestamp
+        self.severity = severity
+        self.operation = operation
+        self.status = str(status)
+        self.latency_ms = float(latency_ms)
+        self.raw = raw
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in UNIFIED_LOG_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UnifiedLogV1":
+        return cls(*(data[field] for field in UNIFIED_LOG_FIELDS))
+
+    def __eq__(self, other):
+        if not isinstance(other, UnifiedLogV1):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in UNIFIED_LOG_FIELDS)
+
+    def __repr__(self):
+        return (f"UnifiedLogV1({self.source} {self.server_ip} {self.timestamp} [{self.severity}] "
+                f"{self.operation!r} status={self.status} latency_ms={self.latency_ms})")
+
+
+def to_dicts(records: Iterable[UnifiedLogV1]) -> List[Dict[str, Any]]:
+    """工具返回值：记录列表 → 字典列表（JSON 可序列化）"""
+    return [record.to_dict() for record in records]
+
+
+# ================== 解析器注册 ==================
+
+_PARSERS: Dict[str, "LogParser"] = {}
+
+
+def register_parser(cls: Type["LogParser"]) -> Type["LogParser"]:
+    """类装饰器：按 cls.source 注册解析器（每种来源一个实例，正则在类定义时已编译）"""
+    _PARSERS[cls.source] = cls()
+    return cls
+
+
+def get_parser(source: str) -> "LogParser":
+    try:
+        return _PARSERS[source]
+    except KeyError:
+        raise ValueError(f"没有注册 {source} 日志的解析器，可用: {', '.join(sorted(_PARSERS))}") from None
+
+
+def parse_logs(source: str, lines: Iterable[str], server_ip: str) -> List[UnifiedLogV1]:
+    """按来源解析一批原始日志，无法解析的行跳过"""
+    return get_parser(source).parse_many(lines, server_ip)
+
+
+class LogParser:
+    """解析器基类：子类设置 source 并实现 parse_line"""
+
+    source: str = None
+
+    def parse_line(self, line: str, server_ip: str) -> Optional[UnifiedLogV1]:
+        """解析一行原始日志；无法解析时返回 None"""
+        raise NotImplementedError
+
+    def parse_many(self, lines: Iterable[str], server_ip: str) -> List[UnifiedLogV1]:
+        records = []
+        for line in lines:
+            try:
+                record = self.parse_line(line, server_ip)
+            except Exception as e:
+                print(f"[警告] 解析 {self.source} 日志失败: {e}")
+                continue
+            if record is not None:
+                records.append(record)
+        return records
+
+
+@register_parser
+class NginxLogParser(LogParser):
+    """
+    Nginx 访问日志（combined 格式 + 末尾的 $request_time 秒）：状态码 >= 500 记为 ERROR
+
+        $remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent
+        "$http_referer" "$http_user_agent" $request_time
+
+    一个预编译的 combined 格式正则一次匹配取出全部字段；格式不完整的行（匹配失败）
+    才退回逐字段宽松查找，缺失字段取默认值。
+    （按双引号切分 + 逐字段校验的写法实测比单次正则匹配慢，见 bench_nginx_parser.py）
+    """
+
+    source = "nginx"
+
+    _COMBINED = re.compile(
+        r'\S+ \S+ \S+ \[([^\]]*)\] '                   # $time_local
+        r'"([A-Z]+) ([^\s?"]+)[^"]*" '                # $request：方法、路径（不含查询串）
+        r'(\d{3}) \S+ "[^"]*" "[^"]*"\s+([\d.]+)\s*$'  # $status、$request_time
+    )
+
+    # 兜底用的逐字段宽松匹配
+    _PATH = re.compile(r'"(GET|POST)\s+([^\s?]+)')
+    _STATUS = re.compile(r'"\s+(\d{3})\s+')
+    _RESPONSE_TIME = re.compile(r'([\d.]+)$')
+    _TIMESTAMP = re.compile(r'\[(.*?)\]')
+
+    def parse_fields(self, line: str) -> Tuple[str, str, str, str, float]:
+        """只取字段不建记录：(时间戳, 方法, 路径, 状态码, 响应时间秒)，供聚合统计等批量计算使用"""
+        match = self._COMBINED.match(line)
+        if match:
+            timestamp, method, path, status_code, response_time = match.groups()
+            return timestamp, method, path, status_code, float(response_time)
+        return self._lenient_fields(line)
+
+    def parse_line(self, line: str, server_ip: str) -> Optional[UnifiedLogV1]:
+        timestamp, method, path, status_code, response_time = self.parse_fields(line)
+
+        return UnifiedLogV1(
+            source=self.source,
+            server_ip=server_ip,
+            timestamp=timestamp,
+            severity="ERROR" if int(status_code) >= 500 else "INFO",
+            operation=f"{method} {path}",
+            status=status_code,
+            latency_ms=response_time * 1000,
+            raw=line,
+        )
+
+    def _lenient_fields(self, line: str):
+        path_match = self._PATH.search(line)
+        status_match = self._STATUS.search(line)
+        rt_match = self._RESPONSE_TIME.search(line)
+        time_match = self._TIMESTAMP.search(line)
+        return (
+            time_match.group(1) if time_match else "",
+            path_match.group(1) if path_match else "UNKNOWN",
+            path_match.group(2) if path_match else "unknown",
+            status_match.group(1) if status_match else "000",
+            float(rt_match.group(1)) if rt_match else 0.0,
+        )
+
+
+@register_parser
+class MySQLLogParser(LogParser):
+    """MySQL 日志：行首 19 位时间戳，duration=<秒>s，sql="..." """
+
+    source = "mysql"
+
+    _SEVERITY = re.compile(r"\[(INFO|WARN|ERROR)\]")
+    _SQL = re.compile(r'sql="([^"]+)"')
+    _DURATION = re.compile(r'duration=([\d.]+)s')
+
+    def parse_line(self, line: str, server_ip: str) -> Optional[UnifiedLogV1]:
+        sev_match = self._SEVERITY.search(line)
+        severity = sev_match.group(1) if sev_match else "INFO"
+
+        sql_match = self._SQL.search(line)
+        dur_match = self._DURATION.search(line)
+
+        return UnifiedLogV1(
+            source=self.source,
+            server_ip=server_ip,
+            timestamp=line[:19],
+            severity=severity,
+            operation=sql_match.group(1) if sql_match else "UNKNOWN SQL",
+            status="ERROR" if severity == "ERROR" else "OK",
+            latency_ms=float(dur_match.group(1)) * 1000 if dur_match else 0.0,
+            raw=line,
+        )
+
+
+@register_parser
+class RedisLogParser(LogParser):
+    """Redis 日志：时间戳和级别缺失的行视为无法解析，duration=<毫秒>ms，command="..." """
+
+    source = "redis"
+
+    _TIMESTAMP = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})")
+    _SEVERITY = re.compile(r"\[(INFO|WARN|ERROR|SLOWLOG)\]")
+    _COMMAND = re.compile(r'command="([^"]+)"')
+    _DURATION = re.compile(r'duration=(\d+)ms')
+
+    def parse_line(self, line: str, server_ip: str) -> Optional[UnifiedLogV1]:
+        ts_match = self._TIMESTAMP.match(line)
+        sev_match = self._SEVERITY.search(line)
+        if not ts_match or not sev_match:
+            return None
+        severity = sev_match.group(1)
+
+        cmd_match = self._COMMAND.search(line)
+        dur_match = self._DURATION.search(line)
+
+        return UnifiedLogV1(
+            source=self.source,
+            server_ip=server_ip,
+            timestamp=ts_match.group(1),
+            severity=severity,
+            operation=cmd_match.group(1) if cmd_match else "UNKNOWN",
+            status="ERROR" if "ERROR" in severity else "OK",
+            latency_ms=int(dur_match.group(1)) if dur_match else 0,
+            raw=line,
+        )
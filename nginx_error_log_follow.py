@@ -0,0 +1,244 @@
+# Nginx 错误日志 follow 模式：每次轮询只读取上次之后新追加的字节
+#
+# 每个日志文件持久化一个检查点（inode、已读偏移、末尾未写完的半行），
+# 能识别 logrotate 的改名轮转（先把旧文件剩余部分读完，再从新文件开头读）和 copytruncate 截断，
+# 只把新增的完整行交给模板聚合 + 大模型分析，单次轮询的开销不随日志总大小增长。
+import os
+import sys
+import glob
+import json
+import time
+import base64
+import argparse
+
+from analysis_cache import AnalysisCache
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("logs", ".follow_checkpoints.json")
+MAX_BYTES_PER_POLL = 64 * 1024 * 1024
+
+
+class LogFollower:
+    """跟踪单个日志文件的新增内容"""
+
+    def __init__(self, filename, checkpoint_path=DEFAULT_CHECKPOINT_PATH, max_bytes=MAX_BYTES_PER_POLL):
+        self.filename = filename
+        self.checkpoint_path = checkpoint_path
+        self.max_bytes = max_bytes
+
+        self.inode = None
+        self.offset = 0
+        self.partial = b""
+        self._load()
+
+    # ---------------- 检查点 ----------------
+
+    def _key(self):
+        return os.path.abspath(self.filename)
+
+    def _read_all_checkpoints(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def reload(self):
+        """丢弃内存中的进度，回到上次持久化的检查点"""
+        self.inode = None
+        self.offset = 0
+        self.partial = b""
+        self._load()
+
+    def _load(self):
+        checkpoint = self._read_all_checkpoints().get(self._key())
+        if not checkpoint:
+            return
+        self.inode = checkpoint.get("inode")
+        self.offset = checkpoint.get("offset", 0)
+        self.partial = base64.b64decode(checkpoint.get("partial", ""))
+
+    def save(self):
+        """写回检查点（多个文件共用一个检查点文件）"""
+        checkpoints = self._read_all_checkpoints()
+        checkpoints[self._key()] = {
+            "inode": self.inode,
+            "offset": self.offset,
+            "partial": base64.b64encode(self.partial).decode("ascii"),
+            "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoints, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # ---------------- 读取新增内容 ----------------
+
+    def _find_rotated(self):
+        """logrotate 改名轮转后，按 inode 找回旧文件（例如 error.log.1）"""
+        for candidate in sorted(glob.glob(glob.escape(self.filename) + ".*")):
+            try:
+                if os.stat(candidate).st_ino == self.inode:
+                    return candidate
+            except OSError:
+                continue
+        return None
+
+    def _read_from(self, path, offset, budget):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(budget)
+
+    def poll(self):
+        """读取上次检查点之后新增的完整行（不含换行符），并推进检查点（需调用 save() 持久化）"""
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            print(f"⚠️ 日志文件不存在: {self.filename}")
+            return []
+
+        lines = []
+        budget = self.max_bytes
+
+        if self.inode is not None and stat.st_ino != self.inode:
+            # 文件被轮转：先把旧文件剩下的部分读完
+            rotated = self._find_rotated()
+            if rotated:
+                data = self._read_from(rotated, self.offset, budget)
+                budget -= len(data)
+                lines.extend(self._split_lines(data))
+                if os.path.getsize(rotated) > self.offset + len(data):
+                    # 旧文件还没读完，下次继续读旧文件
+                    self.offset += len(data)
+                    return lines
+                print(f"🔄 检测到日志轮转: {rotated} -> {self.filename}")
+            else:
+                print(f"⚠️ 日志已轮转但找不到旧文件，跳过其未读部分")
+            # 旧文件末尾没有换行的最后一行也是完整的一行
+            if self.partial:
+                lines.append(self.partial.rstrip(b"\r").decode("utf-8", "replace"))
+            self.partial = b""
+            self.inode = stat.st_ino
+            self.offset = 0
+        elif self.inode is None:
+            self.inode = stat.st_ino
+        elif stat.st_size < self.offset:
+            # copytruncate：文件被截断，从头开始读
+            print(f"✂️ 检测到日志被截断: {self.filename}")
+            self.offset = 0
+            self.partial = b""
+
+        if budget > 0 and stat.st_size > self.offset:
+            data = self._read_from(self.filename, self.offset, budget)
+            self.offset += len(data)
+            lines.extend(self._split_lines(data))
+
+        return lines
+
+    def _split_lines(self, data):
+        """拼上上次的半行，切出完整行；末尾没有换行的部分留到下次"""
+        if not data:
+            return []
+        data = self.partial + data
+        last_newline = data.rfind(b"\n")
+        if last_newline == -1:
+            self.partial = data
+            return []
+        self.partial = data[last_newline + 1:]
+        return [line.rstrip(b"\r").decode("utf-8", "replace")
+                for line in data[:last_newline].split(b"\n")]
+
+
+def analyze_new_lines(filename, lines, cache=None):
+    """把新增的日志行聚合成模板统计，交给大模型分析并保存结果"""
+    from test1_analyze_nginx_logs import (
+        client,
+        save_analysis_result,
+        lookup_cached_analysis,
+        store_cached_analysis,
+        MODEL_NAME,
+        SYSTEM_PROMPT,
+    )
+    from nginx_error_log_templates import summarize_lines, format_summary
+
+    summary = summarize_lines(lines)
+    log_content = format_summary(summary)
+    print(f"📝 新增 {summary['total_lines']} 行日志聚合为 {len(summary['templates'])} 个模板")
+
+    if cache is not None:
+        cached_result = lookup_cached_analysis(cache, log_content)
+        if cached_result:
+            return save_analysis_result(filename, cached_result, from_cache=True)
+
+    # 日志内容已经在本地读好，直接以工具调用结果的形式交给模型，只需要一次 LLM 调用
+    tool_call = {
+        "id": "follow_read_nginx_error_log",
+        "type": "function",
+        "function": {
+            "name": "read_nginx_error_log",
+            "arguments": json.dumps({"filename": filename}, ensure_ascii=False)
+        }
+    }
+    response = client.chat.completions.create(
+        model=MODEL_NAME,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"帮我诊断nginx的错误日志 {filename} 中新增的部分"},
+            {"role": "assistant", "content": None, "tool_calls": [tool_call]},
+            {"role": "tool", "content": log_content, "tool_call_id": tool_call["id"]},
+        ]
+    )
+    result = response.choices[0].message.content
+    print("分析结果：")
+    print(result)
+    if cache is not None:
+        store_cached_analysis(cache, log_content, result, filename)
+    return save_analysis_result(filename, result)
+
+
+def follow(filenames, interval=60, checkpoint_path=DEFAULT_CHECKPOINT_PATH, once=False, analyze=True):
+    """循环轮询日志文件，只分析新增的行"""
+    followers = [LogFollower(name, checkpoint_path) for name in filenames]
+    cache = AnalysisCache() if analyze else None
+
+    while True:
+        for follower in followers:
+            start = time.perf_counter()
+            lines = follower.poll()
+            print(f"👀 {follower.filename}: 新增 {len(lines)} 行, "
+                  f"偏移 {follower.offset}, 读取耗时 {time.perf_counter() - start:.4f}s")
+            if lines and analyze:
+                try:
+                    analyze_new_lines(follower.filename, lines, cache)
+                except Exception as e:
+                    # 分析失败：不推进检查点，下次轮询重新读取这批日志
+                    print(f"❌ 分析新增日志失败: {e}")
+                    follower.reload()
+                    continue
+            follower.save()
+
+        if once:
+            break
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nginx 错误日志 follow 模式：只分析新增内容")
+    parser.add_argument("files", nargs="+", help="要跟踪的日志文件")
+    parser.add_argument("--interval", type=float, default=60, help="轮询间隔（秒）")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="检查点文件路径")
+    parser.add_argument("--once", action="store_true", help="只轮询一次就退出")
+    parser.add_argument("--no-analyze", action="store_true", help="只推进检查点、打印新增行数，不调用大模型")
+    args = parser.parse_args()
+
+    try:
+        follow(args.files, args.interval, args.checkpoint, once=args.once, analyze=not args.no_analyze)
+    except KeyboardInterrupt:
+        print("\n👋 结束跟踪")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+# Nginx 错误日志扫描器：基于 mmap 一次解析，生成持久化的旁路索引
+#
+# 日志格式：YYYY/MM/DD HH:MM:SS [level] pid#tid: *conn message
+# 索引文件（<日志>.idx）记录每一行的 字节偏移 / 时间戳 / 级别 / 消息类别，
+# 之后按时间范围、级别的查询只需要查索引 + 按偏移取行，不再全量重扫日志。
+import os
+import re
+import mmap
+import json
+import time
+import bisect
+import calendar
+from array import array
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"NGXIDX1\n"
+
+# nginx 日志级别（从低到高）
+LEVELS = ["debug", "info", "notice", "warn", "error", "crit", "alert", "emerg"]
+LEVEL_IDS = {level: i for i, level in enumerate(LEVELS)}
+
+LINE_PATTERN = re.compile(
+    rb'^(\d{4})/(\d\d)/(\d\d) (\d\d):(\d\d):(\d\d) \[(\w+)\] \d+#\d+: (?:\*\d+ )?([^\r\n]*)',
+    re.MULTILINE
+)
+
+# 消息归类：去掉引号里的路径、括号里的错误详情，只保留消息骨架
+_QUOTED = re.compile(r'"[^"]*"')
+_DETAILS = re.compile(r'\s*\([^()]*(?:\([^()]*\)[^()]*)*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def message_class(message):
+    """把具体消息归为消息类别，例如 connect() failed while connecting to upstream"""
+    text = _QUOTED.sub('', message)
+    text = _DETAILS.sub(lambda m: m.group(0) if m.group(0).strip() == '()' else '', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def parse_time(value):
+    """把 'YYYY/MM/DD HH:MM:SS' 或 'YYYY-MM-DD HH:MM:SS' 转成秒级时间戳（按 UTC 计算，只用于比较）"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().replace('T', ' ').replace('-', '/')
+    try:
+        date_part, _, time_part = text.partition(' ')
+        year, month, day = (int(x) for x in date_part.split('/'))
+        hour, minute, second = (int(float(x)) for x in (time_part or "00:00:00").split(':'))
+        return calendar.timegm((year, month, day, hour, minute, second))
+    except ValueError:
+        raise ValueError(f"无法解析时间格式: {value}（应为 YYYY/MM/DD HH:MM:SS）")
+
+
+def format_time(epoch):
+    """秒级时间戳 → 'YYYY/MM/DD HH:MM:SS'"""
+    y, mo, d, h, mi, s = time.gmtime(epoch)[:6]
+    return f"{y:04d}/{mo:02d}/{d:02d} {h:02d}:{mi:02d}:{s:02d}"
+
+
+class ErrorLogIndex:
+    """单个 Nginx 错误日志文件的索引"""
+
+    def __init__(self, log_path, index_path=None):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + INDEX_SUFFIX
+        self._reset()
+
+    def _reset(self):
+        """清空内存中的索引数据"""
+        self.offsets = array('Q')      # 每行起始字节偏移
+        self.timestamps = array('q')   # 每行时间戳（秒）
+        self.levels = array('B')       # 每行级别 id
+        self.classes = array('I')      # 每行消息类别 id
+        self.class_names = []          # 消息类别 id → 文本
+        self._class_ids = {}
+
+        # 按时间排序后的视图，用于二分查找
+        self.sorted_order = array('I')
+        self.sorted_timestamps = array('q')
+
+        self.indexed_size = 0
+        self.inode = None
+
+    # ---------------- 构建 / 加载 ----------------
+
+    @classmethod
+    def open(cls, log_path, index_path=None, rebuild=False):
+        """加载旁路索引；日志有变化时增量或全量重建，并写回磁盘"""
+        index = cls(log_path, index_path)
+        stat = os.stat(log_path)
+
+        loaded = not rebuild and index._load()
+        if loaded and index.inode == stat.st_ino and index.indexed_size == stat.st_size:
+            return index
+
+        if loaded and index.inode == stat.st_ino and index._can_extend(stat.st_size):
+            # 日志只是追加了内容：只解析新增部分
+            index._scan(start=index.indexed_size)
+        else:
+            index._reset()
+            index._scan(start=0)
+
+        index.inode = stat.st_ino
+        index._build_sorted_view()
+        index._save()
+        return index
+
+    def _can_extend(self, size):
+        """之前索引的内容没有被截断/改写，才可以增量追加"""
+        if size < self.indexed_size:
+            return False
+        if self.indexed_size == 0:
+            return True
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.indexed_size - 1)
+            return f.read(1) == b'\n'
+
+    def _scan(self, start=0):
+        """mmap 整个日志，一次正则扫描解析出所有行"""
+        size = os.path.getsize(self.log_path)
+        if size == 0:
+            self.indexed_size = 0
+            return
+
+        with open(self.log_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 只索引完整的行，末尾未写完的行留给下一次
+            end = mm.rfind(b'\n', start) + 1
+            if end <= start:
+                self.indexed_size = start
+                return
+
+            for match in LINE_PATTERN.finditer(mm, start, end):
+                year, month, day, hour, minute, second, level, message = match.groups()
+                epoch = calendar.timegm((int(year), int(month), int(day),
+                                         int(hour), int(minute), int(second)))
+                self.offsets.append(match.start())
+                self.timestamps.append(epoch)
+                self.levels.append(LEVEL_IDS.get(level.decode('ascii', 'replace').lower(), 0))
+                self.classes.append(self._class_id(message.decode('utf-8', 'replace')))
+
+            self.indexed_size = end
+
+    def _class_id(self, message):
+        name = message_class(message)
+        class_id = self._class_ids.get(name)
+        if class_id is None:
+            class_id = len(self.class_names)
+            self._class_ids[name] = class_id
+            self.class_names.append(name)
+        return class_id
+
+    def _build_sorted_view(self):
+        timestamps = self.timestamps
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        self.sorted_order = array('I', order)
+        self.sorted_timestamps = array('q', (timestamps[i] for i in order))
+
+    def _save(self):
+        header = {
+            "log_path": os.path.abspath(self.log_path),
+            "indexed_size": self.indexed_size,
+            "inode": self.inode,
+            "count": len(self.offsets),
+            "class_names": self.class_names,
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(INDEX_MAGIC)
+                f.write(len(header_bytes).to_bytes(4, 'little'))
+                f.write(header_bytes)
+                for column in (self.offsets, self.timestamps, self.levels, self.classes,
+                               self.sorted_order, self.sorted_timestamps):
+                    column.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # 索引写不进去（例如日志目录只读）不影响本次查询
+            print(f"⚠️ 保存日志索引失败: {e}")
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return False
+                header_len = int.from_bytes(f.read(4), 'little')
+                header = json.loads(f.read(header_len).decode('utf-8'))
+                count = header["count"]
+                for column in (self.offsets, self.timestamps, self.levels, self.classes,
+                               self.sorted_order, self.sorted_timestamps):
+                    column.fromfile(f, count)
+        except (OSError, ValueError, KeyError, EOFError):
+            self._reset()
+            return False
+
+        self.indexed_size = header["indexed_size"]
+        self.inode = header["inode"]
+        self.class_names = header["class_names"]
+        self._class_ids = {name: i for i, name in enumerate(self.class_names)}
+        return True
+
+    # ---------------- 查询 ----------------
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def query(self, start_time=None, end_time=None, levels=None, message_classes=None, limit=None):
+        """
+        按时间范围 / 级别 / 消息类别查询，只查索引，返回按时间升序的行号列表。
+        limit 生效时保留时间上最新的 limit 条。
+        """
+        start = parse_time(start_time)
+        end = parse_time(end_time)
+        lo = 0 if start is None else bisect.bisect_left(self.sorted_timestamps, start)
+        hi = len(self.sorted_timestamps) if end is None else bisect.bisect_right(self.sorted_timestamps, end)
+
+        level_ids = None
+        if levels:
+            if isinstance(levels, str):
+                levels = [levels]
+            level_ids = {LEVEL_IDS[level.lower()] for level in levels if level.lower() in LEVEL_IDS}
+
+        class_ids = None
+        if message_classes:
+            if isinstance(message_classes, str):
+                message_classes = [message_classes]
+            class_ids = {self._class_ids[name] for name in message_classes if name in self._class_ids}
+
+        selected = []
+        for pos in range(hi - 1, lo - 1, -1):
+            row = self.sorted_order[pos]
+            if level_ids is not None and self.levels[row] not in level_ids:
+                continue
+            if class_ids is not None and self.classes[row] not in class_ids:
+                continue
+            selected.append(row)
+            if limit and len(selected) >= limit:
+                break
+
+        selected.reverse()
+        return selected
+
+    def read_lines(self, rows):
+        """按索引中的字节偏移从日志里取出原始行"""
+        if not rows:
+            return []
+        lines = []
+        with open(self.log_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for row in rows:
+                offset = self.offsets[row]
+                end = mm.find(b'\n', offset)
+                if end == -1:
+                    end = len(mm)
+                lines.append(mm[offset:end].rstrip(b'\r').decode('utf-8', 'replace'))
+        return lines
+
+    def level_histogram(self, rows=None):
+        """统计各级别的行数"""
+        rows = range(len(self.levels)) if rows is None else rows
+        histogram = {}
+        for row in rows:
+            level = LEVELS[self.levels[row]]
+            histogram[level] = histogram.get(level, 0) + 1
+        return histogram
+
+
+def read_error_log(filename, start_time=None, end_time=None, levels=None, limit=None):
+    """
+    查询 Nginx 错误日志，返回匹配的原始日志行列表（按时间升序）
+
+    Args:
+        filename: 日志文件路径
+        start_time / end_time: 时间范围，格式 YYYY/MM/DD HH:MM:SS（可选）
+        levels: 日志级别列表，例如 ["crit", "alert"]（可选）
+        limit: 最多返回的行数，保留时间上最新的部分；None 表示不限制
+    """
+    try:
+        index = ErrorLogIndex.open(filename)
+        rows = index.query(start_time=start_time, end_time=end_time, levels=levels, limit=limit)
+        return index.read_lines(rows)
+    except Exception as e:
+        print(f"查询日志失败：{e}")
+        return None
+
+
+def query_error_log(filename, start_time=None, end_time=None, levels=None, limit=200):
+    """查询 Nginx 错误日志，返回匹配的原始日志文本（按时间升序，最多 limit 行）"""
+    lines = read_error_log(filename, start_time, end_time, levels, limit)
+    if lines is None:
+        return None
+    return '\n'.join(lines)
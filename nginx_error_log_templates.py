@@ -0,0 +1,137 @@
+# Nginx 错误日志模板聚合：在发给大模型之前，把大量重复日志折叠成「模板 + 计数」
+#
+# 去掉时间戳、pid#tid、*连接号，把消息里的 IP、端口、十六进制、带数字的参数等掩码掉，
+# 相同骨架的行归为同一个模板，统计 出现次数 / 首次、末次出现时间 / 级别分布。
+import re
+
+from nginx_error_log_scanner import LEVELS, parse_time, format_time
+
+LINE_PATTERN = re.compile(
+    r'^(\d{4}/\d\d/\d\d \d\d:\d\d:\d\d) \[(\w+)\] \d+#\d+: (?:\*\d+ )?(.*)$'
+)
+
+# 消息内部的可变部分
+_MASKS = [
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<HEX>'),
+    (re.compile(r'(?<=[?&])[^&\s"]*'), '<*>'),
+]
+# 错误码 "(111: Connection refused)" 里的数字保留，其它纯数字的词（不含字母）一律掩码
+_ERRNO = re.compile(r'^\(\d+:$')
+_NUMERIC = re.compile(r'^[^A-Za-z<>]*\d[^A-Za-z<>]*$')
+
+
+def mask_message(message):
+    """把一条消息变成模板：掩码 IP、十六进制、查询参数和纯数字的词"""
+    for pattern, replacement in _MASKS:
+        message = pattern.sub(replacement, message)
+    tokens = []
+    for token in message.split():
+        if _NUMERIC.match(token) and not _ERRNO.match(token):
+            tokens.append('<*>')
+        else:
+            tokens.append(token)
+    return ' '.join(tokens)
+
+
+def summarize_lines(lines):
+    """
+    把日志行聚合成模板统计
+
+    Returns:
+        {
+            "total_lines": 3500,
+            "first_seen": "...", "last_seen": "...",
+            "levels": {"crit": 885, ...},
+            "templates": [
+                {"template": "...", "count": 620, "first_seen": "...", "last_seen": "...",
+                 "levels": {"alert": 160, ...}},
+                ...
+            ]   # 按出现次数降序
+        }
+    """
+    templates = {}
+    level_totals = {}
+    total = 0
+    first_ts = last_ts = None
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        total += 1
+
+        match = LINE_PATTERN.match(line)
+        if match:
+            time_text, level, message = match.groups()
+            level = level.lower()
+            ts = parse_time(time_text)
+        else:
+            level, message, ts = "unknown", line, None
+
+        template = mask_message(message)
+        stats = templates.get(template)
+        if stats is None:
+            stats = templates[template] = {"count": 0, "first": None, "last": None, "levels": {}}
+        stats["count"] += 1
+        stats["levels"][level] = stats["levels"].get(level, 0) + 1
+        level_totals[level] = level_totals.get(level, 0) + 1
+
+        if ts is not None:
+            if stats["first"] is None or ts < stats["first"]:
+                stats["first"] = ts
+            if stats["last"] is None or ts > stats["last"]:
+                stats["last"] = ts
+            if first_ts is None or ts < first_ts:
+                first_ts = ts
+            if last_ts is None or ts > last_ts:
+                last_ts = ts
+
+    def _fmt(ts):
+        return format_time(ts) if ts is not None else None
+
+    ordered = sorted(templates.items(), key=lambda item: item[1]["count"], reverse=True)
+    return {
+        "total_lines": total,
+        "first_seen": _fmt(first_ts),
+        "last_seen": _fmt(last_ts),
+        "levels": _sort_levels(level_totals),
+        "templates": [
+            {
+                "template": template,
+                "count": stats["count"],
+                "first_seen": _fmt(stats["first"]),
+                "last_seen": _fmt(stats["last"]),
+                "levels": _sort_levels(stats["levels"]),
+            }
+            for template, stats in ordered
+        ],
+    }
+
+
+def _sort_levels(histogram):
+    """级别按严重程度从高到低排列"""
+    rank = {level: i for i, level in enumerate(LEVELS)}
+    return dict(sorted(histogram.items(), key=lambda item: -rank.get(item[0], -1)))
+
+
+def format_summary(summary, max_templates=30):
+    """把模板统计压缩成给大模型看的紧凑文本"""
+    def _levels(histogram):
+        return ' '.join(f"{level}={count}" for level, count in histogram.items())
+
+    templates = summary["templates"]
+    lines = [
+        f"# 共 {summary['total_lines']} 行日志，归并为 {len(templates)} 个模板",
+        f"# 时间范围: {summary['first_seen']} ~ {summary['last_seen']}",
+        f"# 级别分布: {_levels(summary['levels'])}",
+    ]
+    for i, item in enumerate(templates[:max_templates], 1):
+        lines.append(
+            f"[{i}] x{item['count']} | {_levels(item['levels'])} | "
+            f"{item['first_seen']} ~ {item['last_seen']} | {item['template']}"
+        )
+    if len(templates) > max_templates:
+        rest = sum(item["count"] for item in templates[max_templates:])
+        lines.append(f"... 其余 {len(templates) - max_templates} 个模板共 {rest} 行")
+    return '\n'.join(lines)
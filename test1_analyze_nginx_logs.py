@@ -6,6 +6,10 @@ from datetime import datetime
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from nginx_error_log_scanner import read_error_log
+from nginx_error_log_templates import summarize_lines, format_summary
+from analysis_cache import AnalysisCache, make_cache_key
+
 # 加载 .env 文件中的环境变量
 load_dotenv()  # 新增
 
@@ -23,19 +27,50 @@ def read_log_file(filename):
         print(f"读取文件错误：{e}")
         return None
 
-#读取日志（只读前200行）
-def read_log_tail(filename, n=200):
-    """只读取日志最后 n 行，避免 token 爆掉"""
+#读取日志（只读最后200行）
+TAIL_BLOCK_SIZE = 64 * 1024
+
+def read_log_tail(filename, n=200, block_size=TAIL_BLOCK_SIZE):
+    """只读取日志最后 n 行，避免 token 爆掉
+
+    从文件末尾按固定大小的块反向 seek，直到凑够 n 个换行为止，
+    内存占用只与 n 成正比，而与日志文件大小无关（多 GB 日志也适用）。
+    """
+    n = int(n)
+    if n <= 0:
+        return ''
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        return ''.join(lines[-n:])
+        with open(filename, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            if position == 0:
+                return ''
+
+            # 文件以换行结尾时，最后一个换行属于最后一行本身，需要多找一个
+            file.seek(position - 1)
+            needed = n + 1 if file.read(1) == b'\n' else n
+
+            blocks = []
+            newlines = 0
+            while position > 0 and newlines < needed:
+                read_size = min(block_size, position)
+                position -= read_size
+                file.seek(position)
+                block = file.read(read_size)
+                blocks.append(block)
+                newlines += block.count(b'\n')
+
+        data = b''.join(reversed(blocks))
+        lines = data.splitlines(keepends=True)
+        tail = b''.join(lines[-n:]).decode('utf-8')
+        # 与文本模式 readlines() 保持一致：统一换行符为 \n
+        return tail.replace('\r\n', '\n').replace('\r', '\n')
     except Exception as e:
         print(f"读取文件失败：{e}")
         return None
 
 #保存结果
-def save_analysis_result(log_filename, analysis_result, output_dir="logs/error-log"):
+def save_analysis_result(log_filename, analysis_result, output_dir="logs/error-log", from_cache=False):
     """保存分析结果到文件"""
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
@@ -52,6 +87,8 @@ def save_analysis_result(log_filename, analysis_result, output_dir="logs/error-l
         "source_log": log_filename,
         "analysis_result": analysis_result
     }
+    if from_cache:
+        result_data["from_cache"] = True
 
     # 保存到文件
     try:
@@ -69,17 +106,33 @@ tools = [
         "type" : "function",
         "function" : {
             "name" : "read_nginx_error_log",
-            "description" : "读取在logs/目录下面的Nginx错误日志文件内容",
+            "description" : "读取在logs/目录下面的Nginx错误日志文件，返回按消息模板聚合后的统计（出现次数、首末次时间、级别分布）",
             "parameters" : {
                 "type" : "object",
                 "properties":{
                     "filename":{
                         "type":"string",
-                        "desctiption":"日志文件路径，例如 logs/error_log_3.log 默认 logs/error_log_3.log"
+                        "description":"日志文件路径，例如 logs/error_log_3.log 默认 logs/error_log_3.log"
+                    },
+                    "start_time":{
+                        "type":"string",
+                        "description":"起始时间（包含），格式 YYYY/MM/DD HH:MM:SS，不填表示不限"
                     },
-                    "lines":{
+                    "end_time":{
+                        "type":"string",
+                        "description":"结束时间（包含），格式 YYYY/MM/DD HH:MM:SS，不填表示不限"
+                    },
+                    "levels":{
+                        "type":"array",
+                        "items":{
+                            "type":"string",
+                            "enum":["debug","info","notice","warn","error","crit","alert","emerg"]
+                        },
+                        "description":"只返回这些级别的日志，例如 [\"crit\", \"alert\"]，不填表示所有级别"
+                    },
+                    "limit":{
                         "type":"number",
-                        "description":"读取的行数，默认200行"
+                        "description":"只统计时间上最新的 N 行，不填表示统计筛选范围内的全部日志"
                     }
                 },
                 "required":["filename"]
@@ -90,8 +143,36 @@ tools = [
 
 #3. 实现工具调用流程
 #处理工具调用响应
-def handle_tool_calls(response):
-    """处理工具调用响应"""
+DEFAULT_LOG_FILE = "logs/error_log_3.log"
+
+def build_log_tool_content(filename, function_args):
+    """执行 read_nginx_error_log 工具：按参数筛选日志并聚合成模板统计文本"""
+    log_lines = read_error_log(
+        filename,
+        start_time=function_args.get("start_time"),
+        end_time=function_args.get("end_time"),
+        levels=function_args.get("levels"),
+        limit=function_args.get("limit")
+    )
+    if log_lines is None:
+        return None
+
+    # 模板聚合：重复日志折叠成「模板 + 计数」，整份日志也只需几百 token
+    summary = summarize_lines(log_lines)
+    print(f"📝 {summary['total_lines']} 行日志聚合为 {len(summary['templates'])} 个模板")
+    return format_summary(summary)
+
+
+def handle_tool_calls(response, filename=None):
+    """处理工具调用响应
+
+    Args:
+        response: 第一次调用的响应
+        filename: 指定要读取的日志文件（批量模式下使用），不传则使用大模型给出的 filename
+
+    Returns:
+        (实际读取的日志文件, 工具结果)；没有工具调用时返回 (None, None)
+    """
     tool_calls = response.choices[0].message.tool_calls
     if tool_calls:
         #解析工具调用
@@ -109,18 +190,15 @@ def handle_tool_calls(response):
             #调用对应的工具函数
             if function_name == "read_nginx_error_log":
                 #如果filename中没有传参，那么使用后面的默认日志名
-                filename  = function_args.get("filename")
+                log_filename = filename or function_args.get("filename")
 
-                if not os.path.exists(filename):
-                    print(f"⚠️ 文件不存在：{filename}，将使用默认文件 logs/error_log_3.log")
-                    filename = "logs/error_log_3.log"
+                if not log_filename or not os.path.exists(log_filename):
+                    print(f"⚠️ 文件不存在：{log_filename}，将使用默认文件 {DEFAULT_LOG_FILE}")
+                    log_filename = DEFAULT_LOG_FILE
 
-                print(f"📝 最终使用的文件名: {filename}")
-                lines = function_args.get("lines",200)
-                log_content = read_log_tail(filename,lines)
-
-                return log_content
-    return None
+                print(f"📝 最终使用的文件名: {log_filename}")
+                return log_filename, build_log_tool_content(log_filename, function_args)
+    return None, None
 
 #创建OpenAI客户端实例
 client = OpenAI(
@@ -128,18 +206,18 @@ client = OpenAI(
     base_url="https://api.deepseek.com"
 )
 
-def analyze_nginx_logs():
+MODEL_NAME = "deepseek-chat"
 
-    system_prompt = """
+SYSTEM_PROMPT = """
     你是一名 Nginx 运维专家。你的行为必须遵守以下规则：
 
     1. 当用户请求“分析 Nginx 日志 / 诊断错误日志 / 查看错误日志”等类似任务时，你必须调用工具 read_nginx_error_log —— 即使用户没有提供 filename。
     
     2. 如果用户没有提供 filename，你也不能向用户询问路径，而是必须直接触发工具调用，并在 arguments 中仅填入空参数或默认值，例如：
     {
-      "filename": "logs/error.log",
-      "lines": 200
+      "filename": "logs/error.log"
     }
+    如果用户关心某个时间段或某些级别（例如 crit/alert），请通过 start_time、end_time、levels 参数筛选。
     
     3. 工具执行结果返回后，你才会进行分析，并输出严格 JSON：
     {
@@ -149,11 +227,47 @@ def analyze_nginx_logs():
     
     4. 除非 DEBUG 或 SYSTEM 指令要求，否则不允许你在未调用工具的情况下直接回复内容。
 
-    """
+"""
+
+
+def lookup_cached_analysis(cache, log_content, record_miss=True):
+    """按「日志内容 + 系统提示词 + 模型名」查分析缓存"""
+    if not log_content:
+        return None
+    return cache.get(make_cache_key(log_content, SYSTEM_PROMPT, MODEL_NAME), record_miss)
+
+
+def store_cached_analysis(cache, log_content, analysis_result, log_filename):
+    """把本次分析结果写入缓存"""
+    if log_content and analysis_result:
+        cache.put(make_cache_key(log_content, SYSTEM_PROMPT, MODEL_NAME), analysis_result,
+                  source_log=log_filename, model=MODEL_NAME)
+
+
+def analyze_nginx_logs(cache=None):
+    """诊断默认 Nginx 错误日志，结束时打印分析缓存的命中情况"""
+    cache = cache or AnalysisCache()
+    try:
+        return _analyze_nginx_logs(cache)
+    finally:
+        cache.report()
+
+
+def _analyze_nginx_logs(cache):
+    system_prompt = SYSTEM_PROMPT
+
+    # 试探：默认参数下工具会返回整份默认日志的模板统计，内容没变则两次 LLM 调用都可以省掉
+    default_content = build_log_tool_content(DEFAULT_LOG_FILE, {})
+    cached_result = lookup_cached_analysis(cache, default_content, record_miss=False)
+    if cached_result:
+        print("⚡ 日志内容未变化，直接使用缓存的分析结果：")
+        print(cached_result)
+        save_analysis_result(DEFAULT_LOG_FILE, cached_result, from_cache=True)
+        return cached_result
 
     #第一次调用 - 期望大模型返回工具调用响应（因为未指定具体文件）
     response = client.chat.completions.create(
-        model = "deepseek-chat",
+        model = MODEL_NAME,
         messages = [
             {"role" : "system","content" : system_prompt},
             {"role" : "user","content":"帮我诊断nginx的错误日志"},
@@ -164,12 +278,20 @@ def analyze_nginx_logs():
 
     # 打印第一次响应，查看是否有工具调用
     print("第一次响应：", response.choices[0].message)
-    log_content = handle_tool_calls(response)
+    log_filename, log_content = handle_tool_calls(response)
 
     if(log_content):
+        # 按实际发送给模型的内容再查一次（大模型选择的参数可能与试探时不同）
+        cached_result = lookup_cached_analysis(cache, log_content)
+        if cached_result:
+            print("⚡ 命中分析缓存，跳过第二次调用：")
+            print(cached_result)
+            save_analysis_result(log_filename, cached_result, from_cache=True)
+            return cached_result
+
         #第二次调用 - 提供工具调用结果给大模型
         second_response = client.chat.completions.create(
-            model = "deepseek-chat",
+            model = MODEL_NAME,
             messages = [
                 {"role" : "system","content" : system_prompt},
                 {"role" : "user","content":"帮我诊断nginx的错误日志"},
@@ -188,14 +310,15 @@ def analyze_nginx_logs():
         final_result = second_response.choices[0].message.content
         print("分析结果：")
         print(final_result)
-        save_analysis_result("error_log_1.log",final_result)
+        store_cached_analysis(cache, log_content, final_result, log_filename)
+        save_analysis_result(log_filename, final_result)
         return final_result
     else:
         #如果没有工具调用，直接使用结果
         result = response.choices[0].message.content
         print("分析结果；")
         print(result)
-        save_analysis_result("error_log_2.log", result)
+        save_analysis_result(log_filename or DEFAULT_LOG_FILE, result)
         return result
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Nginx 错误日志 follow 模式 LogFollower 检查点的测试脚本
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from nginx_error_log_follow import LogFollower
+
+
+def log_line(i):
+    return f"2024/05/01 10:00:{i % 60:02d} [error] 100#0: *{i} connect() failed line {i}"
+
+
+class Scenario:
+    """往日志里写、轮转、截断，并记录写入的每一行；每次轮询都从持久化的检查点重新加载"""
+
+    def __init__(self, root, max_bytes):
+        self.path = os.path.join(root, "error.log")
+        self.checkpoint = os.path.join(root, "checkpoints.json")
+        self.max_bytes = max_bytes
+        self.written = []
+        self.seen = []
+        self.counter = 0
+
+    def write(self, path, count, partial=False, mode="a"):
+        """写 count 行；partial=True 时最后一行先只写前半截"""
+        lines = []
+        for _ in range(count):
+            self.counter += 1
+            lines.append(log_line(self.counter))
+        self.written.extend(lines)
+        text = "".join(line + "\n" for line in lines)
+        if partial:
+            text = text[:-len(lines[-1]) // 2 - 1]
+        with open(path, mode) as f:
+            f.write(text)
+        return text
+
+    def finish_partial(self, path):
+        """补上半行剩下的部分"""
+        last = self.written[-1] + "\n"
+        with open(path, "a") as f:
+            f.write(last[len(last) - len(last) // 2 - 1:])
+
+    def poll(self, rounds=1):
+        for _ in range(rounds):
+            follower = LogFollower(self.path, self.checkpoint, max_bytes=self.max_bytes)
+            self.seen.extend(follower.poll())
+            follower.save()
+
+
+def run_scenario(max_bytes):
+    root = tempfile.mkdtemp()
+    try:
+        s = Scenario(root, max_bytes)
+        rotated = s.path + ".1"
+        # 初次读取，末尾带一个没写完的半行（跨越检查点持久化）
+        s.write(s.path, 5, partial=True)
+        s.poll(rounds=20)
+        partial_pending = len(s.seen) == 4
+        s.finish_partial(s.path)
+        s.write(s.path, 3)
+        s.poll(rounds=20)
+
+        # logrotate 改名轮转：nginx 在重新打开前又往旧文件写了几行，最后一行没有换行
+        os.rename(s.path, rotated)
+        s.write(rotated, 2, partial=True)
+        s.finish_partial(rotated)
+        with open(rotated, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            f.truncate()
+        s.write(s.path, 4, mode="w")
+        s.poll(rounds=40)
+
+        # copytruncate：原地截断后写入比已读偏移更短的内容
+        with open(s.path, "w"):
+            pass
+        s.write(s.path, 1)
+        s.poll(rounds=20)
+        s.write(s.path, 2, partial=True)
+        s.finish_partial(s.path)
+        s.poll(rounds=20)
+
+        print(f"  max_bytes={max_bytes}: 写入 {len(s.written)} 行, 读到 {len(s.seen)} 行")
+        if s.seen != s.written:
+            missing = [line for line in s.written if line not in s.seen]
+            print(f"  ❌ 缺少 {missing[:3]}，重复 {len(s.seen) - len(set(s.seen))} 行")
+        return partial_pending and s.seen == s.written
+    finally:
+        shutil.rmtree(root)
+
+
+def test_each_byte_once():
+    """半行、改名轮转、截断之后，每一行都恰好被读到一次，且顺序不变"""
+    print("🧪 测试每个字节恰好分析一次")
+    # 预算足够一次读完 / 每次只读几十字节（跨多次轮询、半行落在预算边界）
+    return run_scenario(64 * 1024 * 1024) and run_scenario(37)
+
+
+def test_checkpoint_fields():
+    """检查点记录 inode、偏移和 base64 编码的半行；按 inode 找回轮转后的旧文件"""
+    print("🧪 测试检查点内容和按 inode 找旧文件")
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "error.log")
+        checkpoint = os.path.join(root, "checkpoints.json")
+        with open(path, "wb") as f:
+            f.write(log_line(1).encode() + b"\n" + "半行 \xff".encode("utf-8") + b"\xe4")
+        follower = LogFollower(path, checkpoint)
+        follower.poll()
+        follower.save()
+
+        reloaded = LogFollower(path, checkpoint)
+        print(f"  inode={reloaded.inode}, offset={reloaded.offset}, partial={reloaded.partial!r}")
+        fields_ok = (reloaded.inode == os.stat(path).st_ino
+                     and reloaded.offset == os.path.getsize(path)
+                     and reloaded.partial == "半行 \xff".encode("utf-8") + b"\xe4")
+
+        # 旧文件被改名成 .2，同目录还有一个无关的 .1
+        os.rename(path, path + ".2")
+        with open(path + ".1", "w") as f:
+            f.write("unrelated\n")
+        with open(path, "w") as f:
+            f.write("")
+        found = reloaded._find_rotated()
+        print(f"  找到旧文件: {os.path.basename(found) if found else None}")
+        return fields_ok and found == path + ".2"
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    tests = [
+        ("每个字节恰好分析一次", test_each_byte_once),
+        ("检查点内容和按 inode 找旧文件", test_checkpoint_fields),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
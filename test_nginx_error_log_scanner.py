@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Nginx 错误日志旁路索引 ErrorLogIndex 的测试脚本
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from nginx_error_log_scanner import ErrorLogIndex, read_error_log
+
+
+def log_line(second, level, message, minute=0):
+    return f"2024/05/01 10:{minute:02d}:{second:02d} [{level}] 100#0: *{second} {message}\n"
+
+
+class ScanRecorder:
+    """记录 ErrorLogIndex._scan 每次从哪个字节偏移开始解析"""
+
+    def __init__(self):
+        self.starts = []
+        self._original = ErrorLogIndex._scan
+
+    def __enter__(self):
+        recorder = self
+
+        def scan(index, start=0):
+            recorder.starts.append(start)
+            return recorder._original(index, start)
+
+        ErrorLogIndex._scan = scan
+        return self
+
+    def __exit__(self, *exc):
+        ErrorLogIndex._scan = self._original
+
+
+def columns(index):
+    return (list(index.offsets), list(index.timestamps), list(index.levels), list(index.classes),
+            list(index.sorted_order), list(index.sorted_timestamps), index.indexed_size)
+
+
+def test_extend_on_append():
+    """日志追加后只解析新增部分，末尾未写完的行等写完再索引，结果与全量重建一致"""
+    print("🧪 测试追加时增量扩展 .idx")
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "error.log")
+        with open(path, "w") as f:
+            f.write(log_line(1, "error", "connect() failed") + log_line(2, "warn", "upstream timed out"))
+        first_size = os.path.getsize(path)
+
+        with ScanRecorder() as recorder:
+            ErrorLogIndex.open(path)
+            unchanged = ErrorLogIndex.open(path)
+            with open(path, "a") as f:
+                f.write(log_line(3, "crit", "open() failed") + "2024/05/01 10:00:04 [err")
+            partial = ErrorLogIndex.open(path)
+            with open(path, "a") as f:
+                f.write("or] 100#0: *4 recv() failed\n")
+            completed = ErrorLogIndex.open(path)
+        print(f"  _scan 起点: {recorder.starts}")
+
+        rebuilt = ErrorLogIndex.open(path, index_path=os.path.join(root, "rebuilt.idx"), rebuild=True)
+        third_line = first_size + len(log_line(3, "crit", "open() failed"))
+        return (recorder.starts == [0, first_size, third_line]
+                and len(unchanged) == 2 and len(partial) == 3 and partial.indexed_size == third_line
+                and columns(completed) == columns(rebuilt)
+                and completed.read_lines([3]) == ["2024/05/01 10:00:04 [error] 100#0: *4 recv() failed"])
+    finally:
+        shutil.rmtree(root)
+
+
+def test_discard_on_inode_change():
+    """日志被轮转替换（inode 变了）或被截断改写时丢弃旧索引，从头重建"""
+    print("🧪 测试 inode 变化 / 截断时重建")
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "error.log")
+        with open(path, "w") as f:
+            f.write(log_line(1, "error", "connect() failed") + log_line(2, "error", "connect() failed"))
+        ErrorLogIndex.open(path)
+
+        # 新文件先写好再 rename 过去：大小比旧文件大，但 inode 不同，不能当成追加
+        replacement = os.path.join(root, "error.log.new")
+        with open(replacement, "w") as f:
+            f.write(log_line(5, "alert", "worker process exited") * 3)
+        os.replace(replacement, path)
+
+        with ScanRecorder() as recorder:
+            rotated = ErrorLogIndex.open(path)
+            # 原地截断后写入更短的内容：inode 不变，但大小变小
+            with open(path, "w") as f:
+                f.write(log_line(9, "info", "client closed connection"))
+            truncated = ErrorLogIndex.open(path)
+        print(f"  _scan 起点: {recorder.starts}, 轮转后 {len(rotated)} 行, 截断后 {len(truncated)} 行")
+
+        return (recorder.starts == [0, 0]
+                and rotated.inode == os.stat(path).st_ino
+                and rotated.level_histogram() == {"alert": 3}
+                and truncated.level_histogram() == {"info": 1}
+                and truncated.read_lines([0]) == [log_line(9, "info", "client closed connection").rstrip("\n")])
+    finally:
+        shutil.rmtree(root)
+
+
+def test_query_boundaries():
+    """start_time / end_time 两端都包含；级别过滤；limit 保留最新的；乱序写入的行按时间返回"""
+    print("🧪 测试时间范围 / 级别查询的边界")
+    root = tempfile.mkdtemp()
+    try:
+        path = os.path.join(root, "error.log")
+        lines = [log_line(10, "error", "a"), log_line(20, "warn", "b"), log_line(20, "error", "c"),
+                 log_line(5, "crit", "d"), log_line(30, "error", "e")]
+        with open(path, "w") as f:
+            f.writelines(lines)
+        index = ErrorLogIndex.open(path)
+
+        def messages(**kwargs):
+            return [line.rsplit(" ", 1)[1] for line in index.read_lines(index.query(**kwargs))]
+
+        cases = [
+            (dict(), ["d", "a", "b", "c", "e"]),
+            (dict(start_time="2024/05/01 10:00:20"), ["b", "c", "e"]),
+            (dict(start_time="2024/05/01 10:00:21"), ["e"]),
+            (dict(end_time="2024/05/01 10:00:20"), ["d", "a", "b", "c"]),
+            (dict(end_time="2024/05/01 10:00:19"), ["d", "a"]),
+            (dict(start_time="2024-05-01 10:00:20", end_time="2024-05-01T10:00:20"), ["b", "c"]),
+            (dict(start_time="2024/05/01 10:00:31"), []),
+            (dict(end_time="2024/05/01 10:00:04"), []),
+            (dict(levels="ERROR"), ["a", "c", "e"]),
+            (dict(levels=["crit", "warn", "nosuch"]), ["d", "b"]),
+            (dict(levels=["error"], end_time="2024/05/01 10:00:20", limit=1), ["c"]),
+            (dict(limit=2), ["c", "e"]),
+        ]
+        ok = True
+        for kwargs, expected in cases:
+            got = messages(**kwargs)
+            if got != expected:
+                print(f"  ❌ {kwargs}: {got}，期望 {expected}")
+                ok = False
+        print(f"  {len(cases)} 个查询")
+        return ok and read_error_log(path, levels=["crit"]) == [lines[3].rstrip("\n")]
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    tests = [
+        ("追加时增量扩展", test_extend_on_append),
+        ("inode 变化 / 截断时重建", test_discard_on_inode_change),
+        ("时间范围 / 级别查询边界", test_query_boundaries),
+    ]
+
+    passed_tests = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed_tests += 1
+                print(f"✅ {test_name} 测试通过\n")
+            else:
+                print(f"❌ {test_name} 测试失败\n")
+        except Exception as e:
+            print(f"❌ {test_name} 测试异常: {e}\n")
+
+    print("=" * 60)
+    print(f"📊 测试总结: {passed_tests}/{len(tests)} 个测试通过")
+    return passed_tests == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)